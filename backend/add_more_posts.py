@@ -16,6 +16,7 @@ import random
 import firebase_admin
 from firebase_admin import credentials, firestore
 from app.utils.security import get_password_hash
+from app.services.author_snapshots import AUTHOR_FIELD, author_snapshot
 
 # Expanded test data with diverse topics
 ADDITIONAL_POSTS = [
@@ -165,7 +166,8 @@ def get_random_user(db):
     user_doc = random.choice(users)
     return {
         "id": user_doc.id,
-        "username": user_doc.to_dict()['username']
+        "username": user_doc.to_dict()['username'],
+        "avatar_url": user_doc.to_dict().get('avatar_url')
     }
 
 def add_posts(db):
@@ -192,6 +194,7 @@ def add_posts(db):
 
         post_dict = {
             "user_id": user["id"],
+            AUTHOR_FIELD: author_snapshot(user),
             "content": post_data["content"],
             "tags": post_data["tags"],
             "categories": post_data["categories"],
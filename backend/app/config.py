@@ -1,20 +1,167 @@
 from pydantic_settings import BaseSettings
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).parent.parent
 
 class Settings(BaseSettings):
     # JWT Settings
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    # Verified access tokens kept in memory (repeated requests skip the signature check)
+    token_cache_max_entries: int = 50000
 
     # Legacy MongoDB settings (not used anymore - using Firebase Firestore)
     mongodb_url: Optional[str] = None
     database_name: Optional[str] = None
 
+    # Image blob store (content-addressed by SHA-256)
+    image_store_dir: str = os.path.join(BACKEND_DIR, "image_store")
+    image_thumbnail_sizes: List[int] = [320, 640]
+    image_cache_max_age: int = 31536000  # 1 year, blobs are immutable
+    image_upload_max_bytes: int = 10 * 1024 * 1024  # 10 MB
+
+    # AI models and their inference backend: "torch" (eager fp32), "int8" (dynamic
+    # quantization) or "onnx" (ONNX Runtime, exported graph cached in onnx_cache_dir)
+    text_moderation_model: str = "unitary/toxic-bert"
+    text_moderation_backend: str = "torch"
+    nsfw_image_model: str = "Falconsai/nsfw_image_detection"
+    nsfw_image_backend: str = "torch"
+    clip_model: str = "openai/clip-vit-base-patch32"
+    clip_backend: str = "torch"
+    embedding_model: str = "all-MiniLM-L6-v2"
+    embedding_backend: str = "torch"
+    onnx_cache_dir: str = os.path.join(BACKEND_DIR, "onnx_cache")
+    inference_num_threads: Optional[int] = None
+    # Load models in a background thread right after startup (False: load on first use)
+    model_warmup_on_startup: bool = True
+    model_warmup_batch_size: int = 4
+    # After a failed load the model is not retried for this long, doubling per
+    # consecutive failure up to the max (requests keep getting 503 meanwhile)
+    model_load_retry_base_seconds: float = 30.0
+    model_load_retry_max_seconds: float = 600.0
+    # Shared model server (Unix socket path, host:port or \\.\pipe\name on Windows)
+    # Unset: every worker runs inference in-process
+    model_server_address: Optional[str] = None
+    model_server_timeout: float = 30.0
+    model_server_max_batch_size: int = 16
+    model_server_max_wait_ms: int = 10
+    model_server_queue_size: int = 256
+    # Connection secret shared by the server and the workers (payloads are pickled).
+    # Required with model_server_address, must differ from secret_key
+    model_server_authkey: Optional[str] = None
+    # Allow a TCP address on a non-loopback interface (the port must not be reachable
+    # from untrusted networks)
+    model_server_allow_remote: bool = False
+    # Fall back to in-process models while the server is unreachable
+    model_server_fallback_local: bool = True
+    model_server_retry_interval: float = 30.0
+
+    # Moderation cascade: spam rules + lexicon prefilter, then an optional distilled
+    # classifier, only ambiguous text reaches text_moderation_model
+    moderation_cascade_enabled: bool = True
+    cascade_safe_max_words: int = 12
+    cascade_distilled_model: Optional[str] = None
+    cascade_distilled_backend: str = "int8"
+    cascade_distilled_toxic_label: str = "toxic"
+    # Calibrated on a labelled corpus (evaluate_moderation_cascade.py), scores in between escalate
+    cascade_distilled_safe_threshold: float = 0.05
+    cascade_distilled_toxic_threshold: float = 0.95
+
+    # Near-duplicate (MinHash/LSH) index of recent posts and comments
+    near_duplicate_enabled: bool = True
+    near_duplicate_threshold: float = 0.8  # estimated Jaccard similarity of word 3-shingles
+    near_duplicate_num_perm: int = 128
+    near_duplicate_bands: int = 32
+    near_duplicate_window_seconds: float = 6 * 3600
+    near_duplicate_max_entries: int = 200000
+    near_duplicate_min_words: int = 6  # shorter texts ("great post!") are never matched
+    near_duplicate_burst_min_users: int = 3
+
+    # Per-route request limits ("<count>/<second|minute|hour|day>") per user and per IP
+    rate_limit_enabled: bool = True
+    rate_limits: Dict[str, str] = {
+        "create_post": "10/minute",
+        "update_post": "20/minute",
+        "create_comment": "30/minute",
+        "toggle_like": "120/minute",
+        "login": "10/minute",
+        "register": "5/hour",
+    }
+    # Per-IP limit = per-user limit x multiplier (users behind NAT share an address)
+    rate_limit_ip_multiplier: float = 5.0
+    rate_limit_max_keys: int = 1_000_000
+    # Use the first X-Forwarded-For address (only behind a trusted reverse proxy)
+    rate_limit_trust_forwarded_for: bool = False
+
+    # Storage backend: "firestore" or "sqlite" (embedded, single node / offline load tests)
+    storage_backend: str = "firestore"
+    sqlite_path: str = os.path.join(BACKEND_DIR, "data", "social.db")
+
+    # Async Firestore clients (one gRPC channel each) shared round-robin by the API
+    firestore_channel_pool_size: int = 4
+    # Read only the fields each call site needs (server-side select() projections)
+    firestore_projections: bool = True
+
+    # Read-through cache of user documents (current user and post/comment authors)
+    user_cache_enabled: bool = True
+    # Also the revocation delay: tokens are checked against the cached token_version,
+    # so after logout-all another worker keeps accepting the old tokens until its
+    # entry expires (up to this long) unless user_cache_invalidation_group is set
+    user_cache_ttl_seconds: float = 30.0
+    user_cache_max_entries: int = 100000
+    # "<multicast ip>:<port>" to broadcast invalidations to the other workers (None = local only)
+    user_cache_invalidation_group: Optional[str] = None
+
+    # Background cascade of post deletions (likes, comments, counter shards)
+    post_deletion_workers: int = 1
+    post_deletion_max_attempts: int = 5
+    post_deletion_retry_base_seconds: float = 2.0
+
+    # Background rewrite of author snapshots (username, avatar) on posts and comments
+    author_snapshot_workers: int = 1
+    author_snapshot_max_attempts: int = 5
+    author_snapshot_retry_base_seconds: float = 2.0
+
+    # Both kinds of job are claimed by one process at a time (status running) for
+    # this long, renewed on progress; an expired claim is taken over on the next
+    # startup. *_max_attempts counts attempts of all processes, then the job is dead
+    background_job_lease_seconds: float = 300.0
+
+    # Sharded engagement counters for hot posts (0 shards = always count on the post document)
+    counter_shards: int = 0
+    counter_hot_threshold: int = 1000  # likes before a post switches to sharded counters
+    counter_shard_cache_seconds: float = 5.0
+
+    # Offset pagination (?page=N) may skip at most this many documents, deeper pages need a cursor
+    pagination_max_offset: int = 1000
+    # Documents read per request when list filters are applied in memory
+    pagination_max_scan: int = 500
+
+    # Admission control around moderation/embedding inference (per worker)
+    admission_enabled: bool = True
+    admission_max_concurrency: int = 2
+    # Queue wait p95 above this degrades to fallbacks, above shed_queue_ms requests get 429
+    admission_queue_slo_ms: float = 250
+    admission_shed_queue_ms: float = 2000
+    admission_max_queue: int = 64
+    admission_window_seconds: float = 10.0
+    admission_recovery_seconds: float = 15.0
+    # Consecutive inference errors that open the circuit (degraded for a recovery period)
+    admission_failure_threshold: int = 5
+    # Degraded text moderation: "rules" (keyword/spam rules) or "pending" (hold for review)
+    admission_moderation_degrade: str = "rules"
+    admission_retry_after: int = 5
+
+    # Retry-After (seconds) sent with 503 while moderation models are not ready
+    model_not_ready_retry_after: int = 5
+
     class Config:
-        env_file = os.path.join(Path(__file__).parent.parent, ".env")
+        env_file = os.path.join(BACKEND_DIR, ".env")
         env_file_encoding = 'utf-8'
+        # The model_* settings are ours, not pydantic's (silences its namespace warnings)
+        protected_namespaces = ('settings_',)
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
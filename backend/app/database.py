@@ -1,20 +1,66 @@
 import firebase_admin
 from firebase_admin import credentials, firestore
+from google.cloud.firestore import AsyncClient
+import itertools
 import os
 
-# Global Firestore client
+from app.config import settings
+from app.storage.sqlite import SqliteClient, AsyncSqliteClient
+
+# Global Firestore clients: sync for scripts and batch jobs, a pool of async
+# clients (one gRPC channel each) for the API
+# With STORAGE_BACKEND=sqlite both are the embedded SQLite store instead
 db = None
+_credential = None
+_async_clients = []
+_async_cycle = None
+
+def _use_sqlite() -> bool:
+    return settings.storage_backend == "sqlite"
+
+def get_database() -> AsyncClient:
+    """
+    Get an async Firestore client for request handlers, round-robin over the pool
+    Clients are created on first use so their channels bind to the serving event loop
+    """
+    global _async_clients, _async_cycle
+    if _use_sqlite() and db is not None:
+        if not _async_clients:
+            _async_clients = [AsyncSqliteClient(db)]
+        return _async_clients[0]
+    if _credential is None:
+        raise Exception("Database not initialized. Call connect_to_firestore() first.")
+    if not _async_clients:
+        _async_clients = [
+            AsyncClient(project=_credential.project_id, credentials=_credential.get_credential())
+            for _ in range(max(1, settings.firestore_channel_pool_size))
+        ]
+        _async_cycle = itertools.cycle(_async_clients)
+    return next(_async_cycle)
 
-def get_database():
-    """Get the Firestore database instance"""
+def get_sync_database():
+    """Get the synchronous Firestore client (scripts and batch jobs)"""
     global db
     if db is None:
         raise Exception("Database not initialized. Call connect_to_firestore() first.")
     return db
 
+async def run_in_transaction(db, fn, *args):
+    """
+    Run `await fn(transaction, *args)` as a transaction and return its result
+    Firestore retries fn when a document it read changed before the commit
+    """
+    if isinstance(db, AsyncSqliteClient):
+        return await db.run_transaction(fn, *args)
+    return await firestore.async_transactional(fn)(db.transaction(), *args)
+
 async def connect_to_firestore():
-    """Initialize Firebase Admin SDK and connect to Firestore"""
-    global db
+    """Initialize Firebase Admin SDK and connect to Firestore (or open the SQLite store)"""
+    global db, _credential
+    if _use_sqlite():
+        db = SqliteClient(settings.sqlite_path)
+        print(f"[SUCCESS] Opened SQLite storage at {settings.sqlite_path}")
+        return
     try:
         # Path to Firebase credentials file
         cred_path = os.path.join(os.path.dirname(__file__), "..", "firebase-credentials.json")
@@ -25,6 +71,7 @@ async def connect_to_firestore():
         # Initialize Firebase Admin SDK
         cred = credentials.Certificate(cred_path)
         firebase_admin.initialize_app(cred)
+        _credential = cred
 
         # Get Firestore client
         db = firestore.client()
@@ -45,13 +92,21 @@ async def connect_to_firestore():
 
 async def close_firestore_connection():
     """Close Firestore connection"""
-    global db
+    global db, _credential, _async_clients, _async_cycle
     try:
+        # Async clients release their channels when garbage collected
+        for client in _async_clients:
+            if isinstance(client, AsyncSqliteClient):
+                client.close()
+        _async_clients, _async_cycle = [], None
+        if isinstance(db, SqliteClient):
+            db.close()
         # Firebase Admin SDK handles connection cleanup automatically
         if firebase_admin._apps:
             firebase_admin.delete_app(firebase_admin.get_app())
         db = None
-        print("[INFO] Closed Firestore connection")
+        _credential = None
+        print("[INFO] Closed database connection")
     except Exception as e:
         print(f"[WARNING] Error closing Firestore connection: {e}")
 
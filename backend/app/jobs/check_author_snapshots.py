@@ -0,0 +1,133 @@
+"""
+Author Snapshot Consistency Check
+Scans posts and comments and compares their author snapshot (see
+app/services/author_snapshots.py) with the author's user document. Snapshots
+that are missing (documents created before snapshots existed) or stale (a
+fan-out that failed or has not run yet) are reported, and rewritten with
+--repair in batched writes. Documents whose author no longer exists are only
+counted.
+
+Documents are read in pages ordered by id, projected to user_id and author;
+authors are read once per page in one batched read.
+
+Usage:
+    python -m app.jobs.check_author_snapshots
+    python -m app.jobs.check_author_snapshots --repair --max-writes-per-sec 200
+    python -m app.jobs.check_author_snapshots --collections comments --verbose
+"""
+from typing import Dict, List
+import argparse
+import asyncio
+import logging
+
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from app.database import connect_to_firestore, get_sync_database
+from app.jobs.remoderation import RateLimiter
+from app.services.author_snapshots import AUTHOR_FIELD, AUTHORED_COLLECTIONS, SNAPSHOT_FIELDS, author_snapshot
+from app.utils.firestore_helpers import MAX_BATCH_WRITES, doc_to_dict, projection, select_fields
+
+logger = logging.getLogger(__name__)
+
+
+class AuthorSnapshotCheck:
+    def __init__(self, args):
+        self.args = args
+        self.db = get_sync_database()
+        self.reads = RateLimiter(args.max_reads_per_sec)
+        self.writes = RateLimiter(args.max_writes_per_sec)
+        self.counts = {"scanned": 0, "ok": 0, "missing": 0, "stale": 0, "orphaned": 0, "repaired": 0}
+
+    def _pages(self, collection: str):
+        query = select_fields(
+            self.db.collection(collection).order_by(FieldPath.document_id()),
+            ("user_id", AUTHOR_FIELD)
+        ).limit(self.args.page_size)
+        page_query = query
+        while True:
+            self.reads.acquire(self.args.page_size)
+            page = list(page_query.stream())
+            if not page:
+                return
+            yield page
+            if len(page) < self.args.page_size:
+                return
+            page_query = query.start_after(page[-1])
+
+    def _snapshots(self, user_ids: List[str]) -> Dict[str, Dict]:
+        """Expected snapshot per author id (one batched read)"""
+        user_ids = [user_id for user_id in dict.fromkeys(user_ids) if user_id]
+        if not user_ids:
+            return {}
+        self.reads.acquire(len(user_ids))
+        refs = [self.db.collection('users').document(user_id) for user_id in user_ids]
+        users = [doc_to_dict(doc) for doc in self.db.get_all(refs, field_paths=projection(SNAPSHOT_FIELDS))]
+        return {user["id"]: author_snapshot(user) for user in users if user}
+
+    def _check_page(self, collection: str, page) -> List:
+        expected = self._snapshots([doc.to_dict().get("user_id") for doc in page])
+        repairs = []
+        for doc in page:
+            self.counts["scanned"] += 1
+            item = doc.to_dict()
+            snapshot = expected.get(item.get("user_id"))
+            if snapshot is None:
+                self.counts["orphaned"] += 1
+                continue
+            current = item.get(AUTHOR_FIELD)
+            if current == snapshot:
+                self.counts["ok"] += 1
+                continue
+            self.counts["missing" if current is None else "stale"] += 1
+            if self.args.verbose:
+                print(f"[SNAPSHOTS] {collection}/{doc.id}: {current} -> {snapshot}")
+            repairs.append((doc.reference, snapshot))
+        return repairs
+
+    def _repair(self, repairs: List):
+        for start in range(0, len(repairs), MAX_BATCH_WRITES):
+            chunk = repairs[start:start + MAX_BATCH_WRITES]
+            self.writes.acquire(len(chunk))
+            batch = self.db.batch()
+            for ref, snapshot in chunk:
+                batch.update(ref, {AUTHOR_FIELD: snapshot})
+            batch.commit()
+            self.counts["repaired"] += len(chunk)
+
+    def run(self) -> Dict:
+        for collection in self.args.collections:
+            for page in self._pages(collection):
+                repairs = self._check_page(collection, page)
+                if repairs and self.args.repair:
+                    self._repair(repairs)
+                print(f"[SNAPSHOTS] {collection}: scanned {self.counts['scanned']}, "
+                      f"missing {self.counts['missing']}, stale {self.counts['stale']}, "
+                      f"repaired {self.counts['repaired']}")
+        return dict(self.counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find (and repair) missing or stale author snapshots")
+    parser.add_argument("--repair", action="store_true", help="Rewrite missing and stale snapshots")
+    parser.add_argument("--collections", nargs="+", choices=AUTHORED_COLLECTIONS, default=list(AUTHORED_COLLECTIONS))
+    parser.add_argument("--verbose", action="store_true", help="Print every inconsistent document")
+    parser.add_argument("--page-size", type=int, default=500, help="Documents read per query")
+    parser.add_argument("--max-reads-per-sec", type=float, default=1000, help="0 = unlimited")
+    parser.add_argument("--max-writes-per-sec", type=float, default=200, help="0 = unlimited")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(connect_to_firestore())
+
+    print("=" * 60)
+    print(f"CHECKING AUTHOR SNAPSHOTS{' (REPAIR)' if args.repair else ''}")
+    print("=" * 60)
+
+    counts = AuthorSnapshotCheck(args).run()
+    print("-" * 60)
+    for key, value in counts.items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
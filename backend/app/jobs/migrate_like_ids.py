@@ -0,0 +1,163 @@
+"""
+Like Document Id Migration
+Rewrites like documents created with auto-generated ids to the deterministic
+id like_id(post_id, user_id), so like status is a direct document get. Each
+legacy document is copied to its new id and deleted in the same batched write.
+Duplicate likes of the same post by the same user (possible with the old
+query-then-add toggle) collapse into one document; --fix-counts recomputes
+likes_count for the affected posts.
+
+The migration is idempotent: documents already at their deterministic id are
+skipped, so an interrupted run can simply be started again.
+
+Usage:
+    python -m app.jobs.migrate_like_ids --dry-run
+    python -m app.jobs.migrate_like_ids --fix-counts --max-writes-per-sec 200
+"""
+from typing import Dict, List, Set
+import argparse
+import asyncio
+import logging
+
+from google.cloud.firestore_v1.base_query import FieldFilter
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from app.database import connect_to_firestore, get_sync_database
+from app.jobs.remoderation import RateLimiter
+from app.utils.firestore_helpers import MAX_BATCH_WRITES, like_id
+
+logger = logging.getLogger(__name__)
+
+
+class LikeIdMigration:
+    def __init__(self, args):
+        self.args = args
+        self.db = get_sync_database()
+        self.likes_ref = self.db.collection('likes')
+        self.reads = RateLimiter(args.max_reads_per_sec)
+        self.writes = RateLimiter(args.max_writes_per_sec)
+        self.counts = {"scanned": 0, "already_migrated": 0, "migrated": 0, "duplicates_removed": 0, "invalid": 0}
+        self.affected_posts: Set[str] = set()
+        # Deterministic ids written during this run (duplicates within the run)
+        self._written: Set[str] = set()
+
+    def _pages(self):
+        last_snapshot = None
+        while True:
+            query = self.likes_ref.order_by(FieldPath.document_id()).limit(self.args.page_size)
+            if last_snapshot is not None:
+                query = query.start_after(last_snapshot)
+            self.reads.acquire(self.args.page_size)
+            page = list(query.stream())
+            if not page:
+                return
+            yield page
+            if len(page) < self.args.page_size:
+                return
+            last_snapshot = page[-1]
+
+    def _existing(self, ids: List[str]) -> Set[str]:
+        """Which deterministic ids already exist (one batched read)"""
+        ids = [target for target in dict.fromkeys(ids) if target not in self._written]
+        if not ids:
+            return set()
+        self.reads.acquire(len(ids))
+        return {doc.id for doc in self.db.get_all([self.likes_ref.document(target) for target in ids]) if doc.exists}
+
+    def _migrate_page(self, page):
+        legacy = []
+        for snapshot in page:
+            self.counts["scanned"] += 1
+            like = snapshot.to_dict()
+            if not like.get("post_id") or not like.get("user_id"):
+                self.counts["invalid"] += 1
+                logger.warning(f"Like {snapshot.id} has no post_id/user_id, left untouched")
+                continue
+            target = like_id(like["post_id"], like["user_id"])
+            if snapshot.id == target:
+                self.counts["already_migrated"] += 1
+                continue
+            legacy.append((snapshot, like, target))
+        if not legacy:
+            return
+
+        existing = self._existing([target for _, _, target in legacy]) | self._written
+        # One group per legacy document, a group never spans two batched writes
+        groups = []  # [(op, ref, data)]
+        for snapshot, like, target in legacy:
+            if target in existing:
+                # The user already has a like on this post, drop the duplicate
+                self.counts["duplicates_removed"] += 1
+                self.affected_posts.add(like["post_id"])
+                groups.append([("delete", snapshot.reference, None)])
+                continue
+            existing.add(target)
+            self._written.add(target)
+            self.counts["migrated"] += 1
+            groups.append([("set", self.likes_ref.document(target), like), ("delete", snapshot.reference, None)])
+
+        if not self.args.dry_run:
+            self._apply(groups)
+
+    def _apply(self, groups: List[List]):
+        chunk: List = []
+        for group in groups + [None]:
+            if chunk and (group is None or len(chunk) + len(group) > MAX_BATCH_WRITES):
+                self.writes.acquire(len(chunk))
+                batch = self.db.batch()
+                for op, ref, data in chunk:
+                    if op == "set":
+                        batch.set(ref, data)
+                    else:
+                        batch.delete(ref)
+                batch.commit()
+                chunk = []
+            if group is not None:
+                chunk.extend(group)
+
+    def _fix_counts(self):
+        """Recompute likes_count from the like documents for posts that had duplicates"""
+        for post_id in sorted(self.affected_posts):
+            query = self.likes_ref.where(filter=FieldFilter('post_id', '==', post_id))
+            likes_count = int(query.count().get()[0][0].value)
+            print(f"[LIKES] post {post_id}: likes_count -> {likes_count}")
+            if not self.args.dry_run:
+                self.writes.acquire(1)
+                self.db.collection('posts').document(post_id).update({'likes_count': likes_count})
+
+    def run(self) -> Dict:
+        for page in self._pages():
+            self._migrate_page(page)
+            print(f"[LIKES] scanned {self.counts['scanned']}, "
+                  f"{'would migrate' if self.args.dry_run else 'migrated'} {self.counts['migrated']}, "
+                  f"duplicates {self.counts['duplicates_removed']}")
+        if self.args.fix_counts and self.affected_posts:
+            self._fix_counts()
+        return dict(self.counts, affected_posts=len(self.affected_posts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rewrite like documents to deterministic ids")
+    parser.add_argument("--dry-run", action="store_true", help="Count changes without writing them")
+    parser.add_argument("--fix-counts", action="store_true",
+                        help="Recompute likes_count of posts that had duplicate likes")
+    parser.add_argument("--page-size", type=int, default=500, help="Documents read per query")
+    parser.add_argument("--max-reads-per-sec", type=float, default=1000, help="0 = unlimited")
+    parser.add_argument("--max-writes-per-sec", type=float, default=200, help="0 = unlimited")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(connect_to_firestore())
+
+    print("=" * 60)
+    print(f"MIGRATING LIKE IDS{' (DRY RUN)' if args.dry_run else ''}")
+    print("=" * 60)
+
+    counts = LikeIdMigration(args).run()
+    print("-" * 60)
+    for key, value in counts.items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""
+Batch Re-moderation Job
+Re-evaluates existing posts (text + image) and comments after a threshold change
+or model upgrade. Documents are streamed page by page in document-id order,
+moderated with batched inference, and only documents whose verdict changed are
+written back (Firestore batched writes). Progress is checkpointed after every
+page so an interrupted run can be resumed.
+
+Usage:
+    python -m app.jobs.remoderation --dry-run --report remoderation_report.json
+    python -m app.jobs.remoderation --collections posts --max-writes-per-sec 50
+    python -m app.jobs.remoderation --resume           # continue after an interruption
+    python -m app.jobs.remoderation --only-deferred    # posts held for review under load
+"""
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import time
+import logging
+
+from google.cloud.firestore_v1.base_query import FieldFilter
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from app.config import BACKEND_DIR
+from app.database import connect_to_firestore, get_sync_database
+from app.services.image_store import image_store, hash_from_reference, is_data_url
+from app.services.admission import image_unchecked
+from app.utils.firestore_helpers import MAX_BATCH_WRITES
+
+logger = logging.getLogger(__name__)
+
+COLLECTIONS = ("posts", "comments")
+# Flags compared between the stored and the new text verdict
+VERDICT_FLAGS = ("is_toxic", "is_spam", "is_hate_speech")
+
+
+class RateLimiter:
+    """Token bucket limiting database operations per second (0 = unlimited)"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def acquire(self, n: int = 1):
+        if self.rate <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Requests larger than the bucket are let through once it is full
+            if self.tokens >= min(n, self.rate):
+                self.tokens -= n
+                return
+            time.sleep((min(n, self.rate) - self.tokens) / self.rate)
+
+
+class Checkpoint:
+    """Last processed document id and counters per collection, stored as JSON"""
+
+    def __init__(self, path: str, resume: bool):
+        self.path = path
+        self.state: Dict[str, Dict] = {}
+        if resume and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.state = json.load(f)
+            print(f"[REMODERATION] Resuming from checkpoint {path}")
+
+    def collection(self, name: str) -> Dict:
+        return self.state.setdefault(name, {"last_id": None, "scanned": 0, "changed": 0, "done": False})
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def _load_image(image_url: str):
+    """Decode a post image: blob store reference, legacy data URL or external URL"""
+    from PIL import Image
+
+    image_hash = hash_from_reference(image_url)
+    if image_hash:
+        path = image_store.get_path(image_hash)
+        if path is None:
+            raise FileNotFoundError(f"blob {image_hash} missing from the image store")
+        with Image.open(path) as source:
+            return source.convert("RGB")
+    if is_data_url(image_url):
+        data = base64.b64decode(image_url.split(",", 1)[1])
+    else:
+        import httpx
+        response = httpx.get(image_url, timeout=10.0)
+        response.raise_for_status()
+        data = response.content
+    return Image.open(io.BytesIO(data)).convert("RGB")
+
+
+def _flags(moderation_result: Optional[Dict]) -> Dict[str, bool]:
+    moderation_result = moderation_result or {}
+    return {flag: bool(moderation_result.get(flag, False)) for flag in VERDICT_FLAGS}
+
+
+class RemoderationJob:
+    def __init__(self, args):
+        from app.services.moderation_service import ContentModerationService, ImageModerationService
+
+        self.args = args
+        self.db = get_sync_database()
+        self.text_service = ContentModerationService()
+        if self.text_service.classifier is None:
+            raise RuntimeError("text moderation model failed to load, refusing to re-moderate with rules only")
+        self.image_service = None if args.skip_images else ImageModerationService()
+        if self.image_service is not None and not self.image_service.classifier and not self.image_service.clip_classifier:
+            raise RuntimeError("image moderation models failed to load, refusing to re-moderate images (use --skip-images)")
+        self.reads = RateLimiter(args.max_reads_per_sec)
+        self.writes = RateLimiter(args.max_writes_per_sec)
+        self.checkpoint = Checkpoint(args.checkpoint, args.resume)
+        self.changes: List[Dict] = []
+        self.errors: List[Dict] = []
+        # Held posts whose image got no new verdict, left deferred
+        self.held: List[str] = []
+
+    def _pages(self, collection: str):
+        """Yield pages of documents in id order, starting after the checkpoint"""
+        state = self.checkpoint.collection(collection)
+        collection_ref = self.db.collection(collection)
+        while True:
+            query = collection_ref.order_by(FieldPath.document_id()).limit(self.args.page_size)
+            if state["last_id"]:
+                query = query.where(filter=FieldFilter(
+                    FieldPath.document_id(), ">", collection_ref.document(state["last_id"])
+                ))
+            self.reads.acquire(self.args.page_size)
+            page = list(query.stream())
+            if not page:
+                return
+            yield page
+            if len(page) < self.args.page_size:
+                return
+
+    def _moderate_images(self, docs: List[Dict]) -> Dict[str, Dict]:
+        """Image results by document id for the documents that have an image"""
+        with_images = [doc for doc in docs if doc.get("image_url")]
+        if not with_images or self.image_service is None:
+            return {}
+        images, ids = [], []
+        for doc in with_images:
+            try:
+                images.append(_load_image(doc["image_url"]))
+                ids.append(doc["id"])
+            except Exception as e:
+                self.errors.append({"id": doc["id"], "error": f"image: {e}"})
+        results = {}
+        for start in range(0, len(images), self.args.batch_size):
+            batch_results = self.image_service.moderate_images_sync(images[start:start + self.args.batch_size])
+            results.update(zip(ids[start:start + self.args.batch_size], batch_results))
+        return results
+
+    def _evaluate(self, collection: str, docs: List[Dict]) -> List[Tuple[Dict, Dict]]:
+        """(document, update) for every document whose verdict changed"""
+        texts = [doc.get("content", "") for doc in docs]
+        text_results = []
+        for start in range(0, len(texts), self.args.batch_size):
+            text_results.extend(self.text_service.moderate_texts_sync(texts[start:start + self.args.batch_size]))
+        image_results = self._moderate_images(docs) if collection == "posts" else {}
+
+        updates = []
+        for doc, text_result in zip(docs, text_results):
+            blocked = (text_result["is_toxic"] or text_result["is_spam"] or text_result["is_hate_speech"])
+            image_result = image_results.get(doc["id"])
+            if image_result is None and collection == "posts" and image_unchecked(doc):
+                # No model has seen this image (--skip-images or it failed to load), keep it held
+                self.held.append(doc["id"])
+                continue
+            image_passed = image_result["passed"] if image_result else doc.get("image_moderation_passed", True)
+            new_approved = not blocked and image_passed
+            old_approved = doc.get("is_approved", True)
+
+            changed = (
+                new_approved != old_approved or
+                _flags(text_result) != _flags(doc.get("moderation_result")) or
+                image_passed != doc.get("image_moderation_passed", True) or
+                doc.get("moderation_deferred", False)
+            )
+            if not changed and not self.args.rewrite_all:
+                continue
+
+            update = {
+                "moderation_result": text_result,
+                "is_approved": new_approved,
+                "remoderated_at": datetime.utcnow()
+            }
+            if collection == "posts":
+                update["image_moderation_passed"] = image_passed
+                update["moderation_deferred"] = False
+            updates.append((doc, update))
+            self.changes.append({
+                "collection": collection,
+                "id": doc["id"],
+                "old_approved": old_approved,
+                "new_approved": new_approved,
+                "old_flags": _flags(doc.get("moderation_result")),
+                "new_flags": _flags(text_result),
+                "image_passed": image_passed,
+                "details": text_result.get("details"),
+            })
+        return updates
+
+    def _apply(self, collection: str, updates: List[Tuple[Dict, Dict]]):
+        for start in range(0, len(updates), MAX_BATCH_WRITES):
+            chunk = updates[start:start + MAX_BATCH_WRITES]
+            self.writes.acquire(len(chunk))
+            batch = self.db.batch()
+            for doc, update in chunk:
+                batch.update(self.db.collection(collection).document(doc["id"]), update)
+            batch.commit()
+
+    def run_collection(self, collection: str):
+        state = self.checkpoint.collection(collection)
+        if state["done"]:
+            print(f"[REMODERATION] {collection}: already done in checkpoint, skipping")
+            return
+
+        for page in self._pages(collection):
+            docs = []
+            for snapshot in page:
+                doc = snapshot.to_dict()
+                doc["id"] = snapshot.id
+                docs.append(doc)
+            if self.args.only_deferred:
+                docs = [doc for doc in docs if doc.get("moderation_deferred")]
+
+            updates = self._evaluate(collection, docs) if docs else []
+            if updates and not self.args.dry_run:
+                self._apply(collection, updates)
+
+            state["last_id"] = page[-1].id
+            state["scanned"] += len(page)
+            state["changed"] += len(updates)
+            self.checkpoint.save()
+            print(f"[REMODERATION] {collection}: scanned {state['scanned']}, "
+                  f"{'would change' if self.args.dry_run else 'changed'} {state['changed']}")
+
+        state["done"] = True
+        self.checkpoint.save()
+
+    def run(self):
+        for collection in self.args.collections:
+            self.run_collection(collection)
+
+    def report(self) -> Dict:
+        newly_blocked = sum(1 for c in self.changes if c["old_approved"] and not c["new_approved"])
+        newly_approved = sum(1 for c in self.changes if not c["old_approved"] and c["new_approved"])
+        return {
+            "dry_run": self.args.dry_run,
+            "model": self.text_service.model_name,
+            "collections": self.checkpoint.state,
+            "changed": len(self.changes),
+            "newly_blocked": newly_blocked,
+            "newly_approved": newly_approved,
+            "changes": self.changes,
+            "errors": self.errors,
+            "held": self.held,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-moderate existing posts and comments")
+    parser.add_argument("--collections", nargs="+", choices=COLLECTIONS, default=list(COLLECTIONS))
+    parser.add_argument("--dry-run", action="store_true", help="Report changes without writing them")
+    parser.add_argument("--report", default="remoderation_report.json")
+    parser.add_argument("--page-size", type=int, default=200, help="Documents read per query")
+    parser.add_argument("--batch-size", type=int, default=32, help="Items per inference call")
+    parser.add_argument("--max-reads-per-sec", type=float, default=500, help="0 = unlimited")
+    parser.add_argument("--max-writes-per-sec", type=float, default=100, help="0 = unlimited")
+    parser.add_argument("--checkpoint", default=os.path.join(BACKEND_DIR, "remoderation_checkpoint.json"))
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint file")
+    parser.add_argument("--only-deferred", action="store_true",
+                        help="Only posts whose moderation was deferred under load")
+    parser.add_argument("--skip-images", action="store_true", help="Keep the stored image verdicts")
+    parser.add_argument("--rewrite-all", action="store_true",
+                        help="Rewrite moderation_result even when the verdict is unchanged")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(connect_to_firestore())
+
+    print("=" * 60)
+    print(f"RE-MODERATING {', '.join(args.collections).upper()}{' (DRY RUN)' if args.dry_run else ''}")
+    print("=" * 60)
+
+    job = RemoderationJob(args)
+    try:
+        job.run()
+    finally:
+        report = job.report()
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+        print("-" * 60)
+        print(f"Changed: {report['changed']} (newly blocked {report['newly_blocked']}, "
+              f"newly approved {report['newly_approved']}), errors: {len(report['errors'])}, "
+              f"still held (image not moderated): {len(report['held'])}")
+        print(f"Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
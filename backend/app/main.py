@@ -1,20 +1,41 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import connect_to_firestore, close_firestore_connection, init_database
+from app.config import settings
+from app.database import connect_to_firestore, close_firestore_connection, init_database, get_database
+from app.services.model_registry import model_registry
+from app.services.inference_backends import check_configured_backends
+from app.services.model_client import check_model_server_settings
+from app.services.user_cache import user_cache, invalidation_channel
+from app.services.post_deletion import post_deletion_worker
+from app.services.author_snapshots import author_snapshot_worker
 from app.routes import auth
 from app.routes import posts
 from app.routes import comments
 from app.routes import likes
+from app.routes import images
+from app.routes import health
 
 
 @asynccontextmanager
 async def lifespan(_app: FastAPI):
     # Startup
+    # Fail fast on an inference backend whose runtime is not installed
+    check_configured_backends()
+    check_model_server_settings()
     await connect_to_firestore()
     await init_database()
+    await invalidation_channel.start(user_cache)
+    await post_deletion_worker.start(get_database())
+    await author_snapshot_worker.start(get_database())
+    # Load models in the background so startup (and --reload) is not blocked on them
+    if settings.model_warmup_on_startup:
+        model_registry.warm_up_in_background()
     yield
     # Shutdown
+    invalidation_channel.stop()
+    await post_deletion_worker.stop()
+    await author_snapshot_worker.stop()
     await close_firestore_connection()
 
 
@@ -36,6 +57,8 @@ app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(posts.router, prefix="/api/posts", tags=["Posts"])
 app.include_router(comments.router, prefix="/api/posts", tags=["Comments"])
 app.include_router(likes.router, prefix="/api/posts", tags=["Likes"])
+app.include_router(images.router, prefix="/api/images", tags=["Images"])
+app.include_router(health.router, prefix="/health", tags=["Health"])
 
 @app.get("/")
 async def root():
@@ -25,6 +25,7 @@ class ModerationResult(BaseModel):
     is_hate_speech: bool = False
     confidence_score: float = 0.0
     details: Optional[str] = None
+    moderation_tier: Optional[str] = None
 
 class PostModel(BaseModel):
     id: Optional[PyObjectId] = Field(default_factory=PyObjectId, alias="_id")
@@ -36,7 +37,9 @@ class PostModel(BaseModel):
 
     # AI Moderation Results
     moderation_result: Optional[ModerationResult] = None
-    image_moderation_passed: bool = True
+    image_moderation_passed: Optional[bool] = True  # None: image held for review, not checked yet
+    moderation_deferred: bool = False  # Moderation skipped under load, held for review
+    near_duplicate_burst: bool = False  # Part of a near-duplicate wave from many accounts
     is_approved: bool = True  # Auto-approve if moderation passes
 
     # Engagement metrics
@@ -1,29 +1,46 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from app.utils.dependencies import get_current_user
+from app.utils.rate_limit import rate_limit
 from datetime import timedelta
+from google.cloud import firestore
+from google.cloud.firestore_v1.base_query import FieldFilter
+import asyncio
 from app.schemas.user import UserRegister, UserLogin, Token, UserResponse, UserPreferences, UserUpdate
-from app.utils.security import get_password_hash, verify_password, create_access_token
+from app.utils.security import get_password_hash, verify_password, create_access_token, user_claims
 from app.database import get_database
 from app.config import settings
 from app.utils.firestore_helpers import doc_to_dict
+from app.services.user_cache import user_cache
+from app.services.author_snapshots import (
+    JOBS_COLLECTION as AUTHOR_SNAPSHOT_JOBS,
+    author_snapshot_worker,
+    snapshot_changed,
+    snapshot_job
+)
 
 router = APIRouter()
 
-@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/register",
+    response_model=UserResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit("register", per_user=False))]
+)
 async def register(user_data: UserRegister):
     db = get_database()
 
-    # Check username exists
+    # Check username and email exist (independent queries, run concurrently)
     users_ref = db.collection('users')
-    existing_username = users_ref.where('username', '==', user_data.username).limit(1).get()
+    existing_username, existing_email = await asyncio.gather(
+        users_ref.where(filter=FieldFilter('username', '==', user_data.username)).limit(1).get(),
+        users_ref.where(filter=FieldFilter('email', '==', user_data.email)).limit(1).get()
+    )
     if existing_username:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already exists"
         )
 
-    # Check email exists
-    existing_email = users_ref.where('email', '==', user_data.email).limit(1).get()
     if existing_email:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -42,18 +59,18 @@ async def register(user_data: UserRegister):
     }
 
     # Add document to Firestore
-    timestamp, doc_ref = users_ref.add(user_dict)
+    timestamp, doc_ref = await users_ref.add(user_dict)
     user_dict["id"] = doc_ref.id
 
     return UserResponse(**user_dict)
 
-@router.post("/login", response_model=Token)
-def login(user_data: UserLogin):
+@router.post("/login", response_model=Token, dependencies=[Depends(rate_limit("login", per_user=False))])
+async def login(user_data: UserLogin):
     db = get_database()
 
     # Find user
     users_ref = db.collection('users')
-    user_docs = users_ref.where('username', '==', user_data.username).limit(1).get()
+    user_docs = await users_ref.where(filter=FieldFilter('username', '==', user_data.username)).limit(1).get()
 
     if not user_docs:
         raise HTTPException(
@@ -75,7 +92,7 @@ def login(user_data: UserLogin):
     # Create token
     access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
     access_token = create_access_token(
-        data={"sub": user['id']},
+        data=user_claims(user),
         expires_delta=access_token_expires
     )
 
@@ -107,13 +124,24 @@ async def update_profile(
             detail="No fields to update"
         )
 
-    # Update user in Firestore
+    # Update user in Firestore, with a job to rewrite the author snapshot on the
+    # user's posts and comments when a snapshotted field changes (same batch)
     users_ref = db.collection('users')
-    users_ref.document(current_user['id']).update(update_data)
-
-    # Get updated user
-    updated_doc = users_ref.document(current_user['id']).get()
+    fan_out = snapshot_changed(current_user, update_data)
+    batch = db.batch()
+    batch.update(users_ref.document(current_user['id']), update_data)
+    if fan_out:
+        batch.set(db.collection(AUTHOR_SNAPSHOT_JOBS).document(current_user['id']), snapshot_job(current_user['id']))
+    await batch.commit()
+
+    # Get updated user (refresh the cache here, other workers drop their copy)
+    user_cache.invalidate(current_user['id'])
+    updated_doc = await users_ref.document(current_user['id']).get()
     updated_user = doc_to_dict(updated_doc)
+    if settings.user_cache_enabled:
+        user_cache.put(updated_user)
+    if fan_out:
+        author_snapshot_worker.enqueue(current_user['id'])
 
     return UserResponse(**updated_user)
 
@@ -132,16 +160,31 @@ async def update_preferences(
 
     # Update preferences in Firestore
     users_ref = db.collection('users')
-    users_ref.document(current_user['id']).update({
-        "preferences": preferences_dict
+    await users_ref.document(current_user['id']).update({
+        "preferences": preferences_dict,
+        # Carried in new access tokens, lets clients and caches spot stale preferences
+        "preferences_version": firestore.Increment(1)
     })
 
-    # Get updated user
-    updated_doc = users_ref.document(current_user['id']).get()
+    # Get updated user (refresh the cache here, other workers drop their copy)
+    user_cache.invalidate(current_user['id'])
+    updated_doc = await users_ref.document(current_user['id']).get()
     updated_user = doc_to_dict(updated_doc)
+    if settings.user_cache_enabled:
+        user_cache.put(updated_user)
 
     return UserResponse(**updated_user)
 
+@router.post("/logout-all", status_code=status.HTTP_204_NO_CONTENT)
+async def logout_all(current_user = Depends(get_current_user)):
+    """Revoke every access token issued to the current user so far"""
+    db = get_database()
+    await db.collection('users').document(current_user['id']).update({
+        "token_version": firestore.Increment(1)
+    })
+    user_cache.invalidate(current_user['id'])
+    return None
+
 @router.get("/me/preferences", response_model=UserPreferences)
 async def get_preferences(current_user = Depends(get_current_user)):
     """Get user preferences"""
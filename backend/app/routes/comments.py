@@ -1,19 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Dict, List, Optional
 from datetime import datetime
+import asyncio
 from google.cloud.firestore_v1.base_query import FieldFilter
 
 from app.models.user import UserModel
 from app.models.comment import CommentModel
 from app.schemas.comment import CommentCreate, CommentUpdate, CommentResponse, CommentListResponse
-from app.utils.dependencies import get_current_user
+from app.utils.dependencies import get_current_user, get_current_claims
+from app.utils.rate_limit import rate_limit
 from app.database import get_database
-from app.utils.firestore_helpers import doc_to_dict
+from app.config import settings
+from app.utils.firestore_helpers import doc_to_dict, get_fields, POST_COUNTER_FIELDS
+from app.utils.pagination import InvalidCursorError, fetch_page, keyset_query
+from app.services.hydration import hydrate_comments, comment_response
+from app.services.counters import COMMENTS_COUNT, increment_counter, apply_sharded_counts
+from app.services.near_duplicate import check_near_duplicates, index_content
+from app.services.author_snapshots import AUTHOR_FIELD, author_snapshot
 
 router = APIRouter()
 
 
-@router.post("/{post_id}/comments", response_model=CommentResponse, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/{post_id}/comments",
+    response_model=CommentResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit("create_comment"))]
+)
 async def create_comment(
     post_id: str,
     comment_data: CommentCreate,
@@ -24,87 +37,99 @@ async def create_comment(
     """
     db = get_database()
 
-    # Check if post exists
-    post_doc = db.collection('posts').document(post_id).get()
+    # Check if post exists (only its counter fields are needed)
+    post_doc = await get_fields(db.collection('posts').document(post_id), POST_COUNTER_FIELDS)
     if not post_doc.exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Post not found"
         )
 
+    # Reject near-duplicates of blocked content (spam waves)
+    duplicate_check = check_near_duplicates(comment_data.content, current_user['id'])
+    if duplicate_check is not None and duplicate_check.blocked_match is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Comment rejected: it duplicates content that was blocked"
+        )
+
     # Create comment
     comment_dict = {
         "post_id": post_id,
         "user_id": current_user['id'],
+        AUTHOR_FIELD: author_snapshot(current_user),
         "content": comment_data.content,
+        "near_duplicate_burst": bool(duplicate_check and duplicate_check.burst),
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow()
     }
 
-    timestamp, doc_ref = db.collection('comments').add(comment_dict)
+    # Insert the comment and increment the post's comments count atomically
+    doc_ref = db.collection('comments').document()
+    batch = db.batch()
+    batch.set(doc_ref, comment_dict)
+    increment_counter(batch, post_doc.reference, doc_to_dict(post_doc), COMMENTS_COUNT, 1)
+    await batch.commit()
     comment_dict['id'] = doc_ref.id
+    index_content(doc_ref.id, "comment", current_user['id'], duplicate_check)
 
-    # Update post comments count
-    post = doc_to_dict(post_doc)
-    new_count = post.get('comments_count', 0) + 1
-    db.collection('posts').document(post_id).update({'comments_count': new_count})
-
-    return CommentResponse(
-        id=comment_dict['id'],
-        post_id=post_id,
-        user_id=str(current_user['id']),
-        username=current_user['username'],
-        content=comment_dict["content"],
-        created_at=comment_dict["created_at"],
-        updated_at=comment_dict["updated_at"]
-    )
+    return comment_response(comment_dict, current_user['username'])
+
+
+def _is_visible(comment: Dict) -> bool:
+    """Comments hidden by re-moderation (app/jobs/remoderation.py) are skipped"""
+    return comment.get("is_approved", True) is not False
 
 
 @router.get("/{post_id}/comments", response_model=CommentListResponse)
 async def get_comments(
     post_id: str,
-    current_user: UserModel = Depends(get_current_user)
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user: UserModel = Depends(get_current_claims)
 ):
     """
-    Get all comments for a post
+    Get a page of comments for a post, newest first (ordered by created_at, id)
+    Pass next_cursor from the previous response as ?cursor= for the next page
     """
     db = get_database()
-
-    # Check if post exists
-    post_doc = db.collection('posts').document(post_id).get()
+    collection_ref = db.collection('comments')
+    comments_ref = collection_ref.where(filter=FieldFilter('post_id', '==', post_id))
+
+    # Check if post exists (its denormalized comments_count is the total) and get
+    # the page of comments, independent reads run concurrently
+    try:
+        post_doc, (comments, next_cursor) = await asyncio.gather(
+            get_fields(db.collection('posts').document(post_id), POST_COUNTER_FIELDS),
+            fetch_page(
+                keyset_query(comments_ref),
+                collection_ref,
+                limit,
+                cursor=cursor,
+                predicate=_is_visible,
+                max_scan=settings.pagination_max_scan
+            )
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     if not post_doc.exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Post not found"
         )
+    post = (await apply_sharded_counts(db, [doc_to_dict(post_doc)]))[0]
 
-    # Get comments
-    comments_ref = db.collection('comments')\
-        .where('post_id', '==', post_id)\
-        .order_by('created_at', direction='DESCENDING')
-    comments_docs = list(comments_ref.stream())
-
-    # Build responses with user info
-    comment_responses = []
-    for comment_doc in comments_docs:
-        comment = doc_to_dict(comment_doc)
-        user_doc = db.collection('users').document(comment["user_id"]).get()
-        user = doc_to_dict(user_doc)
-        username = user["username"] if user else "Unknown"
-
-        comment_responses.append(CommentResponse(
-            id=comment['id'],
-            post_id=post_id,
-            user_id=str(comment["user_id"]),
-            username=username,
-            content=comment["content"],
-            created_at=comment["created_at"],
-            updated_at=comment["updated_at"]
-        ))
+    # Build responses with user info (authors of the page fetched in one batch)
+    comment_responses = await hydrate_comments(db, comments)
 
     return CommentListResponse(
         comments=comment_responses,
-        total=len(comment_responses)
+        total=post.get(COMMENTS_COUNT, 0),
+        has_more=next_cursor is not None,
+        next_cursor=next_cursor
     )
 
 
@@ -119,7 +144,7 @@ async def update_comment(
     """
     db = get_database()
 
-    comment_doc = db.collection('comments').document(comment_id).get()
+    comment_doc = await db.collection('comments').document(comment_id).get()
     if not comment_doc.exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -136,24 +161,16 @@ async def update_comment(
         )
 
     # Update comment
-    db.collection('comments').document(comment_id).update({
+    await db.collection('comments').document(comment_id).update({
         "content": comment_update.content,
         "updated_at": datetime.utcnow()
     })
 
     # Get updated comment
-    updated_comment_doc = db.collection('comments').document(comment_id).get()
+    updated_comment_doc = await db.collection('comments').document(comment_id).get()
     updated_comment = doc_to_dict(updated_comment_doc)
 
-    return CommentResponse(
-        id=updated_comment["id"],
-        post_id=str(updated_comment["post_id"]),
-        user_id=str(updated_comment["user_id"]),
-        username=current_user['username'],
-        content=updated_comment["content"],
-        created_at=updated_comment["created_at"],
-        updated_at=updated_comment["updated_at"]
-    )
+    return comment_response(updated_comment, current_user['username'])
 
 
 @router.delete("/comments/{comment_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -166,7 +183,7 @@ async def delete_comment(
     """
     db = get_database()
 
-    comment_doc = db.collection('comments').document(comment_id).get()
+    comment_doc = await db.collection('comments').document(comment_id).get()
     if not comment_doc.exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -182,14 +199,12 @@ async def delete_comment(
             detail="You can only delete your own comments"
         )
 
-    # Delete comment
-    db.collection('comments').document(comment_id).delete()
-
-    # Update post comments count
-    post_doc = db.collection('posts').document(comment["post_id"]).get()
+    # Delete comment and decrement the post's comments count atomically
+    batch = db.batch()
+    batch.delete(comment_doc.reference)
+    post_doc = await get_fields(db.collection('posts').document(comment["post_id"]), POST_COUNTER_FIELDS)
     if post_doc.exists:
-        post = doc_to_dict(post_doc)
-        new_count = max(0, post.get('comments_count', 1) - 1)
-        db.collection('posts').document(comment["post_id"]).update({'comments_count': new_count})
+        increment_counter(batch, post_doc.reference, doc_to_dict(post_doc), COMMENTS_COUNT, -1)
+    await batch.commit()
 
     return None
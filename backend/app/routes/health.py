@@ -0,0 +1,58 @@
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+
+from app.services.model_registry import model_registry
+from app.services.moderation_cascade import cascade_metrics
+from app.services.admission import admission_metrics
+from app.services.near_duplicate import near_duplicate_index
+from app.utils.rate_limit import rate_limiter
+from app.services.user_cache import user_cache
+from app.utils.security import decoded_token_cache
+from app.services.post_deletion import post_deletion_worker
+from app.services.author_snapshots import author_snapshot_worker
+
+router = APIRouter()
+
+
+@router.get("/live")
+async def liveness():
+    """
+    Liveness probe - the process is up and serving requests
+    """
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+async def readiness():
+    """
+    Readiness probe - 200 only once every model is loaded and warmed up
+    Per-model status: not_loaded, loading, warming, ready, degraded (fallback), failed
+    """
+    ready = model_registry.all_ready()
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "models": model_registry.status()
+        }
+    )
+
+
+@router.get("/metrics")
+async def metrics():
+    """
+    Runtime counters - number of text moderation requests that exited at each cascade tier,
+    admission control mode / queue wait / transition counts per inference type,
+    the size and hit counts of the near-duplicate index, rate limit rejections per route
+    user / decoded token cache hit counts and the post deletion queue
+    """
+    return {
+        "moderation_cascade": cascade_metrics(),
+        "admission": admission_metrics(),
+        "near_duplicates": near_duplicate_index.snapshot(),
+        "rate_limits": rate_limiter.snapshot(),
+        "user_cache": user_cache.snapshot(),
+        "token_cache": decoded_token_cache.snapshot(),
+        "post_deletions": post_deletion_worker.snapshot(),
+        "author_snapshots": author_snapshot_worker.snapshot()
+    }
@@ -0,0 +1,66 @@
+from fastapi import APIRouter, HTTPException, status, Query, Request
+from fastapi.responses import FileResponse, Response
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+
+from app.config import settings
+from app.services.image_store import image_store, is_valid_hash
+
+router = APIRouter()
+
+
+@router.get("/{image_hash}")
+async def get_image(
+    image_hash: str,
+    request: Request,
+    size: Optional[int] = Query(None, description="Thumbnail size (longest side in pixels)")
+):
+    """
+    Serve an image blob (or a thumbnail variant) by its SHA-256 hash
+    Blobs are immutable, so responses are cached for a long time
+    """
+    if not is_valid_hash(image_hash):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Image not found"
+        )
+
+    if size is not None and size not in image_store.thumbnail_sizes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported thumbnail size, allowed: {image_store.thumbnail_sizes}"
+        )
+
+    etag = f'"{image_hash}-{size}"' if size else f'"{image_hash}"'
+    headers = {
+        "Cache-Control": f"public, max-age={settings.image_cache_max_age}, immutable",
+        "ETag": etag,
+        # Never let browsers sniff user-uploaded bytes into another content type
+        "X-Content-Type-Options": "nosniff"
+    }
+
+    # Content never changes for a given hash - a matching ETag is always fresh
+    if request.headers.get("if-none-match") == etag and image_store.get_path(image_hash):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if size:
+        try:
+            path = await run_in_threadpool(image_store.get_thumbnail_path, image_hash, size)
+        except Exception:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Could not generate thumbnail for this image"
+            )
+        media_type = "image/jpeg"
+    else:
+        path = image_store.get_path(image_hash)
+        media_type = image_store.get_media_type(image_hash) if path else None
+
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Image not found"
+        )
+
+    # FileResponse streams the file in chunks instead of loading it in memory
+    return FileResponse(path, media_type=media_type, headers=headers)
@@ -1,17 +1,63 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Dict, Optional, Tuple
 from datetime import datetime
+import asyncio
 
 from app.models.user import UserModel
 from app.models.like import LikeModel
 from app.schemas.like import LikeResponse
-from app.utils.dependencies import get_current_user
-from app.database import get_database
-from app.utils.firestore_helpers import doc_to_dict
+from app.utils.dependencies import get_current_user, get_current_claims
+from app.utils.rate_limit import rate_limit
+from app.database import get_database, run_in_transaction
+from app.utils.firestore_helpers import doc_to_dict, like_id, get_fields, EXISTS_ONLY, POST_COUNTER_FIELDS
+from app.services.counters import LIKES_COUNT, increment_counter, maybe_shard_counters, apply_sharded_counts
 
 router = APIRouter()
 
 
-@router.post("/{post_id}/like", response_model=LikeResponse)
+async def _toggle_like(transaction, post_ref, post: Dict, like_ref, user_id: str) -> bool:
+    """
+    Create or delete the like document and increment likes_count in one transaction
+    Only the like document is read, so concurrent likes on the same post do not
+    contend on the post document. Firestore retries the function if the like changed
+    """
+    like_snapshot = await like_ref.get(transaction=transaction)
+    if like_snapshot.exists:
+        # Unlike: remove like
+        transaction.delete(like_ref)
+        increment_counter(transaction, post_ref, post, LIKES_COUNT, -1)
+        return False
+
+    # Like: create like
+    transaction.create(like_ref, {
+        "post_id": post_ref.id,
+        "user_id": user_id,
+        "created_at": datetime.utcnow()
+    })
+    increment_counter(transaction, post_ref, post, LIKES_COUNT, 1)
+    return True
+
+
+async def toggle_post_like(db, post_id: str, user_id: str) -> Tuple[Optional[bool], int]:
+    """
+    Toggle a like, returns (is_liked, likes_count) or (None, 0) when the post does not exist
+    likes_count is the count read before the toggle plus the change (exact in storage,
+    approximate in the response under concurrent toggles)
+    """
+    post_ref = db.collection('posts').document(post_id)
+    post = doc_to_dict(await get_fields(post_ref, POST_COUNTER_FIELDS))
+    if post is None:
+        return None, 0
+
+    await maybe_shard_counters(post_ref, post)
+    like_ref = db.collection('likes').document(like_id(post_id, user_id))
+    is_liked = await run_in_transaction(db, _toggle_like, post_ref, post, like_ref, user_id)
+
+    await apply_sharded_counts(db, [post])
+    return is_liked, max(0, post.get(LIKES_COUNT, 0) + (1 if is_liked else -1))
+
+
+@router.post("/{post_id}/like", response_model=LikeResponse, dependencies=[Depends(rate_limit("toggle_like"))])
 async def toggle_like(
     post_id: str,
     current_user: UserModel = Depends(get_current_user)
@@ -21,86 +67,43 @@ async def toggle_like(
     """
     db = get_database()
 
-    # Check if post exists
-    post_doc = db.collection('posts').document(post_id).get()
-    if not post_doc.exists:
+    is_liked, new_count = await toggle_post_like(db, post_id, current_user['id'])
+    if is_liked is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Post not found"
         )
 
-    post = doc_to_dict(post_doc)
-
-    # Check if already liked
-    existing_likes = db.collection('likes')\
-        .where('post_id', '==', post_id)\
-        .where('user_id', '==', current_user['id'])\
-        .limit(1).stream()
-
-    existing_likes_list = list(existing_likes)
-
-    if existing_likes_list:
-        # Unlike: Remove like
-        like_doc = existing_likes_list[0]
-        like_doc.reference.delete()
-
-        # Decrement likes count
-        new_count = max(0, post.get('likes_count', 1) - 1)
-        db.collection('posts').document(post_id).update({'likes_count': new_count})
-
-        return LikeResponse(
-            post_id=post_id,
-            likes_count=new_count,
-            is_liked=False
-        )
-    else:
-        # Like: Create new like
-        like_dict = {
-            "post_id": post_id,
-            "user_id": current_user['id'],
-            "created_at": datetime.utcnow()
-        }
-
-        db.collection('likes').add(like_dict)
-
-        # Increment likes count
-        new_count = post.get('likes_count', 0) + 1
-        db.collection('posts').document(post_id).update({'likes_count': new_count})
-
-        return LikeResponse(
-            post_id=post_id,
-            likes_count=new_count,
-            is_liked=True
-        )
+    return LikeResponse(
+        post_id=post_id,
+        likes_count=new_count,
+        is_liked=is_liked
+    )
 
 
 @router.get("/{post_id}/like", response_model=LikeResponse)
 async def get_like_status(
     post_id: str,
-    current_user: UserModel = Depends(get_current_user)
+    current_user: UserModel = Depends(get_current_claims)
 ):
     """
     Get like status for a post
     """
     db = get_database()
 
-    # Check if post exists
-    post_doc = db.collection('posts').document(post_id).get()
+    # Post and like status (direct get on the deterministic like id) are read concurrently
+    post_doc, like_doc = await asyncio.gather(
+        get_fields(db.collection('posts').document(post_id), POST_COUNTER_FIELDS),
+        get_fields(db.collection('likes').document(like_id(post_id, current_user['id'])), EXISTS_ONLY)
+    )
     if not post_doc.exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Post not found"
         )
 
-    post = doc_to_dict(post_doc)
-
-    # Check if user liked this post
-    existing_likes = db.collection('likes')\
-        .where('post_id', '==', post_id)\
-        .where('user_id', '==', current_user['id'])\
-        .limit(1).stream()
-
-    is_liked = len(list(existing_likes)) > 0
+    post = (await apply_sharded_counts(db, [doc_to_dict(post_doc)]))[0]
+    is_liked = like_doc.exists
 
     return LikeResponse(
         post_id=post_id,
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Form, File, UploadFile
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
+import asyncio
+from google.cloud.firestore_v1.base_query import FieldFilter
 
 from app.models.user import UserModel
 from app.models.post import PostModel, ModerationResult
@@ -8,53 +10,171 @@ from app.schemas.post import (
     PostCreate,
     PostUpdate,
     PostResponse,
-    PostListResponse,
-    ModerationResultResponse
+    PostListResponse
 )
-from app.utils.dependencies import get_current_user
+from app.utils.dependencies import (
+    get_current_user,
+    get_current_claims,
+    ensure_model_ready,
+    require_model_ready,
+    admit_inference
+)
+from app.config import settings
+from app.utils.rate_limit import rate_limit
 from app.database import get_database
-from app.utils.firestore_helpers import doc_to_dict, docs_to_list
-from app.services.moderation_service import (
-    content_moderation_service,
-    image_moderation_service
+from app.utils.firestore_helpers import doc_to_dict, docs_to_list, select_fields, POST_LIST_FIELDS, LIKE_POST_FIELDS
+from app.utils.pagination import fetch_page, keyset_query, count, InvalidCursorError
+from app.services.hydration import hydrate_posts, post_response
+from app.services.post_deletion import post_deletion_worker, deletion_job, JOBS_COLLECTION
+from app.services.author_snapshots import AUTHOR_FIELD, author_snapshot
+from app.services.model_registry import (
+    TEXT_MODERATION,
+    IMAGE_MODERATION,
+    get_content_moderation_service,
+    get_image_moderation_service,
+    get_recommendation_service
+)
+from app.services.moderation_cascade import TIER_RULE_FALLBACK, TIER_NEAR_DUPLICATE
+from app.services.near_duplicate import (
+    check_near_duplicates,
+    index_content,
+    duplicate_moderation_result
+)
+from app.services.admission import (
+    moderation_admission,
+    recommendation_admission,
+    deferred_moderation_result,
+    image_unchecked,
+    MODE_NORMAL,
+    DEGRADE_PENDING
+)
+from app.services.model_client import ModelServerOverloaded
+from app.services.image_store import (
+    image_store,
+    image_reference,
+    hash_from_reference,
+    is_data_url,
+    IMAGE_REF_PREFIX,
+    InvalidImageError,
+    ImageTooLargeError
 )
-from app.services.recommendation_service import recommendation_service
 
 router = APIRouter()
 
+# Firestore limit of values in an array_contains_any filter
+MAX_ARRAY_CONTAINS_ANY = 30
 
-@router.post("/", response_model=PostResponse, status_code=status.HTTP_201_CREATED)
-async def create_post(
-    post_data: PostCreate,
-    current_user: UserModel = Depends(get_current_user)
-):
+
+async def _none():
+    return None
+
+
+async def _moderate_text(service, content: str, mode: str) -> Tuple[Dict, bool]:
     """
-    Create a new post with AI moderation
+    Moderate text in the admitted mode, returns (moderation_result, deferred)
+    Degraded (or model server full): keyword/spam rules, or hold for review
+    (ADMISSION_MODERATION_DEGRADE=pending)
+    """
+    if mode == MODE_NORMAL:
+        try:
+            result = await moderation_admission.run(
+                service.moderate_text_sync,
+                content,
+                # The service catches model errors itself and falls back to rules
+                failed=lambda r: service.classifier is not None and r.get("moderation_tier") == TIER_RULE_FALLBACK
+            )
+            return result, False
+        except ModelServerOverloaded:
+            # The shared model server's queue is full, serve this request degraded
+            pass
+    if settings.admission_moderation_degrade == DEGRADE_PENDING:
+        return deferred_moderation_result(), True
+    return service.moderate_text_rules(content), False
+
+
+async def _create_post(
+    current_user: dict,
+    content: str,
+    tags: List[str],
+    categories: List[str],
+    image_url: Optional[str] = None,
+    image_path: Optional[str] = None
+) -> PostResponse:
+    """
+    Moderate and insert a post
+    image_url is stored as-is (external URL or blob reference), image_path points to
+    the local blob when the image lives in the image store
     """
     db = get_database()
+    content_moderation_service = await get_content_moderation_service()
+
+    # Near-duplicates of already blocked content are blocked without running any model
+    duplicate_check = check_near_duplicates(content, current_user['id'])
+    duplicate_blocked = duplicate_check is not None and duplicate_check.blocked_match is not None
+
+    if duplicate_blocked:
+        moderation_result = duplicate_moderation_result(duplicate_check.blocked_match)
+        moderation_deferred = False
+        content_moderation_service.cascade.counters.record(TIER_NEAR_DUPLICATE)
+    else:
+        # Admission control: run the models, degrade to fallbacks, or reject (429) under load
+        mode = admit_inference(moderation_admission)
 
-    # Moderate text content
-    moderation_result = await content_moderation_service.moderate_text(post_data.content)
+        # Moderate text content
+        moderation_result, moderation_deferred = await _moderate_text(content_moderation_service, content, mode)
 
     # Check if content should be blocked
     should_block = await content_moderation_service.should_block_content(moderation_result)
 
-    # Moderate image if provided
+    # Moderate image if provided (not needed when the text is a blocked duplicate)
+    # None: the image has not been checked, the post is not approved until it is
     image_moderation_passed = True
-    if post_data.image_url:
-        image_result = await image_moderation_service.moderate_image(post_data.image_url)
-        image_moderation_passed = image_result["passed"]
+    if (image_path or image_url) and not duplicate_blocked:
+        if mode != MODE_NORMAL:
+            # Images have no rule-based fallback, hold the post for review
+            moderation_deferred = True
+            image_moderation_passed = None
+        else:
+            image_moderation_service = await get_image_moderation_service()
+            image_bytes = None
+            if not image_path:
+                # External URL: download on the loop, inference goes through admission control
+                try:
+                    image_bytes = await image_moderation_service.download_image(image_url)
+                except Exception as e:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Could not fetch image: {e}"
+                    )
+            try:
+                if image_path:
+                    image_result = await moderation_admission.run(
+                        image_moderation_service.moderate_image_file_sync, image_path
+                    )
+                else:
+                    image_result = await moderation_admission.run(
+                        image_moderation_service.moderate_image_bytes_sync, image_bytes
+                    )
+                image_moderation_passed = image_result["passed"]
+            except ModelServerOverloaded:
+                # The shared model server's queue is full, hold the post like under local load
+                moderation_deferred = True
+                image_moderation_passed = None
 
     # Create post document
     post_dict = {
         "user_id": current_user['id'],
-        "content": post_data.content,
-        "image_url": post_data.image_url,
-        "tags": post_data.tags or [],
-        "categories": post_data.categories or [],
+        AUTHOR_FIELD: author_snapshot(current_user),
+        "content": content,
+        "image_url": image_url,
+        "tags": tags or [],
+        "categories": categories or [],
         "moderation_result": moderation_result,
         "image_moderation_passed": image_moderation_passed,
-        "is_approved": not should_block and image_moderation_passed,
+        "moderation_deferred": moderation_deferred,
+        "is_approved": not should_block and image_moderation_passed is True and not moderation_deferred,
+        # Same text posted by many accounts in a short time (spam wave)
+        "near_duplicate_burst": bool(duplicate_check and duplicate_check.burst),
         "likes_count": 0,
         "comments_count": 0,
         "created_at": datetime.utcnow(),
@@ -62,26 +182,118 @@ async def create_post(
     }
 
     # Insert post
-    timestamp, doc_ref = db.collection('posts').add(post_dict)
+    timestamp, doc_ref = await db.collection('posts').add(post_dict)
     post_dict['id'] = doc_ref.id
+    index_content(doc_ref.id, "post", current_user['id'], duplicate_check,
+                  blocked=should_block, flags=moderation_result)
 
     # Prepare response
-    return PostResponse(
-        id=post_dict['id'],
-        user_id=str(post_dict["user_id"]),
-        username=current_user['username'],
-        content=post_dict["content"],
-        image_url=post_dict.get("image_url"),
-        tags=post_dict.get("tags", []),
-        categories=post_dict.get("categories", []),
-        moderation_result=ModerationResultResponse(**moderation_result) if moderation_result else None,
-        image_moderation_passed=image_moderation_passed,
-        is_approved=post_dict["is_approved"],
-        likes_count=0,
-        comments_count=0,
-        created_at=post_dict["created_at"],
-        updated_at=post_dict["updated_at"],
-        is_liked_by_user=False
+    return post_response(post_dict, current_user['username'])
+
+
+@router.post(
+    "/",
+    response_model=PostResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit("create_post")), Depends(require_model_ready(TEXT_MODERATION))]
+)
+async def create_post(
+    post_data: PostCreate,
+    current_user: UserModel = Depends(get_current_user)
+):
+    """
+    Create a new post with AI moderation
+    Inline base64 images are still accepted for compatibility, prefer POST /upload
+    """
+    image_url = post_data.image_url
+    image_path = None
+    if image_url:
+        ensure_model_ready(IMAGE_MODERATION)
+
+    # Offload inline base64 images to the blob store, the post only keeps a reference
+    if is_data_url(image_url):
+        try:
+            # Decoding and writing the blob is blocking, keep it off the event loop
+            image_hash = await asyncio.to_thread(image_store.put_data_url, image_url)
+        except InvalidImageError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        image_url = image_reference(image_hash)
+        image_path = image_store.get_path(image_hash)
+    elif image_url and image_url.startswith(IMAGE_REF_PREFIX):
+        # Reused blob reference: moderate the stored file again, never the reference itself
+        image_hash = hash_from_reference(image_url)
+        image_path = image_store.get_path(image_hash) if image_hash else None
+        if image_path is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Referenced image does not exist"
+            )
+        image_url = image_reference(image_hash)
+
+    return await _create_post(
+        current_user,
+        content=post_data.content,
+        tags=post_data.tags,
+        categories=post_data.categories,
+        image_url=image_url,
+        image_path=image_path
+    )
+
+
+@router.post(
+    "/upload",
+    response_model=PostResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit("create_post")), Depends(require_model_ready(TEXT_MODERATION))]
+)
+async def create_post_multipart(
+    content: str = Form(..., min_length=1, max_length=5000),
+    tags: List[str] = Form([]),
+    categories: List[str] = Form([]),
+    image: Optional[UploadFile] = File(None),
+    current_user: UserModel = Depends(get_current_user)
+):
+    """
+    Create a new post from a multipart form with a binary image file
+    The image is streamed to the image store in chunks and moderated from disk
+    """
+    image_url = None
+    image_path = None
+
+    if image is not None and image.filename:
+        ensure_model_ready(IMAGE_MODERATION)
+        if image.content_type and not image.content_type.startswith("image/"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Uploaded file must be an image"
+            )
+        try:
+            image_hash = await image_store.put_upload(image, settings.image_upload_max_bytes)
+        except ImageTooLargeError as e:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=str(e)
+            )
+        except InvalidImageError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        finally:
+            await image.close()
+        image_url = image_reference(image_hash)
+        image_path = image_store.get_path(image_hash)
+
+    return await _create_post(
+        current_user,
+        content=content,
+        tags=[t.strip() for t in tags if t.strip()],
+        categories=[c.strip() for c in categories if c.strip()],
+        image_url=image_url,
+        image_path=image_path
     )
 
 
@@ -89,99 +301,85 @@ async def create_post(
 async def get_posts(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     tags: Optional[str] = None,
     category: Optional[str] = None,
     user_id: Optional[str] = None,
-    current_user: UserModel = Depends(get_current_user)
+    current_user: UserModel = Depends(get_current_claims)
 ):
     """
     Get posts feed with optional filtering
+    Pass next_cursor from the previous response as ?cursor= to page without
+    offsets; ?page=N is still accepted up to PAGINATION_MAX_OFFSET posts deep
     """
     db = get_database()
+    collection_ref = db.collection('posts')
 
     # Build query
     # If filtering by user_id (profile page), show all posts (including pending approval)
     # Otherwise, only show approved posts
     if user_id:
-        posts_ref = db.collection('posts').where('user_id', '==', user_id)
-        # Don't use order_by here to avoid composite index requirement
-        # Will sort in-memory instead
+        posts_ref = collection_ref.where(filter=FieldFilter('user_id', '==', user_id))
     else:
-        posts_ref = db.collection('posts')\
-            .where('is_approved', '==', True)\
-            .order_by('created_at', direction='DESCENDING')
-
+        posts_ref = collection_ref.where(filter=FieldFilter('is_approved', '==', True))
+
+    # Firestore allows a single array filter per query, the category is
+    # checked in memory when tags are filtered too
+    # ?tags=a,b matches posts with ANY of the tags (array_contains_any); before
+    # keyset pagination only the first tag was applied. Every filter combination
+    # needs its composite index (firestore.indexes.json)
+    predicate = None
     if tags:
-        tag_list = [t.strip() for t in tags.split(",")]
-        # Firestore requires array-contains for one tag at a time
-        # For multiple tags, we'll filter in memory
-        posts_ref = posts_ref.where('tags', 'array_contains', tag_list[0])
-
-    if category:
-        posts_ref = posts_ref.where('categories', 'array_contains', category)
-
-    # Get all matching posts
-    all_posts = list(posts_ref.stream())
-
-    # Sort in-memory if user_id filter (to avoid composite index)
-    if user_id:
-        all_posts.sort(key=lambda x: doc_to_dict(x).get('created_at'), reverse=True)
-
-    # Additional tag filtering if multiple tags
-    if tags and len(tag_list) > 1:
-        all_posts = [p for p in all_posts if any(tag in doc_to_dict(p).get('tags', []) for tag in tag_list)]
-
-    total = len(all_posts)
+        tag_list = [t.strip() for t in tags.split(",") if t.strip()][:MAX_ARRAY_CONTAINS_ANY]
+        if len(tag_list) == 1:
+            posts_ref = posts_ref.where(filter=FieldFilter('tags', 'array_contains', tag_list[0]))
+        elif tag_list:
+            posts_ref = posts_ref.where(filter=FieldFilter('tags', 'array_contains_any', tag_list))
+        if category:
+            predicate = lambda post: category in post.get('categories', [])
+    elif category:
+        posts_ref = posts_ref.where(filter=FieldFilter('categories', 'array_contains', category))
+
+    skip = 0 if cursor else (page - 1) * page_size
+    if skip > settings.pagination_max_offset:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"page is limited to the first {settings.pagination_max_offset} posts, use cursor instead"
+        )
 
-    # Apply pagination
-    skip = (page - 1) * page_size
-    paginated_posts = all_posts[skip:skip + page_size]
-
-    # Get user info and like status for each post
-    post_responses = []
-    for post_doc in paginated_posts:
-        post = doc_to_dict(post_doc)
-
-        # Get user info
-        user_doc = db.collection('users').document(post["user_id"]).get()
-        user = doc_to_dict(user_doc)
-        username = user["username"] if user else "Unknown"
-
-        # Check if current user liked this post
-        like_docs = db.collection('likes')\
-            .where('post_id', '==', post['id'])\
-            .where('user_id', '==', current_user['id'])\
-            .limit(1).stream()
-        is_liked = len(list(like_docs)) > 0
-
-        # Build response
-        moderation_result = post.get("moderation_result")
-        post_responses.append(PostResponse(
-            id=post["id"],
-            user_id=str(post["user_id"]),
-            username=username,
-            content=post["content"],
-            image_url=post.get("image_url"),
-            tags=post.get("tags", []),
-            categories=post.get("categories", []),
-            moderation_result=ModerationResultResponse(**moderation_result) if moderation_result else None,
-            image_moderation_passed=post.get("image_moderation_passed", True),
-            is_approved=post.get("is_approved", True),
-            likes_count=post.get("likes_count", 0),
-            comments_count=post.get("comments_count", 0),
-            created_at=post["created_at"],
-            updated_at=post["updated_at"],
-            is_liked_by_user=is_liked
-        ))
+    # The page and the total (count aggregation instead of reading every matching post)
+    # are independent queries, run concurrently
+    with_total = include_total and predicate is None
+    try:
+        (paginated_posts, next_cursor), total = await asyncio.gather(
+            fetch_page(
+                keyset_query(select_fields(posts_ref, POST_LIST_FIELDS)),
+                collection_ref,
+                page_size,
+                cursor=cursor,
+                offset=skip,
+                predicate=predicate,
+                max_scan=settings.pagination_max_scan
+            ),
+            count(posts_ref) if with_total else _none()
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
-    has_more = skip + page_size < total
+    # Usernames and like status for the whole page in batched reads
+    post_responses = await hydrate_posts(db, paginated_posts, current_user)
 
     return PostListResponse(
         posts=post_responses,
         total=total,
         page=page,
         page_size=page_size,
-        has_more=has_more
+        has_more=next_cursor is not None,
+        next_cursor=next_cursor
     )
 
 
@@ -197,29 +395,35 @@ async def get_personalized_feed(
     """
     db = get_database()
 
-    # Get all approved posts
+    # Get all approved posts and the posts that user has liked (for behavior-based
+    # learning), the two queries run concurrently
     posts_ref = db.collection('posts')\
-        .where('is_approved', '==', True)\
+        .where(filter=FieldFilter('is_approved', '==', True))\
         .order_by('created_at', direction='DESCENDING')
-
-    all_posts_docs = list(posts_ref.stream())
+    likes_ref = db.collection('likes')\
+        .where(filter=FieldFilter('user_id', '==', current_user['id']))
+    posts_ref = select_fields(posts_ref, POST_LIST_FIELDS)
+    likes_ref = select_fields(likes_ref, LIKE_POST_FIELDS)
+
+    all_posts_docs, likes_docs = await asyncio.gather(
+        posts_ref.get(),
+        likes_ref.get(),
+        return_exceptions=True
+    )
+    if isinstance(all_posts_docs, Exception):
+        raise all_posts_docs
     all_posts = [doc_to_dict(doc) for doc in all_posts_docs]
 
-    # Get posts that user has liked (for behavior-based learning)
     liked_posts = []
-    try:
-        likes_docs = db.collection('likes')\
-            .where('user_id', '==', current_user['id'])\
-            .stream()
-
-        liked_post_ids = [doc_to_dict(doc)['post_id'] for doc in likes_docs]
+    if isinstance(likes_docs, Exception):
+        print(f"Warning: Failed to fetch liked posts: {likes_docs}")
+    else:
+        liked_post_ids = {doc_to_dict(doc)['post_id'] for doc in likes_docs}
 
         # Fetch the actual posts that were liked
         for post in all_posts:
             if post['id'] in liked_post_ids:
                 liked_posts.append(post)
-    except Exception as e:
-        print(f"Warning: Failed to fetch liked posts: {e}")
 
     # Get user preferences
     preferences = current_user.get('preferences', {})
@@ -229,12 +433,20 @@ async def get_personalized_feed(
     }
 
     # Get recommended posts (AI learns from both preferences AND likes)
-    recommended_posts = await recommendation_service.get_recommended_posts(
-        all_posts,
-        user_preferences,
-        liked_posts=liked_posts,  # Pass liked posts for behavior-based learning
-        limit=page_size * 2  # Get more for pagination
-    )
+    # Under load the feed degrades to tag-based scoring instead of being rejected
+    recommendation_service = await get_recommendation_service()
+    if admit_inference(recommendation_admission, can_shed=False) == MODE_NORMAL:
+        recommended_posts = await recommendation_admission.run(
+            recommendation_service.get_recommended_posts_sync,
+            all_posts,
+            user_preferences,
+            liked_posts,  # Pass liked posts for behavior-based learning
+            page_size * 2  # Get more for pagination
+        )
+    else:
+        recommended_posts = recommendation_service.get_recommended_posts_sync(
+            all_posts, user_preferences, liked_posts, page_size * 2, tag_based=True
+        )
 
     # Apply pagination
     total = len(recommended_posts)
@@ -242,38 +454,7 @@ async def get_personalized_feed(
     paginated_posts = recommended_posts[skip:skip + page_size]
 
     # Build responses
-    post_responses = []
-    for post in paginated_posts:
-        # Get user info
-        user_doc = db.collection('users').document(post["user_id"]).get()
-        user = doc_to_dict(user_doc)
-        username = user["username"] if user else "Unknown"
-
-        # Check if current user liked this post
-        like_docs = db.collection('likes')\
-            .where('post_id', '==', post['id'])\
-            .where('user_id', '==', current_user['id'])\
-            .limit(1).stream()
-        is_liked = len(list(like_docs)) > 0
-
-        moderation_result = post.get("moderation_result")
-        post_responses.append(PostResponse(
-            id=post["id"],
-            user_id=str(post["user_id"]),
-            username=username,
-            content=post["content"],
-            image_url=post.get("image_url"),
-            tags=post.get("tags", []),
-            categories=post.get("categories", []),
-            moderation_result=ModerationResultResponse(**moderation_result) if moderation_result else None,
-            image_moderation_passed=post.get("image_moderation_passed", True),
-            is_approved=post.get("is_approved", True),
-            likes_count=post.get("likes_count", 0),
-            comments_count=post.get("comments_count", 0),
-            created_at=post["created_at"],
-            updated_at=post["updated_at"],
-            is_liked_by_user=is_liked
-        ))
+    post_responses = await hydrate_posts(db, paginated_posts, current_user)
 
     has_more = skip + page_size < total
 
@@ -289,55 +470,24 @@ async def get_personalized_feed(
 @router.get("/{post_id}", response_model=PostResponse)
 async def get_post(
     post_id: str,
-    current_user: UserModel = Depends(get_current_user)
+    current_user: UserModel = Depends(get_current_claims)
 ):
     """
     Get a single post by ID
     """
     db = get_database()
 
-    post_doc = db.collection('posts').document(post_id).get()
+    post_doc = await db.collection('posts').document(post_id).get()
     if not post_doc.exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Post not found"
         )
 
-    post = doc_to_dict(post_doc)
+    return (await hydrate_posts(db, [doc_to_dict(post_doc)], current_user))[0]
 
-    # Get user info
-    user_doc = db.collection('users').document(post["user_id"]).get()
-    user = doc_to_dict(user_doc)
-    username = user["username"] if user else "Unknown"
-
-    # Check if current user liked this post
-    like_docs = db.collection('likes')\
-        .where('post_id', '==', post['id'])\
-        .where('user_id', '==', current_user.id)\
-        .limit(1).stream()
-    is_liked = len(list(like_docs)) > 0
-
-    moderation_result = post.get("moderation_result")
-    return PostResponse(
-        id=post["id"],
-        user_id=str(post["user_id"]),
-        username=username,
-        content=post["content"],
-        image_url=post.get("image_url"),
-        tags=post.get("tags", []),
-        categories=post.get("categories", []),
-        moderation_result=ModerationResultResponse(**moderation_result) if moderation_result else None,
-        image_moderation_passed=post.get("image_moderation_passed", True),
-        is_approved=post.get("is_approved", True),
-        likes_count=post.get("likes_count", 0),
-        comments_count=post.get("comments_count", 0),
-        created_at=post["created_at"],
-        updated_at=post["updated_at"],
-        is_liked_by_user=is_liked
-    )
 
-
-@router.put("/{post_id}", response_model=PostResponse)
+@router.put("/{post_id}", response_model=PostResponse, dependencies=[Depends(rate_limit("update_post"))])
 async def update_post(
     post_id: str,
     post_update: PostUpdate,
@@ -348,7 +498,7 @@ async def update_post(
     """
     db = get_database()
 
-    post_doc = db.collection('posts').document(post_id).get()
+    post_doc = await db.collection('posts').document(post_id).get()
     if not post_doc.exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -369,12 +519,23 @@ async def update_post(
 
     if post_update.content is not None:
         # Re-moderate content if changed
-        moderation_result = await content_moderation_service.moderate_text(post_update.content)
+        ensure_model_ready(TEXT_MODERATION)
+        mode = admit_inference(moderation_admission)
+        content_moderation_service = await get_content_moderation_service()
+        moderation_result, moderation_deferred = await _moderate_text(
+            content_moderation_service, post_update.content, mode
+        )
         should_block = await content_moderation_service.should_block_content(moderation_result)
+        # A text edit never approves an image that was held for review
+        if image_unchecked(post):
+            moderation_deferred = True
 
         update_data["content"] = post_update.content
         update_data["moderation_result"] = moderation_result
-        update_data["is_approved"] = not should_block and post.get("image_moderation_passed", True)
+        update_data["moderation_deferred"] = moderation_deferred
+        update_data["is_approved"] = (
+            not should_block and post.get("image_moderation_passed", True) is True and not moderation_deferred
+        )
 
     if post_update.tags is not None:
         update_data["tags"] = post_update.tags
@@ -383,37 +544,13 @@ async def update_post(
         update_data["categories"] = post_update.categories
 
     # Update post
-    db.collection('posts').document(post_id).update(update_data)
+    await db.collection('posts').document(post_id).update(update_data)
 
     # Get updated post
-    updated_post_doc = db.collection('posts').document(post_id).get()
+    updated_post_doc = await db.collection('posts').document(post_id).get()
     updated_post = doc_to_dict(updated_post_doc)
 
-    # Check if liked
-    like_docs = db.collection('likes')\
-        .where('post_id', '==', post_id)\
-        .where('user_id', '==', current_user.id)\
-        .limit(1).stream()
-    is_liked = len(list(like_docs)) > 0
-
-    moderation_result = updated_post.get("moderation_result")
-    return PostResponse(
-        id=updated_post["id"],
-        user_id=str(updated_post["user_id"]),
-        username=current_user['username'],
-        content=updated_post["content"],
-        image_url=updated_post.get("image_url"),
-        tags=updated_post.get("tags", []),
-        categories=updated_post.get("categories", []),
-        moderation_result=ModerationResultResponse(**moderation_result) if moderation_result else None,
-        image_moderation_passed=updated_post.get("image_moderation_passed", True),
-        is_approved=updated_post.get("is_approved", True),
-        likes_count=updated_post.get("likes_count", 0),
-        comments_count=updated_post.get("comments_count", 0),
-        created_at=updated_post["created_at"],
-        updated_at=updated_post["updated_at"],
-        is_liked_by_user=is_liked
-    )
+    return (await hydrate_posts(db, [updated_post], current_user))[0]
 
 
 @router.delete("/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -426,7 +563,7 @@ async def delete_post(
     """
     db = get_database()
 
-    post_doc = db.collection('posts').document(post_id).get()
+    post_doc = await db.collection('posts').document(post_id).get()
     if not post_doc.exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -442,17 +579,12 @@ async def delete_post(
             detail="You can only delete your own posts"
         )
 
-    # Delete post
-    db.collection('posts').document(post_id).delete()
-
-    # Delete related likes
-    likes_docs = db.collection('likes').where('post_id', '==', post_id).stream()
-    for like_doc in likes_docs:
-        like_doc.reference.delete()
-
-    # Delete related comments
-    comments_docs = db.collection('comments').where('post_id', '==', post_id).stream()
-    for comment_doc in comments_docs:
-        comment_doc.reference.delete()
+    # Delete the post and record the cascade job atomically, the likes, comments
+    # and counter shards are deleted in the background (app/services/post_deletion.py)
+    batch = db.batch()
+    batch.delete(post_doc.reference)
+    batch.set(db.collection(JOBS_COLLECTION).document(post_id), deletion_job(post_id))
+    await batch.commit()
+    post_deletion_worker.enqueue(post_id)
 
     return None
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel, Field
 from datetime import datetime
 
@@ -22,4 +22,6 @@ class CommentResponse(BaseModel):
 
 class CommentListResponse(BaseModel):
     comments: List[CommentResponse]
-    total: int
+    total: int  # the post's comments_count
+    has_more: bool = False
+    next_cursor: Optional[str] = None  # pass as ?cursor= to get the next page
@@ -8,6 +8,7 @@ class ModerationResultResponse(BaseModel):
     is_hate_speech: Optional[bool] = None
     confidence_score: Optional[float] = None
     details: Optional[str] = None
+    moderation_tier: Optional[str] = None
     # Legacy fields for backward compatibility
     toxicity: Optional[float] = None
     severe_toxicity: Optional[float] = None
@@ -37,7 +38,7 @@ class PostResponse(BaseModel):
     tags: List[str] = []
     categories: List[str] = []
     moderation_result: Optional[ModerationResultResponse] = None
-    image_moderation_passed: bool = True
+    image_moderation_passed: Optional[bool] = True
     is_approved: bool = True
     likes_count: int = 0
     comments_count: int = 0
@@ -50,7 +51,8 @@ class PostResponse(BaseModel):
 
 class PostListResponse(BaseModel):
     posts: List[PostResponse]
-    total: int
+    total: Optional[int] = None  # None when not requested or not countable server-side
     page: int
     page_size: int
     has_more: bool
+    next_cursor: Optional[str] = None  # pass as ?cursor= to get the next page
@@ -0,0 +1,230 @@
+"""
+Admission Control for Model Inference
+Limits concurrent inference per worker and watches how long requests wait for
+an inference slot. When the queue wait breaks its SLO the controller switches
+mode instead of letting latency grow without bound:
+- normal:   requests run the model (in a worker thread, at most max_concurrency at once)
+- degraded: requests skip the model and use a deterministic fallback
+            (rule-based moderation / pending review, tag-based recommendations)
+- shedding: requests are rejected (429 with Retry-After)
+Repeated inference failures open the circuit (degraded) the same way. The mode
+steps back down one level once the wait has stayed under the SLO for
+admission_recovery_seconds.
+"""
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import threading
+import time
+import logging
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+MODE_NORMAL = "normal"
+MODE_DEGRADED = "degraded"
+MODE_SHEDDING = "shedding"
+_MODE_LEVEL = {MODE_NORMAL: 0, MODE_DEGRADED: 1, MODE_SHEDDING: 2}
+_LEVEL_MODE = {level: mode for mode, level in _MODE_LEVEL.items()}
+
+# How degraded text moderation behaves (settings.admission_moderation_degrade)
+DEGRADE_RULES = "rules"      # keyword/spam rules, post published immediately if clean
+DEGRADE_PENDING = "pending"  # post stored unapproved until re-moderated
+
+MODERATION_TIER_DEFERRED = "deferred"
+
+
+def deferred_moderation_result() -> Dict:
+    """Moderation result stored for posts whose moderation was deferred under load"""
+    return {
+        "is_toxic": False,
+        "is_spam": False,
+        "is_hate_speech": False,
+        "confidence_score": 0.0,
+        "details": "moderation deferred (high load), pending review",
+        "moderation_tier": MODERATION_TIER_DEFERRED
+    }
+
+
+def image_unchecked(post: Dict) -> bool:
+    """
+    Whether the post's image was held for review under load without being moderated
+    (stored as image_moderation_passed=None; older posts only carry moderation_deferred)
+    """
+    return bool(post.get("image_url")) and (
+        post.get("image_moderation_passed") is None or post.get("moderation_deferred", False)
+    )
+
+
+class AdmissionController:
+    """Queue-wait based admission control for one kind of inference"""
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        slo_ms: float,
+        shed_ms: float,
+        max_queue: int,
+        window_seconds: float,
+        recovery_seconds: float,
+        failure_threshold: int
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.slo = slo_ms / 1000
+        self.shed = shed_ms / 1000
+        self.max_queue = max_queue
+        self.window = window_seconds
+        self.recovery = recovery_seconds
+        self.failure_threshold = failure_threshold
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._waits: deque = deque()  # (started_at, wait_seconds)
+        self._calm_since = None
+        self._consecutive_failures = 0
+        self._circuit_open_until = 0.0
+
+        self.mode = MODE_NORMAL
+        self.waiting = 0
+        self.in_flight = 0
+        self.counts = {"admitted": 0, "degraded": 0, "shed": 0, "failures": 0}
+        self.transitions: Dict[str, int] = {}
+
+    def _wait_p95(self, now: float) -> float:
+        while self._waits and now - self._waits[0][0] > self.window:
+            self._waits.popleft()
+        if not self._waits:
+            return 0.0
+        return float(np.percentile([wait for _, wait in self._waits], 95))
+
+    def _set_mode(self, mode: str, reason: str):
+        if mode == self.mode:
+            return
+        key = f"{self.mode}->{mode}"
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        logger.warning(f"[ADMISSION] {self.name}: {self.mode} -> {mode} ({reason})")
+        self.mode = mode
+
+    def _evaluate(self, now: float):
+        """Escalate immediately, recover one level at a time after a calm period"""
+        p95 = self._wait_p95(now)
+        if p95 > self.shed or self.waiting >= self.max_queue:
+            target = MODE_SHEDDING
+        elif p95 > self.slo or now < self._circuit_open_until:
+            target = MODE_DEGRADED
+        else:
+            target = MODE_NORMAL
+
+        level, target_level = _MODE_LEVEL[self.mode], _MODE_LEVEL[target]
+        if target_level > level:
+            circuit = ", circuit open" if now < self._circuit_open_until else ""
+            self._set_mode(target, f"queue wait p95 {p95 * 1000:.0f} ms, {self.waiting} waiting{circuit}")
+            self._calm_since = None
+        elif target_level < level:
+            if self._calm_since is None:
+                self._calm_since = now
+            elif now - self._calm_since >= self.recovery:
+                self._set_mode(_LEVEL_MODE[level - 1], f"queue wait p95 {p95 * 1000:.0f} ms")
+                self._calm_since = now
+        else:
+            self._calm_since = None
+
+    def admit(self, can_shed: bool = True) -> str:
+        """
+        Decide how to serve a request: MODE_NORMAL (call run), MODE_DEGRADED (use the
+        fallback) or MODE_SHEDDING (reject). Callers that have a cheap fallback pass
+        can_shed=False and are degraded instead of rejected
+        """
+        with self._lock:
+            self._evaluate(time.monotonic())
+            mode = self.mode if settings.admission_enabled else MODE_NORMAL
+            if mode == MODE_SHEDDING and not can_shed:
+                mode = MODE_DEGRADED
+            self.counts[{MODE_NORMAL: "admitted", MODE_DEGRADED: "degraded", MODE_SHEDDING: "shed"}[mode]] += 1
+        return mode
+
+    async def run(self, fn: Callable[..., Any], *args, failed: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Wait for an inference slot, then run fn in a worker thread
+        Exceptions count as inference failures, as do results for which failed(result)
+        is true (services that catch their own model errors and fall back)
+        """
+        self.waiting += 1
+        queued_at = time.monotonic()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        started_at = time.monotonic()
+        with self._lock:
+            self._waits.append((started_at, started_at - queued_at))
+        self.in_flight += 1
+        try:
+            result = await asyncio.to_thread(fn, *args)
+        except Exception:
+            self._record_outcome(success=False)
+            raise
+        else:
+            self._record_outcome(success=failed is None or not failed(result))
+            return result
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def _record_outcome(self, success: bool):
+        with self._lock:
+            if success:
+                self._consecutive_failures = 0
+                return
+            self._consecutive_failures += 1
+            self.counts["failures"] += 1
+            if self._consecutive_failures >= self.failure_threshold:
+                # Open the circuit: requests use the fallback for a recovery period
+                self._circuit_open_until = time.monotonic() + self.recovery
+                self._consecutive_failures = 0
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            now = time.monotonic()
+            self._evaluate(now)
+            return {
+                "mode": self.mode,
+                "waiting": self.waiting,
+                "in_flight": self.in_flight,
+                "max_concurrency": self.max_concurrency,
+                "queue_wait_p95_ms": self._wait_p95(now) * 1000,
+                "slo_ms": self.slo * 1000,
+                **self.counts,
+                "transitions": dict(self.transitions),
+            }
+
+
+def _controller(name: str) -> AdmissionController:
+    return AdmissionController(
+        name,
+        max_concurrency=settings.admission_max_concurrency,
+        slo_ms=settings.admission_queue_slo_ms,
+        shed_ms=settings.admission_shed_queue_ms,
+        max_queue=settings.admission_max_queue,
+        window_seconds=settings.admission_window_seconds,
+        recovery_seconds=settings.admission_recovery_seconds,
+        failure_threshold=settings.admission_failure_threshold
+    )
+
+
+# Singleton instances (moderation and embeddings are budgeted separately)
+moderation_admission = _controller("moderation")
+recommendation_admission = _controller("recommendation")
+
+
+def admission_metrics() -> Dict[str, Dict]:
+    return {
+        controller.name: controller.snapshot()
+        for controller in (moderation_admission, recommendation_admission)
+    }
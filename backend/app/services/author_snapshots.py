@@ -0,0 +1,90 @@
+"""
+Author Snapshots
+Posts and comments carry a snapshot of their author (username, avatar_url in
+the `author` field) written when they are created, so list responses need no
+user reads. When update_profile changes a snapshotted field it records a job in
+author_snapshot_jobs/{user_id} in the same batched write as the user update,
+and a background worker rewrites the snapshot on every post and comment of the
+user in batched writes of up to 500 operations. Until the job finishes,
+responses may still show the previous values.
+
+Jobs are idempotent (documents already up to date are not written), retried
+with exponential backoff and resumed on startup, one process at a time (see
+background_jobs). The snapshot is always taken from the current user document,
+and a user updated again while their job runs is processed once more
+afterwards. app/jobs/check_author_snapshots.py finds and repairs snapshots that
+are missing or stale.
+"""
+from typing import Dict
+
+from google.cloud import firestore
+from google.cloud.firestore_v1.base_query import FieldFilter
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from app.config import settings
+from app.services.background_jobs import BackgroundJobWorker, new_job
+from app.utils.firestore_helpers import MAX_BATCH_WRITES, doc_to_dict, select_fields
+
+AUTHOR_FIELD = "author"
+SNAPSHOT_FIELDS = ("username", "avatar_url")
+AUTHORED_COLLECTIONS = ("posts", "comments")
+JOBS_COLLECTION = "author_snapshot_jobs"
+
+
+def author_snapshot(user: Dict) -> Dict:
+    """Fields of the user copied onto their posts and comments"""
+    return {field: user.get(field) for field in SNAPSHOT_FIELDS}
+
+
+def snapshot_changed(user: Dict, update_data: Dict) -> bool:
+    """Whether a profile update changes any snapshotted field"""
+    return any(field in update_data and update_data[field] != user.get(field) for field in SNAPSHOT_FIELDS)
+
+
+def snapshot_job(user_id: str) -> Dict:
+    """Initial job document for a fan-out"""
+    return new_job(user_id=user_id, updated={collection: 0 for collection in AUTHORED_COLLECTIONS})
+
+
+class AuthorSnapshotWorker(BackgroundJobWorker):
+    """Background fan-out of author snapshots"""
+
+    jobs_collection = JOBS_COLLECTION
+    name = "author snapshot"
+    extra_counts = ("documents_updated",)
+
+    async def _fan_out(self, user_id: str, snapshot: Dict, job_ref):
+        db = self._db
+        for collection in AUTHORED_COLLECTIONS:
+            query = db.collection(collection)\
+                .where(filter=FieldFilter('user_id', '==', user_id))\
+                .order_by(FieldPath.document_id())
+            query = select_fields(query, (AUTHOR_FIELD,)).limit(MAX_BATCH_WRITES)
+            page_query = query
+            while True:
+                docs = await page_query.get()
+                stale = [doc for doc in docs if (doc.to_dict() or {}).get(AUTHOR_FIELD) != snapshot]
+                if stale:
+                    batch = db.batch()
+                    for doc in stale:
+                        batch.update(doc.reference, {AUTHOR_FIELD: snapshot})
+                    await batch.commit()
+                    self.counts["documents_updated"] += len(stale)
+                    await self._progress(job_ref, {f"updated.{collection}": firestore.Increment(len(stale))})
+                if len(docs) < MAX_BATCH_WRITES:
+                    break
+                page_query = query.start_after(docs[-1])
+
+    async def _execute(self, user_id: str, job_ref):
+        # Always the current profile, a rerun picks up updates made meanwhile
+        user = doc_to_dict(await self._db.collection('users').document(user_id).get())
+        if user is not None:
+            await self._fan_out(user_id, author_snapshot(user), job_ref)
+
+
+# Singleton instance
+author_snapshot_worker = AuthorSnapshotWorker(
+    workers=settings.author_snapshot_workers,
+    max_attempts=settings.author_snapshot_max_attempts,
+    retry_base_seconds=settings.author_snapshot_retry_base_seconds
+)
@@ -0,0 +1,230 @@
+"""
+Background Jobs
+Shared worker for the parts of a request that finish after the response
+(post_deletion, author_snapshots). A job is a document in the worker's
+collection, keyed by the id of the post/user it is about, written by the
+request in the same batched write as its own change. The worker processes
+queued ids with a few asyncio tasks, retries failures with exponential
+backoff, records progress and outcome on the job document and resumes
+unfinished jobs on startup.
+
+Every uvicorn worker resumes the same jobs on startup, so a job is claimed in a
+transaction before it runs: status running, a lease (renewed on progress) and
+a claim id. Other processes skip it until the lease expires. Attempts are
+counted on the document across processes; after max_attempts the job is dead
+and no longer resumed. A request that records the job again (set() replaces
+the document) starts it over, and the outcome of a run is only written while
+its claim still holds.
+
+Subclasses set jobs_collection and name, and implement _execute().
+"""
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+from app.config import settings
+from app.database import run_in_transaction
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = "pending"
+STATUS_DONE = "done"
+STATUS_RUNNING = "running"
+STATUS_FAILED = "failed"  # an attempt failed, retried
+STATUS_DEAD = "dead"  # max_attempts reached, not resumed
+RESUMABLE_STATUSES = [STATUS_PENDING, STATUS_RUNNING, STATUS_FAILED]
+
+# Owner recorded on claimed jobs
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def new_job(**fields) -> Dict:
+    """Initial job document, with the worker specific fields"""
+    return {
+        **fields,
+        "status": STATUS_PENDING,
+        "attempts": 0,
+        "error": None,
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow()
+    }
+
+
+async def _claim_job(transaction, job_ref, owner: str, max_attempts: int,
+                     lease_seconds: float) -> Optional[Tuple[int, str]]:
+    """(attempt, claim id) if this process now holds the job, None if it is done, dead or held elsewhere"""
+    snapshot = await job_ref.get(transaction=transaction)
+    if not snapshot.exists:
+        return None
+    job = snapshot.to_dict()
+    status = job.get("status")
+    if status not in RESUMABLE_STATUSES:
+        return None
+    if status == STATUS_RUNNING and job.get("owner") != owner and (job.get("lease_expires") or 0) > time.time():
+        return None
+    attempts = job.get("attempts") or 0
+    if attempts >= max_attempts:
+        transaction.update(job_ref, {"status": STATUS_DEAD, "claim": None, "updated_at": datetime.utcnow()})
+        return None
+    claim = uuid.uuid4().hex
+    transaction.update(job_ref, {
+        "status": STATUS_RUNNING,
+        "attempts": attempts + 1,
+        "claim": claim,
+        "owner": owner,
+        "lease_expires": time.time() + lease_seconds,
+        "updated_at": datetime.utcnow()
+    })
+    return attempts + 1, claim
+
+
+async def _finish_job(transaction, job_ref, claim: str, fields: Dict) -> bool:
+    """Write the outcome of a run, unless the job was recorded again or taken over meanwhile"""
+    snapshot = await job_ref.get(transaction=transaction)
+    if not snapshot.exists or (snapshot.to_dict() or {}).get("claim") != claim:
+        return False
+    transaction.update(job_ref, {**fields, "claim": None, "lease_expires": None, "updated_at": datetime.utcnow()})
+    return True
+
+
+class BackgroundJobWorker:
+    """Queue of job ids processed by one asyncio task per worker"""
+
+    # Collection of the job documents
+    jobs_collection: str = None
+    # Used in log lines and the resume message, e.g. "post deletion"
+    name: str = "background"
+    # Counters of the subclass, reported next to completed/dead/retries/skipped
+    extra_counts = ()
+
+    def __init__(self, workers: int, max_attempts: int, retry_base_seconds: float,
+                 lease_seconds: float = settings.background_job_lease_seconds):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base_seconds
+        self.lease_seconds = lease_seconds
+        self.owner = WORKER_ID
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._queued = set()
+        self._running = set()
+        self._rerun = set()
+        self._db = None
+        self.counts = {
+            "completed": 0, "dead": 0, "retries": 0, "skipped": 0, **{key: 0 for key in self.extra_counts}
+        }
+
+    @property
+    def _log_prefix(self) -> str:
+        return f"[{self.name.upper()}]"
+
+    async def _execute(self, job_id: str, job_ref):
+        """Do the work of one job (idempotent, it may run again after a failure)"""
+        raise NotImplementedError
+
+    async def _progress(self, job_ref, fields: Dict):
+        """Record progress on the job document and renew the lease"""
+        await job_ref.update({
+            **fields, "lease_expires": time.time() + self.lease_seconds, "updated_at": datetime.utcnow()
+        })
+
+    async def _process(self, job_id: str):
+        job_ref = self._db.collection(self.jobs_collection).document(job_id)
+        while True:
+            try:
+                claimed = await run_in_transaction(
+                    self._db, _claim_job, job_ref, self.owner, self.max_attempts, self.lease_seconds
+                )
+            except Exception as e:
+                logger.warning(f"{self._log_prefix} {job_id}: could not claim the job ({e}), left for the next startup")
+                return
+            if claimed is None:
+                # Done, dead, or running in another process
+                self.counts["skipped"] += 1
+                return
+            attempt, claim = claimed
+            try:
+                await self._execute(job_id, job_ref)
+                await run_in_transaction(self._db, _finish_job, job_ref, claim, {
+                    "status": STATUS_DONE, "error": None, "finished_at": datetime.utcnow()
+                })
+                self.counts["completed"] += 1
+                return
+            except Exception as e:
+                dead = attempt >= self.max_attempts
+                try:
+                    await run_in_transaction(self._db, _finish_job, job_ref, claim, {
+                        "status": STATUS_DEAD if dead else STATUS_FAILED, "error": str(e)
+                    })
+                except Exception:
+                    pass
+                if dead:
+                    logger.error(f"{self._log_prefix} {job_id}: giving up after {attempt} attempts: {e}")
+                    self.counts["dead"] += 1
+                    return
+                delay = self.retry_base * 2 ** (attempt - 1)
+                logger.warning(f"{self._log_prefix} {job_id}: attempt {attempt} failed ({e}), retrying in {delay:.0f}s")
+                self.counts["retries"] += 1
+                await asyncio.sleep(delay)
+
+    async def _run(self):
+        while True:
+            job_id = await self._queue.get()
+            self._queued.discard(job_id)
+            self._running.add(job_id)
+            try:
+                await self._process(job_id)
+            finally:
+                self._running.discard(job_id)
+                self._queue.task_done()
+                if job_id in self._rerun:
+                    self._rerun.discard(job_id)
+                    self.enqueue(job_id)
+
+    def enqueue(self, job_id: str):
+        """Schedule a job (no-op if it is already queued)"""
+        if self._queue is None or job_id in self._queued:
+            return
+        if job_id in self._running:
+            # Runs again once the current run is done, so it sees the newest data
+            self._rerun.add(job_id)
+            return
+        self._queued.add(job_id)
+        self._queue.put_nowait(job_id)
+
+    async def start(self, db):
+        """Start the workers and resume jobs that did not finish before the last shutdown"""
+        if self._tasks:
+            return
+        self._db = db
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(max(1, self.workers))]
+
+        unfinished = await db.collection(self.jobs_collection)\
+            .where(filter=FieldFilter('status', 'in', RESUMABLE_STATUSES))\
+            .get()
+        for job in unfinished:
+            self.enqueue(job.id)
+        if unfinished:
+            # Jobs claimed by a live process are skipped when they come up
+            print(f"[INFO] Resuming {len(unfinished)} {self.name} job(s)")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._queued.clear()
+        self._running.clear()
+        self._rerun.clear()
+
+    def snapshot(self) -> Dict:
+        return {"queued": len(self._queued), "running": len(self._running), "workers": len(self._tasks), **self.counts}
@@ -0,0 +1,108 @@
+"""
+Engagement Counters
+likes_count / comments_count are updated with server-side increments
+(firestore.Increment) written in the same transaction or batch as the like or
+comment, so concurrent updates are never lost and nothing is read back first.
+
+Hot posts can spread their counters over shards (posts/{id}/counter_shards/{n}):
+once a post reaches counter_hot_threshold likes it gets a `counter_shards`
+field, after which increments go to a random shard instead of the post
+document. The value on the post document stays the base and the shards are
+added on read, with the sums cached for counter_shard_cache_seconds.
+"""
+from typing import Dict, List, Tuple
+import asyncio
+import random
+import threading
+import time
+
+from firebase_admin import firestore
+
+from app.config import settings
+
+LIKES_COUNT = "likes_count"
+COMMENTS_COUNT = "comments_count"
+COUNTER_FIELDS = (LIKES_COUNT, COMMENTS_COUNT)
+SHARDS_COLLECTION = "counter_shards"
+
+
+def increment_counter(writer, post_ref, post: Dict, field: str, delta: int):
+    """
+    Add delta to a post counter inside a transaction or batch (writer)
+    post is the post dict, only its counter_shards field is used
+    """
+    num_shards = post.get("counter_shards", 0)
+    if num_shards:
+        shard_ref = post_ref.collection(SHARDS_COLLECTION).document(str(random.randrange(num_shards)))
+        writer.set(shard_ref, {field: firestore.Increment(delta)}, merge=True)
+    else:
+        writer.update(post_ref, {field: firestore.Increment(delta)})
+
+
+async def maybe_shard_counters(post_ref, post: Dict):
+    """Switch a post to sharded counters once it is hot (idempotent)"""
+    if (
+        settings.counter_shards > 0 and
+        not post.get("counter_shards") and
+        post.get(LIKES_COUNT, 0) >= settings.counter_hot_threshold
+    ):
+        await post_ref.update({"counter_shards": settings.counter_shards})
+        post["counter_shards"] = settings.counter_shards
+
+
+class ShardSumCache:
+    """Short-lived cache of the shard sums per post, thread-safe"""
+
+    def __init__(self, ttl: float, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._sums: Dict[str, Tuple[float, Dict[str, int]]] = {}
+
+    def get(self, post_id: str):
+        with self._lock:
+            entry = self._sums.get(post_id)
+            if entry and entry[0] > time.monotonic():
+                return entry[1]
+        return None
+
+    def put(self, post_id: str, sums: Dict[str, int]):
+        with self._lock:
+            if len(self._sums) >= self.max_entries:
+                now = time.monotonic()
+                self._sums = {key: value for key, value in self._sums.items() if value[0] > now}
+                if len(self._sums) >= self.max_entries:
+                    self._sums.clear()
+            self._sums[post_id] = (time.monotonic() + self.ttl, sums)
+
+    def invalidate(self, post_id: str):
+        """Drop the cached sums of a post, the next read sums its shards again"""
+        with self._lock:
+            self._sums.pop(post_id, None)
+
+
+# Singleton instance
+shard_sum_cache = ShardSumCache(ttl=settings.counter_shard_cache_seconds)
+
+
+async def _shard_sums(db, post_id: str) -> Dict[str, int]:
+    sums = shard_sum_cache.get(post_id)
+    if sums is None:
+        sums = dict.fromkeys(COUNTER_FIELDS, 0)
+        shards = db.collection('posts').document(post_id).collection(SHARDS_COLLECTION).stream()
+        async for shard in shards:
+            values = shard.to_dict()
+            for field in COUNTER_FIELDS:
+                sums[field] += values.get(field, 0)
+        shard_sum_cache.put(post_id, sums)
+    return sums
+
+
+async def apply_sharded_counts(db, posts: List[Dict]) -> List[Dict]:
+    """Add the shard sums to the counters of sharded posts (in place, only those are read)"""
+    sharded = [post for post in posts if post.get("counter_shards")]
+    sums = await asyncio.gather(*(_shard_sums(db, post["id"]) for post in sharded))
+    for post, post_sums in zip(sharded, sums):
+        for field, value in post_sums.items():
+            post[field] = max(0, post.get(field, 0) + value)
+    return posts
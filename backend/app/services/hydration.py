@@ -0,0 +1,127 @@
+"""
+Response Hydration
+Builds PostResponse / CommentResponse objects for a whole page at once. The
+author documents and the current user's likes are collected for every item on
+the page and fetched in batches (one db.get_all for the deduplicated authors,
+one db.get_all for the like documents, run concurrently) instead of two reads
+per item. Items carrying an author snapshot (app/services/author_snapshots.py)
+take the username from it, authors are only read for older items without one.
+"""
+from typing import Dict, Iterable, List, Optional, Set
+import asyncio
+
+from app.schemas.post import PostResponse, ModerationResultResponse
+from app.schemas.comment import CommentResponse
+from app.utils.firestore_helpers import doc_to_dict, like_id, projection, EXISTS_ONLY
+from app.services.counters import apply_sharded_counts
+from app.services.user_cache import user_cache
+from app.services.author_snapshots import AUTHOR_FIELD
+from app.config import settings
+
+UNKNOWN_USERNAME = "Unknown"
+
+
+async def fetch_users(db, user_ids: Iterable[str]) -> Dict[str, Dict]:
+    """
+    User documents by id, from the user cache then one batched read for the rest
+    Repeated ids are fetched once
+    """
+    users = {}
+    wanted = [user_id for user_id in dict.fromkeys(user_ids) if user_id]
+    if settings.user_cache_enabled:
+        cached, missing = user_cache.get_many(wanted)
+        users.update(cached)
+    else:
+        missing = wanted
+    if missing:
+        refs = [db.collection('users').document(user_id) for user_id in missing]
+        async for user_doc in db.get_all(refs):
+            user = doc_to_dict(user_doc)
+            if user:
+                users[user["id"]] = user
+                if settings.user_cache_enabled:
+                    user_cache.put(user)
+    return users
+
+
+async def fetch_liked_post_ids(db, user_id: str, post_ids: Iterable[str]) -> Set[str]:
+    """Ids among post_ids that the user liked, one db.get_all over the deterministic like ids"""
+    post_ids = list(dict.fromkeys(post_ids))
+    if not post_ids:
+        return set()
+    by_like_id = {like_id(post_id, user_id): post_id for post_id in post_ids}
+    refs = [db.collection('likes').document(doc_id) for doc_id in by_like_id]
+    # Only existence matters, no like fields are transferred
+    return {by_like_id[like_doc.id] async for like_doc in db.get_all(refs, field_paths=projection(EXISTS_ONLY)) if like_doc.exists}
+
+
+def _snapshot_username(item: Dict) -> Optional[str]:
+    return (item.get(AUTHOR_FIELD) or {}).get("username")
+
+
+def _username(users: Dict[str, Dict], item: Dict) -> str:
+    """Author username of a post or comment: its snapshot, else the user document"""
+    username = _snapshot_username(item)
+    if username:
+        return username
+    user = users.get(item["user_id"])
+    return user["username"] if user else UNKNOWN_USERNAME
+
+
+def post_response(post: Dict, username: str, is_liked: bool = False) -> PostResponse:
+    """Single PostResponse from a post dict (with id) and its author's username"""
+    moderation_result = post.get("moderation_result")
+    return PostResponse(
+        id=post["id"],
+        user_id=str(post["user_id"]),
+        username=username,
+        content=post["content"],
+        image_url=post.get("image_url"),
+        tags=post.get("tags", []),
+        categories=post.get("categories", []),
+        moderation_result=ModerationResultResponse(**moderation_result) if moderation_result else None,
+        image_moderation_passed=post.get("image_moderation_passed", True),
+        is_approved=post.get("is_approved", True),
+        likes_count=post.get("likes_count", 0),
+        comments_count=post.get("comments_count", 0),
+        created_at=post["created_at"],
+        updated_at=post["updated_at"],
+        is_liked_by_user=is_liked
+    )
+
+
+async def hydrate_posts(db, posts: List[Dict], current_user: Dict) -> List[PostResponse]:
+    """PostResponses for a page of post dicts, with usernames and the current user's likes"""
+    if not posts:
+        return []
+    _, users, liked = await asyncio.gather(
+        apply_sharded_counts(db, posts),
+        # The current user is fetched like any author: current_user may only hold token claims
+        fetch_users(db, [post["user_id"] for post in posts if not _snapshot_username(post)]),
+        fetch_liked_post_ids(db, current_user['id'], [post["id"] for post in posts])
+    )
+    return [
+        post_response(post, _username(users, post), post["id"] in liked)
+        for post in posts
+    ]
+
+
+def comment_response(comment: Dict, username: str) -> CommentResponse:
+    """Single CommentResponse from a comment dict (with id) and its author's username"""
+    return CommentResponse(
+        id=comment["id"],
+        post_id=str(comment["post_id"]),
+        user_id=str(comment["user_id"]),
+        username=username,
+        content=comment["content"],
+        created_at=comment["created_at"],
+        updated_at=comment["updated_at"]
+    )
+
+
+async def hydrate_comments(db, comments: List[Dict]) -> List[CommentResponse]:
+    """CommentResponses for a list of comment dicts, authors fetched in one batch"""
+    if not comments:
+        return []
+    users = await fetch_users(db, (comment["user_id"] for comment in comments if not _snapshot_username(comment)))
+    return [comment_response(comment, _username(users, comment)) for comment in comments]
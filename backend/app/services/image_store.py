@@ -0,0 +1,243 @@
+"""
+Content-addressed Image Store
+Images are extracted from posts at write time and kept on local disk keyed by
+the SHA-256 of their bytes, so identical uploads are stored only once.
+Posts only keep a short reference ("/api/images/<hash>").
+"""
+from typing import Optional, List
+import asyncio
+import base64
+import binascii
+import hashlib
+import io
+import os
+import re
+import tempfile
+import logging
+
+import aiofiles
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+IMAGE_REF_PREFIX = "/api/images/"
+
+_DATA_URL_PATTERN = re.compile(r'^data:image/[a-zA-Z0-9.+-]+;base64,', re.IGNORECASE)
+_HASH_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+# Magic bytes used to sniff the media type of a stored blob
+_MEDIA_TYPES = [
+    (b'\x89PNG\r\n\x1a\n', "image/png"),
+    (b'\xff\xd8\xff', "image/jpeg"),
+    (b'GIF87a', "image/gif"),
+    (b'GIF89a', "image/gif"),
+    (b'BM', "image/bmp"),
+]
+
+# Formats accepted into the store (PIL format names), the ones get_media_type recognizes
+_ALLOWED_FORMATS = {"PNG", "JPEG", "GIF", "BMP", "WEBP"}
+
+
+class InvalidImageError(ValueError):
+    """Raised when an image payload cannot be decoded"""
+
+
+class ImageTooLargeError(InvalidImageError):
+    """Raised when an upload exceeds the configured size limit"""
+
+
+def is_data_url(image_url: Optional[str]) -> bool:
+    """Check if an image_url is an inline base64 data URL"""
+    return bool(image_url) and bool(_DATA_URL_PATTERN.match(image_url))
+
+
+def is_valid_hash(image_hash: str) -> bool:
+    """Check if a string looks like a SHA-256 hex digest"""
+    return bool(image_hash) and bool(_HASH_PATTERN.match(image_hash))
+
+
+def image_reference(image_hash: str) -> str:
+    """Short reference stored on the post document"""
+    return f"{IMAGE_REF_PREFIX}{image_hash}"
+
+
+def verify_image(source) -> None:
+    """
+    Check that a path or file object holds an image in an accepted format
+    Blocking (parses the whole file) - call from a worker thread
+
+    Raises:
+        InvalidImageError: if the bytes are not a readable image
+    """
+    from PIL import Image
+
+    try:
+        with Image.open(source) as image:
+            image_format = image.format
+            image.verify()
+    except Exception as e:
+        raise InvalidImageError(f"Not a valid image: {e}")
+    if image_format not in _ALLOWED_FORMATS:
+        raise InvalidImageError(f"Unsupported image format: {image_format}")
+
+
+def hash_from_reference(image_url: Optional[str]) -> Optional[str]:
+    """Extract the blob hash from a stored reference, None for external URLs"""
+    if not image_url or not image_url.startswith(IMAGE_REF_PREFIX):
+        return None
+    image_hash = image_url[len(IMAGE_REF_PREFIX):].split("?", 1)[0]
+    return image_hash if is_valid_hash(image_hash) else None
+
+
+class ImageStore:
+    """
+    Local blob store for images
+    Layout: <root>/blobs/ab/cd/<hash> and <root>/thumbs/<size>/<hash>.jpg
+    """
+
+    def __init__(self, root_dir: str, thumbnail_sizes: List[int]):
+        self.root_dir = root_dir
+        self.thumbnail_sizes = sorted(set(thumbnail_sizes))
+        self.blobs_dir = os.path.join(root_dir, "blobs")
+        self.thumbs_dir = os.path.join(root_dir, "thumbs")
+        self.tmp_dir = os.path.join(root_dir, "tmp")
+        for path in (self.blobs_dir, self.thumbs_dir, self.tmp_dir):
+            os.makedirs(path, exist_ok=True)
+
+    def _blob_path(self, image_hash: str) -> str:
+        return os.path.join(self.blobs_dir, image_hash[:2], image_hash[2:4], image_hash)
+
+    def _thumbnail_path(self, image_hash: str, size: int) -> str:
+        return os.path.join(self.thumbs_dir, str(size), f"{image_hash}.jpg")
+
+    def _write_atomic(self, path: str, data: bytes):
+        """Write to a temp file and rename, so readers never see partial blobs"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def put_bytes(self, data: bytes) -> str:
+        """
+        Store image bytes and return their SHA-256 hash
+        Identical content is deduplicated: an existing blob is never rewritten
+        """
+        image_hash = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(image_hash)
+        if not os.path.exists(path):
+            self._write_atomic(path, data)
+            logger.info(f"Stored image blob {image_hash} ({len(data)} bytes)")
+        return image_hash
+
+    def put_data_url(self, data_url: str) -> str:
+        """Decode a data:image/...;base64 URL and store its bytes"""
+        if not is_data_url(data_url):
+            raise InvalidImageError("Not a base64 image data URL")
+        try:
+            data = base64.b64decode(data_url.split(",", 1)[1], validate=True)
+        except (binascii.Error, ValueError) as e:
+            raise InvalidImageError(f"Invalid base64 image data: {e}")
+        if not data:
+            raise InvalidImageError("Empty image data")
+        verify_image(io.BytesIO(data))
+        return self.put_bytes(data)
+
+    async def put_upload(self, upload, max_bytes: int, chunk_size: int = 64 * 1024) -> str:
+        """
+        Stream a multipart upload (starlette UploadFile) into the store
+        The file is written to disk chunk by chunk while its SHA-256 is computed,
+        so the whole upload is never held in memory. The file is checked to be an
+        image before it is moved into the store
+
+        Raises:
+            ImageTooLargeError: if the upload exceeds max_bytes
+            InvalidImageError: if the upload is empty or not an image
+        """
+        digest = hashlib.sha256()
+        total = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+        os.close(fd)
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                while True:
+                    chunk = await upload.read(chunk_size)
+                    if not chunk:
+                        break
+                    total += len(chunk)
+                    if total > max_bytes:
+                        raise ImageTooLargeError(f"Image exceeds maximum size of {max_bytes} bytes")
+                    digest.update(chunk)
+                    await f.write(chunk)
+
+            if total == 0:
+                raise InvalidImageError("Empty image upload")
+            await asyncio.to_thread(verify_image, tmp_path)
+
+            image_hash = digest.hexdigest()
+            path = self._blob_path(image_hash)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+                logger.info(f"Stored uploaded image blob {image_hash} ({total} bytes)")
+            return image_hash
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get_path(self, image_hash: str) -> Optional[str]:
+        """Path to the original blob, None if it does not exist"""
+        if not is_valid_hash(image_hash):
+            return None
+        path = self._blob_path(image_hash)
+        return path if os.path.exists(path) else None
+
+    def get_thumbnail_path(self, image_hash: str, size: int) -> Optional[str]:
+        """
+        Path to a thumbnail variant (longest side <= size), generated on first request
+        Blocking (decodes the image) - call from a worker thread
+        """
+        source_path = self.get_path(image_hash)
+        if source_path is None:
+            return None
+
+        path = self._thumbnail_path(image_hash, size)
+        if os.path.exists(path):
+            return path
+
+        from PIL import Image
+
+        with Image.open(source_path) as image:
+            image = image.convert("RGB")
+            image.thumbnail((size, size))
+            buffer = io.BytesIO()
+            image.save(buffer, format="JPEG", quality=85, optimize=True)
+        self._write_atomic(path, buffer.getvalue())
+        return path
+
+    def get_media_type(self, image_hash: str) -> str:
+        """Sniff the media type of a stored blob from its magic bytes"""
+        path = self.get_path(image_hash)
+        if path is None:
+            return "application/octet-stream"
+        with open(path, "rb") as f:
+            header = f.read(16)
+        for magic, media_type in _MEDIA_TYPES:
+            if header.startswith(magic):
+                return media_type
+        if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+            return "image/webp"
+        return "application/octet-stream"
+
+
+# Singleton instance
+image_store = ImageStore(settings.image_store_dir, settings.image_thumbnail_sizes)
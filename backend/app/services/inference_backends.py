@@ -0,0 +1,277 @@
+"""
+CPU Inference Backends
+Builds the transformers pipelines used by the moderation and recommendation
+services with a selectable backend per model:
+- "torch": eager fp32 PyTorch (original behaviour, uses GPU when available)
+- "int8":  PyTorch with dynamic int8 quantization of all Linear layers (CPU)
+- "onnx":  ONNX Runtime, graph exported once and cached on disk (CPU)
+
+When MODEL_SERVER_ADDRESS is set, the loaders return proxies that run inference
+in the shared model server process (see model_server.py) instead.
+"""
+from typing import Optional
+import importlib
+import os
+import logging
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+BACKEND_TORCH = "torch"
+BACKEND_INT8 = "int8"
+BACKEND_ONNX = "onnx"
+SUPPORTED_BACKENDS = (BACKEND_TORCH, BACKEND_INT8, BACKEND_ONNX)
+
+# Model server operations, one per pipeline type
+OP_TEXT_CLASSIFICATION = "text_classification"
+OP_DISTILLED_TEXT_CLASSIFICATION = "distilled_text_classification"
+OP_IMAGE_CLASSIFICATION = "image_classification"
+OP_ZERO_SHOT_IMAGE = "zero_shot_image"
+OP_ENCODE = "encode"
+
+
+def validate_backend(backend: str) -> str:
+    """Normalize a backend name, raising ValueError for unknown values"""
+    backend = (backend or BACKEND_TORCH).lower()
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {SUPPORTED_BACKENDS}")
+    return backend
+
+
+def _configure_torch_threads():
+    import torch
+    if settings.inference_num_threads:
+        torch.set_num_threads(settings.inference_num_threads)
+
+
+def _device_for(backend: str) -> int:
+    """GPU only makes sense for eager fp32 - quantized and ONNX models run on CPU"""
+    import torch
+    if backend == BACKEND_TORCH and torch.cuda.is_available():
+        return 0
+    return -1
+
+
+def quantize_int8(model):
+    """Apply dynamic int8 quantization to the Linear layers of a torch model"""
+    import torch
+    model.eval()
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def require_onnx_runtime(model_name: str):
+    """
+    Fail with an actionable error when the "onnx" backend is selected but
+    optimum[onnxruntime] is not installed, instead of the services quietly
+    falling back to their rules
+    """
+    try:
+        for module in ("onnxruntime", "optimum.onnxruntime"):
+            importlib.import_module(module)
+    except ImportError as e:
+        message = (
+            f"Inference backend 'onnx' is configured for {model_name} but ONNX Runtime is not "
+            f"installed ({e}). Install it with: pip install \"optimum[onnxruntime]\", "
+            f"or select the 'torch' or 'int8' backend"
+        )
+        logger.error(message)
+        raise RuntimeError(message) from e
+
+
+def check_configured_backends():
+    """
+    Validate every configured backend at startup, so a missing runtime stops the
+    API with a clear error rather than degrading moderation to keyword rules
+    """
+    configured = [
+        (settings.text_moderation_model, settings.text_moderation_backend),
+        (settings.nsfw_image_model, settings.nsfw_image_backend),
+    ]
+    if settings.cascade_distilled_model:
+        configured.append((settings.cascade_distilled_model, settings.cascade_distilled_backend))
+    # CLIP and older sentence-transformers run int8 torch for "onnx" (see below),
+    # the embedding model is checked when it loads
+    validate_backend(settings.clip_backend)
+    validate_backend(settings.embedding_backend)
+    for model_name, backend in configured:
+        if validate_backend(backend) == BACKEND_ONNX:
+            require_onnx_runtime(model_name)
+
+
+def _onnx_cache_path(model_name: str) -> str:
+    return os.path.join(settings.onnx_cache_dir, model_name.replace("/", "--"))
+
+
+def _load_onnx_model(ort_class_name: str, model_name: str):
+    """
+    Load an optimum ONNX Runtime model, exporting and caching the graph on first use
+    Subsequent loads read the cached model.onnx and skip the (slow) export
+    """
+    require_onnx_runtime(model_name)
+    import optimum.onnxruntime as ort_models
+    ort_class = getattr(ort_models, ort_class_name)
+
+    cache_path = _onnx_cache_path(model_name)
+    if os.path.exists(os.path.join(cache_path, "model.onnx")):
+        logger.info(f"Loading cached ONNX graph for {model_name} from {cache_path}")
+        return ort_class.from_pretrained(cache_path)
+
+    logger.info(f"Exporting {model_name} to ONNX (first run, cached in {cache_path})")
+    model = ort_class.from_pretrained(model_name, export=True)
+    os.makedirs(cache_path, exist_ok=True)
+    model.save_pretrained(cache_path)
+    return model
+
+
+def _load_local_text_classification_pipeline(model_name: str, backend: str):
+    """Multi-label text classifier (toxic-bert) returning scores for every label"""
+    from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
+
+    backend = validate_backend(backend)
+    _configure_torch_threads()
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+    if backend == BACKEND_ONNX:
+        model = _load_onnx_model("ORTModelForSequenceClassification", model_name)
+    else:
+        model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        if backend == BACKEND_INT8:
+            model = quantize_int8(model)
+
+    return pipeline(
+        "text-classification",
+        model=model,
+        tokenizer=tokenizer,
+        top_k=None,
+        device=_device_for(backend)
+    )
+
+
+def _load_local_image_classification_pipeline(model_name: str, backend: str):
+    """Image classifier (NSFW ViT)"""
+    from transformers import pipeline, AutoImageProcessor, AutoModelForImageClassification
+
+    backend = validate_backend(backend)
+    _configure_torch_threads()
+    image_processor = AutoImageProcessor.from_pretrained(model_name)
+
+    if backend == BACKEND_ONNX:
+        model = _load_onnx_model("ORTModelForImageClassification", model_name)
+    else:
+        model = AutoModelForImageClassification.from_pretrained(model_name)
+        if backend == BACKEND_INT8:
+            model = quantize_int8(model)
+
+    return pipeline(
+        "image-classification",
+        model=model,
+        image_processor=image_processor,
+        device=_device_for(backend)
+    )
+
+
+def _load_local_zero_shot_image_pipeline(model_name: str, backend: str):
+    """
+    Zero-shot image classifier (CLIP)
+    optimum has no ONNX Runtime class for zero-shot image classification,
+    so "onnx" runs the int8-quantized torch model instead
+    """
+    from transformers import pipeline, AutoProcessor, AutoModelForZeroShotImageClassification
+
+    backend = validate_backend(backend)
+    if backend == BACKEND_ONNX:
+        logger.warning(f"ONNX backend not available for {model_name}, using int8 torch instead")
+        backend = BACKEND_INT8
+    _configure_torch_threads()
+
+    processor = AutoProcessor.from_pretrained(model_name)
+    model = AutoModelForZeroShotImageClassification.from_pretrained(model_name)
+    if backend == BACKEND_INT8:
+        model = quantize_int8(model)
+
+    return pipeline(
+        "zero-shot-image-classification",
+        model=model,
+        tokenizer=processor.tokenizer,
+        image_processor=processor.image_processor,
+        device=_device_for(backend)
+    )
+
+
+def _load_local_sentence_transformer(model_name: str, backend: str):
+    """
+    Sentence embedding model (MiniLM)
+    "onnx" needs sentence-transformers >= 3.2 (backend="onnx"), older versions
+    fall back to int8 torch
+    """
+    import inspect
+    from sentence_transformers import SentenceTransformer
+
+    backend = validate_backend(backend)
+    _configure_torch_threads()
+
+    if backend == BACKEND_ONNX:
+        if "backend" in inspect.signature(SentenceTransformer.__init__).parameters:
+            require_onnx_runtime(model_name)
+            return SentenceTransformer(
+                model_name,
+                backend="onnx",
+                cache_folder=settings.onnx_cache_dir
+            )
+        logger.warning("Installed sentence-transformers has no ONNX backend, using int8 torch instead")
+        backend = BACKEND_INT8
+
+    device: Optional[str] = "cpu" if backend == BACKEND_INT8 else None
+    model = SentenceTransformer(model_name, device=device)
+    if backend == BACKEND_INT8:
+        # The first module wraps the HF transformer, quantize it in place
+        transformer = model[0]
+        transformer.auto_model = quantize_int8(transformer.auto_model)
+    return model
+
+
+# Local loader per model server operation (used by the model server process itself)
+LOCAL_LOADERS = {
+    OP_TEXT_CLASSIFICATION: _load_local_text_classification_pipeline,
+    OP_DISTILLED_TEXT_CLASSIFICATION: _load_local_text_classification_pipeline,
+    OP_IMAGE_CLASSIFICATION: _load_local_image_classification_pipeline,
+    OP_ZERO_SHOT_IMAGE: _load_local_zero_shot_image_pipeline,
+    OP_ENCODE: _load_local_sentence_transformer,
+}
+
+
+def _load(op: str, model_name: str, backend: str):
+    """Proxy to the shared model server when configured, in-process model otherwise"""
+    local_loader = LOCAL_LOADERS[op]
+    if not settings.model_server_address:
+        return local_loader(model_name, backend)
+
+    from app.services.model_client import RemotePipeline, RemoteSentenceEncoder
+    remote_class = RemoteSentenceEncoder if op == OP_ENCODE else RemotePipeline
+    return remote_class(op, lambda: local_loader(model_name, backend))
+
+
+def load_text_classification_pipeline(model_name: str, backend: str):
+    """Multi-label text classifier (toxic-bert)"""
+    return _load(OP_TEXT_CLASSIFICATION, model_name, backend)
+
+
+def load_distilled_text_classification_pipeline(model_name: str, backend: str):
+    """Small text classifier for the moderation cascade"""
+    return _load(OP_DISTILLED_TEXT_CLASSIFICATION, model_name, backend)
+
+
+def load_image_classification_pipeline(model_name: str, backend: str):
+    """Image classifier (NSFW ViT)"""
+    return _load(OP_IMAGE_CLASSIFICATION, model_name, backend)
+
+
+def load_zero_shot_image_pipeline(model_name: str, backend: str):
+    """Zero-shot image classifier (CLIP)"""
+    return _load(OP_ZERO_SHOT_IMAGE, model_name, backend)
+
+
+def load_sentence_transformer(model_name: str, backend: str):
+    """Sentence embedding model (MiniLM)"""
+    return _load(OP_ENCODE, model_name, backend)
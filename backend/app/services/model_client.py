@@ -0,0 +1,241 @@
+"""
+Model Server Client
+Drop-in proxies for the transformers pipelines that forward inference to the
+shared model server (model_server.py), so API workers do not each hold a copy
+of every model. While the server is unreachable the proxies fall back to an
+in-process model, loaded lazily on first need.
+A full server queue (ModelServerOverloaded) is not retried locally, loading a
+model into every worker under load would make it worse; the routes serve the
+request degraded instead, like admission control does.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from multiprocessing.connection import Client
+import ipaddress
+import itertools
+import queue
+import threading
+import time
+import logging
+
+from app.config import settings
+from app.services.inference_backends import OP_TEXT_CLASSIFICATION, OP_DISTILLED_TEXT_CLASSIFICATION
+
+logger = logging.getLogger(__name__)
+
+
+class ModelServerUnavailable(Exception):
+    """The model server could not be reached"""
+
+
+class ModelServerOverloaded(Exception):
+    """The model server rejected the request because its queue is full"""
+
+
+def _is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host.strip("[]")).is_loopback
+    except ValueError:
+        return False
+
+
+def parse_address(address: str) -> Union[str, Tuple[str, int]]:
+    """
+    "host:port" -> TCP tuple, anything else is a Unix socket path
+    (or a Windows named pipe like \\\\.\\pipe\\models)
+    TCP addresses must be loopback unless model_server_allow_remote is set
+
+    Raises:
+        ValueError: for a non-loopback TCP address that is not explicitly allowed
+    """
+    if "/" not in address and "\\" not in address and ":" in address:
+        host, port = address.rsplit(":", 1)
+        if not _is_loopback(host) and not settings.model_server_allow_remote:
+            raise ValueError(
+                f"Model server address {address} is not a loopback address; the server exchanges "
+                f"pickled payloads, set MODEL_SERVER_ALLOW_REMOTE=true only on a trusted network"
+            )
+        return host.strip("[]"), int(port)
+    return address
+
+
+def server_authkey() -> bytes:
+    """
+    Shared secret for the connection handshake (MODEL_SERVER_AUTHKEY)
+    Kept separate from the JWT secret so a leak of one does not give the other
+
+    Raises:
+        ValueError: if it is unset or equal to secret_key
+    """
+    authkey = settings.model_server_authkey
+    if not authkey:
+        raise ValueError("MODEL_SERVER_AUTHKEY must be set to use the model server")
+    if authkey == settings.secret_key:
+        raise ValueError("MODEL_SERVER_AUTHKEY must differ from SECRET_KEY")
+    return authkey.encode()
+
+
+def check_model_server_settings():
+    """Validate the model server address and secret at startup (no-op without a server)"""
+    if settings.model_server_address:
+        parse_address(settings.model_server_address)
+        server_authkey()
+
+
+class ModelServerClient:
+    """
+    Small pool of connections to the model server
+    A connection is used by one caller at a time, the server batches requests
+    coming from all connections of all workers
+    """
+
+    def __init__(self, address: str, timeout: float, retry_interval: float, pool_size: int = 8):
+        self.address = parse_address(address)
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self._pool: "queue.LifoQueue" = queue.LifoQueue(maxsize=pool_size)
+        self._ids = itertools.count()
+        self._down_until = 0.0
+
+    def is_available(self) -> bool:
+        """False while backing off after a connection failure"""
+        return time.monotonic() >= self._down_until
+
+    def _connect(self):
+        try:
+            return Client(self.address, authkey=server_authkey())
+        except (OSError, EOFError) as e:
+            self._down_until = time.monotonic() + self.retry_interval
+            raise ModelServerUnavailable(f"Cannot connect to model server at {self.address}: {e}")
+
+    def _acquire(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def _release(self, conn):
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def call(self, op: str, items: List[Any], kwargs: Optional[Dict] = None) -> List[Any]:
+        """Run a batch of inputs through a server-side model, one result per input"""
+        if not self.is_available():
+            raise ModelServerUnavailable("Model server marked unavailable, retrying later")
+
+        conn = self._acquire()
+        request_id = next(self._ids)
+        try:
+            conn.send((request_id, op, items, kwargs or {}))
+            if not conn.poll(self.timeout):
+                raise TimeoutError(f"Model server did not answer within {self.timeout}s")
+            response_id, ok, payload = conn.recv()
+        except (OSError, EOFError, TimeoutError) as e:
+            conn.close()
+            self._down_until = time.monotonic() + self.retry_interval
+            raise ModelServerUnavailable(f"Model server connection failed: {e}")
+
+        self._release(conn)
+        if response_id != request_id:
+            raise RuntimeError("Model server response out of order")
+        if not ok:
+            if payload == "overloaded":
+                raise ModelServerOverloaded("Model server queue is full")
+            raise RuntimeError(f"Model server error: {payload}")
+        return payload
+
+    def ping(self) -> bool:
+        try:
+            self.call("ping", [])
+            return True
+        except (ModelServerUnavailable, RuntimeError):
+            return False
+
+
+_client: Optional[ModelServerClient] = None
+_client_lock = threading.Lock()
+
+
+def get_model_server_client() -> ModelServerClient:
+    """Process-wide client singleton"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ModelServerClient(
+                settings.model_server_address,
+                timeout=settings.model_server_timeout,
+                retry_interval=settings.model_server_retry_interval
+            )
+        return _client
+
+
+class RemotePipeline:
+    """
+    Callable with the same call convention as the transformers pipelines used by
+    the moderation services: a single input returns that input's result, a list
+    returns one result per input
+    """
+
+    device = "model-server"
+
+    def __init__(self, op: str, local_loader: Callable[[], Any]):
+        self.op = op
+        self.client = get_model_server_client()
+        self._local_loader = local_loader
+        self._local = None
+        self._local_lock = threading.Lock()
+
+    def _local_model(self):
+        with self._local_lock:
+            if self._local is None:
+                logger.warning(f"Model server unavailable, loading '{self.op}' model in-process")
+                self._local = self._local_loader()
+        return self._local
+
+    def _run_remote(self, items: List[Any], kwargs: Dict) -> List[Any]:
+        return self.client.call(self.op, items, kwargs)
+
+    def _run_local(self, inputs, kwargs: Dict):
+        return self._local_model()(inputs, **kwargs)
+
+    def __call__(self, inputs, **kwargs):
+        single = not isinstance(inputs, list)
+        try:
+            results = self._run_remote([inputs] if single else inputs, kwargs)
+        except ModelServerUnavailable as e:
+            if not settings.model_server_fallback_local:
+                raise
+            logger.warning(f"{e} - running '{self.op}' in-process")
+            return self._run_local(inputs, kwargs)
+
+        if not single:
+            return results
+        # text-classification with top_k=None wraps a single input's scores in a list
+        if self.op in (OP_TEXT_CLASSIFICATION, OP_DISTILLED_TEXT_CLASSIFICATION):
+            return [results[0]]
+        return results[0]
+
+
+class RemoteSentenceEncoder(RemotePipeline):
+    """Proxy for SentenceTransformer.encode"""
+
+    def _run_local(self, inputs, kwargs: Dict):
+        return self._local_model().encode(inputs, **kwargs)
+
+    def encode(self, sentences, **kwargs):
+        import numpy as np
+
+        single = isinstance(sentences, str)
+        try:
+            rows = self._run_remote([sentences] if single else list(sentences), kwargs)
+        except ModelServerUnavailable as e:
+            if not settings.model_server_fallback_local:
+                raise
+            logger.warning(f"{e} - running '{self.op}' in-process")
+            return self._run_local(sentences, kwargs)
+
+        embeddings = np.asarray(rows)
+        return embeddings[0] if single else embeddings
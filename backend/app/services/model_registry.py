@@ -0,0 +1,221 @@
+"""
+Model Registry
+Lazily constructs the AI services so importing the routes does not load
+torch/transformers or any model weights. Each service is built at most once,
+either on first use or by a background warm-up started after the API is up.
+A service is only published once it has run a synthetic warm-up batch, and
+its status is tracked for the readiness endpoint. After a failed load the
+service stays failed for a backoff period (doubling per consecutive failure)
+before anything tries to load it again, so gated requests do not start a
+reload each.
+"""
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import threading
+import logging
+import time
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+TEXT_MODERATION = "text_moderation"
+IMAGE_MODERATION = "image_moderation"
+RECOMMENDATION = "recommendation"
+
+# Per-model lifecycle
+STATUS_NOT_LOADED = "not_loaded"
+STATUS_LOADING = "loading"
+STATUS_WARMING = "warming"
+STATUS_READY = "ready"
+STATUS_DEGRADED = "degraded"  # loaded, but running on the rule/tag-based fallback
+STATUS_FAILED = "failed"
+READY_STATUSES = (STATUS_READY, STATUS_DEGRADED)
+
+
+def _build_text_moderation():
+    from app.services.moderation_service import ContentModerationService
+    return ContentModerationService()
+
+
+def _build_image_moderation():
+    from app.services.moderation_service import ImageModerationService
+    return ImageModerationService()
+
+
+def _build_recommendation():
+    from app.services.recommendation_service import RecommendationService
+    return RecommendationService()
+
+
+class ModelRegistry:
+    """
+    Thread-safe lazy container for the model-backed services
+    Loading happens in worker threads so the event loop keeps serving requests
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._status: Dict[str, str] = {}
+        self._errors: Dict[str, str] = {}
+        self._failures: Dict[str, int] = {}
+        self._retry_at: Dict[str, float] = {}
+        self._scheduled: set = set()
+        self._scheduling_lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        """Register a factory, the service is only built when first requested"""
+        self._factories[name] = factory
+        self._locks[name] = threading.Lock()
+        self._status[name] = STATUS_NOT_LOADED
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._factories)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._instances
+
+    def is_ready(self, name: str) -> bool:
+        """Loaded and warmed up (possibly degraded to its fallback)"""
+        return self._status.get(name) in READY_STATUSES
+
+    def all_ready(self) -> bool:
+        return all(self.is_ready(name) for name in self._factories)
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Per-model status for the readiness endpoint"""
+        return {
+            name: {
+                "status": self._status[name],
+                "error": self._errors.get(name),
+                "retry_in_seconds": self._retry_in(name) or None
+            }
+            for name in self._factories
+        }
+
+    def _retry_in(self, name: str) -> float:
+        """Seconds until a failed service may be loaded again (0 = now)"""
+        if self._status.get(name) != STATUS_FAILED:
+            return 0.0
+        return max(0.0, self._retry_at.get(name, 0.0) - time.monotonic())
+
+    def _record_failure(self, name: str, error: Exception):
+        failures = self._failures.get(name, 0) + 1
+        self._failures[name] = failures
+        delay = min(settings.model_load_retry_base_seconds * 2 ** (failures - 1), settings.model_load_retry_max_seconds)
+        self._retry_at[name] = time.monotonic() + delay
+        self._status[name] = STATUS_FAILED
+        self._errors[name] = str(error)
+        logger.error(f"Loading '{name}' failed ({failures} in a row), next attempt in {delay:.0f}s: {error}")
+
+    def _warm_up(self, name: str, instance: Any) -> str:
+        """
+        Run the service's synthetic warm-up batch so the first real request does not
+        pay for lazy allocations and kernel selection
+        """
+        warm_up = getattr(instance, "warm_up", None)
+        if warm_up is None:
+            return STATUS_READY
+        try:
+            uses_model = warm_up(settings.model_warmup_batch_size)
+        except Exception as e:
+            logger.error(f"Warm-up of '{name}' failed, requests will use its fallback: {e}")
+            self._errors[name] = f"warm-up failed: {e}"
+            return STATUS_DEGRADED
+        return STATUS_READY if uses_model else STATUS_DEGRADED
+
+    def get(self, name: str) -> Any:
+        """Return the service, building it on first use (blocking)"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._locks[name]:
+            # Another thread may have finished loading while we waited
+            instance = self._instances.get(name)
+            if instance is None:
+                retry_in = self._retry_in(name)
+                if retry_in:
+                    raise RuntimeError(
+                        f"loading '{name}' failed, next attempt in {retry_in:.0f}s: {self._errors.get(name)}"
+                    )
+                logger.info(f"Loading model service '{name}'...")
+                self._status[name] = STATUS_LOADING
+                try:
+                    instance = self._factories[name]()
+                except Exception as e:
+                    self._record_failure(name, e)
+                    raise
+                self._errors.pop(name, None)
+                self._failures.pop(name, None)
+
+                self._status[name] = STATUS_WARMING
+                final_status = self._warm_up(name, instance)
+                self._instances[name] = instance
+                self._status[name] = final_status
+                logger.info(f"Model service '{name}' loaded ({final_status})")
+        return instance
+
+    async def aget(self, name: str) -> Any:
+        """Async accessor - loads in a worker thread instead of blocking the event loop"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        return await asyncio.to_thread(self.get, name)
+
+    def warm_up_in_background(self, names: Optional[List[str]] = None):
+        """Load and warm up the given services (default: all) in a daemon thread"""
+        with self._scheduling_lock:
+            pending = [
+                name for name in (names or self.names)
+                if name not in self._scheduled and not self.is_loaded(name) and not self._retry_in(name)
+            ]
+            self._scheduled.update(pending)
+        if not pending:
+            return
+
+        def _warm_up():
+            for name in pending:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    logger.error(f"Background loading of '{name}' failed: {e}")
+                finally:
+                    with self._scheduling_lock:
+                        self._scheduled.discard(name)
+
+        threading.Thread(target=_warm_up, name="model-warmup", daemon=True).start()
+
+    def ensure_loading(self, name: str) -> bool:
+        """
+        Non-blocking readiness check used by request gating
+        Returns True if the service is ready, otherwise makes sure it is being
+        loaded in the background (so lazy mode also becomes ready) and returns False
+        A failed service is only rescheduled once its backoff has passed
+        """
+        if self.is_ready(name):
+            return True
+        self.warm_up_in_background([name])
+        return False
+
+
+# Singleton instance
+model_registry = ModelRegistry()
+model_registry.register(TEXT_MODERATION, _build_text_moderation)
+model_registry.register(IMAGE_MODERATION, _build_image_moderation)
+model_registry.register(RECOMMENDATION, _build_recommendation)
+
+
+async def get_content_moderation_service():
+    return await model_registry.aget(TEXT_MODERATION)
+
+
+async def get_image_moderation_service():
+    return await model_registry.aget(IMAGE_MODERATION)
+
+
+async def get_recommendation_service():
+    return await model_registry.aget(RECOMMENDATION)
@@ -0,0 +1,227 @@
+"""
+Shared Model Server
+Holds a single copy of toxic-bert, the NSFW ViT, CLIP and MiniLM for all API
+workers on a node. Workers connect over a Unix socket (or named pipe / TCP)
+through model_client.py. Requests for the same model arriving from different
+workers are merged into batches, and each model has a bounded queue: when it
+is full the request is rejected right away instead of piling up.
+
+Usage:
+    MODEL_SERVER_AUTHKEY=<random secret> python -m app.services.model_server --address /tmp/dacn2-models.sock
+    # then start the API workers with MODEL_SERVER_ADDRESS=/tmp/dacn2-models.sock
+    # and the same MODEL_SERVER_AUTHKEY (not the JWT SECRET_KEY)
+"""
+from typing import Any, Dict, List, Optional
+from multiprocessing.connection import Listener
+import argparse
+import os
+import queue
+import threading
+import time
+import logging
+
+from app.config import settings
+from app.services.inference_backends import (
+    LOCAL_LOADERS,
+    OP_TEXT_CLASSIFICATION,
+    OP_DISTILLED_TEXT_CLASSIFICATION,
+    OP_IMAGE_CLASSIFICATION,
+    OP_ZERO_SHOT_IMAGE,
+    OP_ENCODE
+)
+from app.services.model_client import parse_address, server_authkey
+
+logger = logging.getLogger(__name__)
+
+
+def _model_config(op: str):
+    """(model name, backend) served for each operation"""
+    return {
+        OP_TEXT_CLASSIFICATION: (settings.text_moderation_model, settings.text_moderation_backend),
+        OP_DISTILLED_TEXT_CLASSIFICATION: (settings.cascade_distilled_model, settings.cascade_distilled_backend),
+        OP_IMAGE_CLASSIFICATION: (settings.nsfw_image_model, settings.nsfw_image_backend),
+        OP_ZERO_SHOT_IMAGE: (settings.clip_model, settings.clip_backend),
+        OP_ENCODE: (settings.embedding_model, settings.embedding_backend),
+    }[op]
+
+
+def _default_ops() -> List[str]:
+    """Every operation whose model is configured"""
+    return [op for op in LOCAL_LOADERS if _model_config(op)[0]]
+
+
+class _Request:
+    """One client request waiting for its slice of a batch"""
+
+    def __init__(self, items: List[Any], kwargs: Dict):
+        self.items = items
+        self.kwargs = kwargs
+        self.done = threading.Event()
+        self.ok = True
+        self.result: Any = None
+
+
+class ModelWorker:
+    """Owns one model, a bounded request queue and the batching thread"""
+
+    def __init__(self, op: str, max_batch_size: int, max_wait_ms: int, queue_size: int):
+        self.op = op
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue: "queue.Queue[_Request]" = queue.Queue(maxsize=queue_size)
+        self.model = None
+        # Request with other kwargs than the batch being collected, it starts the next batch
+        self._carry: Optional[_Request] = None
+        self.batches = 0
+        self.items = 0
+
+    def load(self):
+        model_name, backend = _model_config(self.op)
+        print(f"[MODEL SERVER] Loading {self.op}: {model_name} ({backend})")
+        self.model = LOCAL_LOADERS[self.op](model_name, backend)
+
+    def submit(self, request: _Request) -> bool:
+        """Enqueue without blocking, False if the queue is full"""
+        try:
+            self.queue.put_nowait(request)
+            return True
+        except queue.Full:
+            return False
+
+    def _collect_batch(self) -> List[_Request]:
+        """
+        Block for the first request, then keep collecting until the batch is full
+        or max_wait has passed. Requests with different kwargs are not merged: the
+        first one closes the batch and is carried over to start the next one
+        """
+        first, self._carry = self._carry, None
+        if first is None:
+            first = self.queue.get()
+        batch = [first]
+        size = len(first.items)
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request.kwargs != first.kwargs:
+                self._carry = request
+                break
+            batch.append(request)
+            size += len(request.items)
+        return batch
+
+    def _infer(self, items: List[Any], kwargs: Dict) -> List[Any]:
+        if self.op == OP_ENCODE:
+            return [row for row in self.model.encode(items, **kwargs)]
+        return list(self.model(items, **kwargs))
+
+    def _run(self, batch: List[_Request]):
+        items = [item for request in batch for item in request.items]
+        try:
+            results = self._infer(items, batch[0].kwargs) if items else []
+            offset = 0
+            for request in batch:
+                request.result = results[offset:offset + len(request.items)]
+                offset += len(request.items)
+        except Exception as e:
+            logger.error(f"[MODEL SERVER] {self.op} batch failed: {e}")
+            for request in batch:
+                request.ok = False
+                request.result = str(e)
+        self.batches += 1
+        self.items += len(items)
+        for request in batch:
+            request.done.set()
+
+    def serve_forever(self):
+        while True:
+            self._run(self._collect_batch())
+
+
+class ModelServer:
+    """Accepts worker connections and routes their requests to the model workers"""
+
+    def __init__(self, address: str, ops: Optional[List[str]] = None):
+        self.address = parse_address(address)
+        self.workers: Dict[str, ModelWorker] = {
+            op: ModelWorker(
+                op,
+                max_batch_size=settings.model_server_max_batch_size,
+                max_wait_ms=settings.model_server_max_wait_ms,
+                queue_size=settings.model_server_queue_size
+            )
+            for op in (ops or _default_ops())
+        }
+
+    def _handle_connection(self, conn):
+        try:
+            while True:
+                request_id, op, items, kwargs = conn.recv()
+                if op == "ping":
+                    conn.send((request_id, True, []))
+                    continue
+
+                worker = self.workers.get(op)
+                if worker is None:
+                    conn.send((request_id, False, f"unknown operation '{op}'"))
+                    continue
+
+                request = _Request(items, kwargs)
+                if not worker.submit(request):
+                    conn.send((request_id, False, "overloaded"))
+                    continue
+                request.done.wait()
+                conn.send((request_id, request.ok, request.result))
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    def serve_forever(self):
+        for worker in self.workers.values():
+            worker.load()
+            threading.Thread(target=worker.serve_forever, name=f"batcher-{worker.op}", daemon=True).start()
+
+        if isinstance(self.address, str) and not self.address.startswith("\\\\") and os.path.exists(self.address):
+            os.remove(self.address)  # stale socket from a previous run
+
+        with Listener(self.address, authkey=server_authkey()) as listener:
+            print(f"[MODEL SERVER] Listening on {self.address}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    # Failed handshakes (wrong authkey, dropped client) must not stop the server
+                    logger.warning(f"[MODEL SERVER] Rejected connection: {e}")
+                    continue
+                threading.Thread(target=self._handle_connection, args=(conn,), daemon=True).start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared model server for API workers")
+    parser.add_argument("--address", default=settings.model_server_address,
+                        help="Unix socket path, host:port, or \\\\.\\pipe\\name on Windows")
+    parser.add_argument("--ops", nargs="+", choices=list(LOCAL_LOADERS),
+                        help="Only serve these models (default: all)")
+    args = parser.parse_args()
+    if not args.address:
+        parser.error("--address (or MODEL_SERVER_ADDRESS) is required")
+    try:
+        parse_address(args.address)
+        server_authkey()
+    except ValueError as e:
+        parser.error(str(e))
+
+    # The server itself must load real models, never proxies to itself
+    settings.model_server_address = None
+    logging.basicConfig(level=logging.INFO)
+    ModelServer(args.address, args.ops).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Tiered Moderation Cascade
+Cheap tiers run before toxic-bert and return early when the verdict is clear:
+1. Spam rules (compiled regex/gibberish checks) and a lexicon prefilter
+   (targeted abuse -> toxic, short text made only of common benign words -> safe;
+   general profanity is not decided here, it escalates)
+2. Optional small distilled classifier with calibrated safe/toxic thresholds
+3. Only ambiguous text escalates to the full toxic-bert model
+Exit counts per tier are kept for the metrics endpoint.
+"""
+from typing import Callable, Dict, Optional
+import re
+import threading
+import logging
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Tier names (also stored on results as "moderation_tier")
+TIER_SPAM_RULES = "spam_rules"
+TIER_LEXICON_TOXIC = "lexicon_toxic"
+TIER_LEXICON_SAFE = "lexicon_safe"
+TIER_DISTILLED_SAFE = "distilled_safe"
+TIER_DISTILLED_TOXIC = "distilled_toxic"
+TIER_FULL_MODEL = "full_model"
+TIER_RULE_FALLBACK = "rule_fallback"
+TIER_NEAR_DUPLICATE = "near_duplicate"  # matched blocked content in the near-duplicate index
+TIERS = [
+    TIER_NEAR_DUPLICATE, TIER_SPAM_RULES, TIER_LEXICON_TOXIC, TIER_LEXICON_SAFE,
+    TIER_DISTILLED_SAFE, TIER_DISTILLED_TOXIC, TIER_FULL_MODEL, TIER_RULE_FALLBACK
+]
+
+# Targeted abuse only: telling someone to kill themselves, or an insult aimed at
+# the reader. Profanity on its own ("holy shit this is great", "this bitch of a
+# bug") escalates to the models, which read the context
+TOXIC_LEXICON_PATTERN = re.compile(
+    r"\b(kill (yo)?urself|kys|go die|hope you die|neck yourself|"
+    r"you('re| are)? (a |an )?((stupid|fucking|worthless|ugly) )*"
+    r"(bitch|cunt|asshole|motherfucker|dickhead|piece of shit))\b",
+    re.IGNORECASE
+)
+
+# Common benign words: short text made only of these cannot be toxic
+SAFE_LEXICON = frozenset("""
+a about absolutely agree agreed all amazing an and article awesome beautiful best birthday
+brilliant can cant can't congrats congratulations cool cute day definitely delicious did done
+exactly excellent fantastic for fun glad good great haha happy hello helpful here hey hi how
+i i'm idea ideas im indeed info informative inspiring interesting is it it's its just keep
+learned lol looks love lovely me more much my new nice now of oh ok okay omg perfect photo pic
+picture please post read really recipe same see share sharing so super sure that that's the
+this thanks thank thx tip tips to today too totally true up useful very wait was we welcome
+well what wonderful work wow yeah yes you your
+""".split())
+
+_WORD_PATTERN = re.compile(r"[a-z']+")
+
+
+class TierCounters:
+    """Thread-safe exit counts per tier"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {tier: 0 for tier in TIERS}
+
+    def record(self, tier: str):
+        with self._lock:
+            self._counts[tier] = self._counts.get(tier, 0) + 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict(self._counts)
+        counts["total"] = sum(counts.values())
+        return counts
+
+
+def _result(tier: str, is_toxic: bool, is_spam: bool, confidence: float, details: str) -> Dict:
+    return {
+        "is_toxic": is_toxic,
+        "is_spam": is_spam,
+        "is_hate_speech": False,
+        "confidence_score": confidence,
+        "details": details,
+        "moderation_tier": tier
+    }
+
+
+class ModerationCascade:
+    """
+    Early-exit tiers in front of the full model
+
+    Args:
+        spam_check: the service's rule-based spam detector
+        distilled_classifier: optional small text-classification pipeline (top_k=None)
+    """
+
+    def __init__(self, spam_check: Callable[[str], bool], distilled_classifier=None):
+        self.spam_check = spam_check
+        self.distilled_classifier = distilled_classifier
+        self.counters = TierCounters()
+
+    def _lexicon_tier(self, text: str) -> Optional[Dict]:
+        if TOXIC_LEXICON_PATTERN.search(text):
+            return _result(TIER_LEXICON_TOXIC, True, False, 0.9, "toxic language detected (lexicon prefilter)")
+
+        words = _WORD_PATTERN.findall(text.lower())
+        if words and len(words) <= settings.cascade_safe_max_words and all(w in SAFE_LEXICON for w in words):
+            return _result(TIER_LEXICON_SAFE, False, False, 0.0, "content appears safe (lexicon prefilter)")
+        return None
+
+    def _distilled_toxic_score(self, text: str) -> Optional[float]:
+        results = self.distilled_classifier(text[:512])
+        if results and isinstance(results[0], list):
+            results = results[0]
+        scores = {r['label'].lower(): r['score'] for r in results}
+        return scores.get(settings.cascade_distilled_toxic_label.lower())
+
+    def _distilled_tier(self, text: str) -> Optional[Dict]:
+        if self.distilled_classifier is None:
+            return None
+        try:
+            toxic_score = self._distilled_toxic_score(text)
+        except Exception as e:
+            logger.error(f"Distilled classifier failed, escalating: {e}")
+            return None
+        if toxic_score is None:
+            return None
+
+        if toxic_score <= settings.cascade_distilled_safe_threshold:
+            return _result(TIER_DISTILLED_SAFE, False, False, float(toxic_score),
+                           f"content appears safe (distilled model, toxic: {toxic_score:.2f})")
+        if toxic_score >= settings.cascade_distilled_toxic_threshold:
+            return _result(TIER_DISTILLED_TOXIC, True, False, float(toxic_score),
+                           f"toxic language (distilled model confidence: {toxic_score:.2f})")
+        return None
+
+    def try_early_exit(self, text: str) -> Optional[Dict]:
+        """
+        Run the cheap tiers, returning a final result or None when the text
+        is ambiguous and must go to the full model
+        """
+        if self.spam_check(text):
+            result = _result(TIER_SPAM_RULES, False, True, 0.8, "spam patterns detected")
+        else:
+            result = self._lexicon_tier(text) or self._distilled_tier(text)
+
+        if result is not None:
+            self.counters.record(result["moderation_tier"])
+        return result
+
+
+# Exit counts of the running service, exposed by /health/metrics
+_active_cascade: Optional[ModerationCascade] = None
+
+
+def set_active_cascade(cascade: ModerationCascade):
+    global _active_cascade
+    _active_cascade = cascade
+
+
+def cascade_metrics() -> Dict[str, int]:
+    if _active_cascade is None:
+        return {tier: 0 for tier in TIERS}
+    return _active_cascade.counters.snapshot()
@@ -2,16 +2,49 @@
 Content Moderation Service using AI Models
 This service provides text and image moderation capabilities using pre-trained models
 """
-from typing import Dict, Optional
-import torch
-from transformers import pipeline, AutoModelForSequenceClassification, AutoTokenizer
+from typing import Dict, List, Optional
 from PIL import Image
 import io
+import re
 import httpx
 import logging
 
+from app.config import settings
+from app.services.inference_backends import (
+    load_text_classification_pipeline,
+    load_distilled_text_classification_pipeline,
+    load_image_classification_pipeline,
+    load_zero_shot_image_pipeline
+)
+from app.services.model_client import ModelServerOverloaded
+from app.services.moderation_cascade import (
+    ModerationCascade,
+    set_active_cascade,
+    TIER_FULL_MODEL,
+    TIER_RULE_FALLBACK
+)
+
 logger = logging.getLogger(__name__)
 
+# Zero-shot categories scored by CLIP
+CLIP_CANDIDATE_LABELS = [
+    "safe normal content",
+    "violence weapons war military combat",
+    "gore blood graphic injury death",
+    "scary horror disturbing frightening ghost"
+]
+
+# Rule-based spam detection, compiled once instead of on every check
+SPAM_PATTERNS = [
+    re.compile(r'(buy now|click here|limited offer|act fast)'),
+    re.compile(r'(www\.|http|\.com){3,}'),
+    re.compile(r'([A-Z]{5,}.*){3,}'),
+    re.compile(r'(\$\$\$|!!!){3,}')
+]
+NON_ALPHA_PATTERN = re.compile(r'[^a-zA-Z]')
+MIXED_ALNUM_PATTERN = re.compile(r'[a-zA-Z]+\d+[a-zA-Z]*\d+')
+DIGIT_PATTERN = re.compile(r'\d')
+
 
 class ContentModerationService:
     """
@@ -19,7 +52,9 @@ class ContentModerationService:
     Model: unitary/toxic-bert (Toxic comment classification)
     """
 
-    def __init__(self):
+    def __init__(self, backend: Optional[str] = None):
+        # Rules are always available (model failure, or degraded mode under load)
+        self._init_fallback()
         try:
             print("=" * 60)
             print("LOADING AI TEXT MODERATION MODEL...")
@@ -29,29 +64,19 @@ class ContentModerationService:
             logger.info("=" * 60)
 
             # Load toxicity detection model
-            self.model_name = "unitary/toxic-bert"
+            self.model_name = settings.text_moderation_model
+            self.backend = backend or settings.text_moderation_backend
             print(f"Model: {self.model_name}")
-            print("Downloading/Loading tokenizer...")
+            print(f"Inference backend: {self.backend}")
+            print("Downloading/Loading tokenizer and model weights...")
             logger.info(f"Model: {self.model_name}")
-            logger.info("Downloading/Loading tokenizer...")
-            self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-
-            print("Downloading/Loading model weights...")
-            logger.info("Downloading/Loading model weights...")
-            self.model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+            logger.info(f"Inference backend: {self.backend}")
+            logger.info("Downloading/Loading tokenizer and model weights...")
 
             # Create pipeline for easier inference
-            device = 0 if torch.cuda.is_available() else -1
-            print(f"Device: {'GPU (CUDA)' if device == 0 else 'CPU'}")
-            logger.info(f"Device: {'GPU (CUDA)' if device == 0 else 'CPU'}")
-
-            self.classifier = pipeline(
-                "text-classification",
-                model=self.model,
-                tokenizer=self.tokenizer,
-                top_k=None,
-                device=device
-            )
+            self.classifier = load_text_classification_pipeline(self.model_name, self.backend)
+            print(f"Device: {self.classifier.device}")
+            logger.info(f"Device: {self.classifier.device}")
 
             # Toxicity labels from toxic-bert
             self.toxic_labels = ['toxic', 'severe_toxic', 'obscene', 'threat', 'insult', 'identity_hate']
@@ -72,7 +97,24 @@ class ContentModerationService:
             logger.error(f"❌ Failed to load toxicity model: {e}")
             logger.warning("⚠️  Falling back to rule-based detection (NOT ML)")
             self.classifier = None
-            self._init_fallback()
+
+        self.cascade_enabled = settings.moderation_cascade_enabled
+        self.cascade = ModerationCascade(self._check_spam, self._load_distilled_classifier())
+        set_active_cascade(self.cascade)
+
+    def _load_distilled_classifier(self):
+        """Optional small classifier for the middle cascade tier"""
+        if not self.cascade_enabled or not settings.cascade_distilled_model or self.classifier is None:
+            return None
+        try:
+            print(f"Loading distilled cascade model: {settings.cascade_distilled_model} ({settings.cascade_distilled_backend})")
+            return load_distilled_text_classification_pipeline(
+                settings.cascade_distilled_model,
+                settings.cascade_distilled_backend
+            )
+        except Exception as e:
+            logger.error(f"Failed to load distilled cascade model, ambiguous text goes to {self.model_name}: {e}")
+            return None
 
     def _init_fallback(self):
         """Initialize fallback rule-based detection"""
@@ -81,6 +123,19 @@ class ContentModerationService:
             'idiot', 'stupid', 'dumb', 'moron', 'kill yourself'
         ]
 
+    def warm_up(self, batch_size: int = 4) -> bool:
+        """
+        Run a synthetic batch through the model (first inference allocates buffers
+        and selects kernels). Returns False when running on the rule-based fallback
+        """
+        if self.classifier is None:
+            return False
+        batch = ["This is a short synthetic sentence used to warm up the model."] * batch_size
+        self.classifier(batch)
+        if self.cascade.distilled_classifier is not None:
+            self.cascade.distilled_classifier(batch)
+        return True
+
     async def moderate_text(self, text: str) -> Dict:
         """
         Moderate text content for toxic, spam, and hate speech
@@ -91,27 +146,80 @@ class ContentModerationService:
         Returns:
             Dictionary containing moderation results
         """
+        return self.moderate_text_sync(text)
+
+    def moderate_text_sync(self, text: str) -> Dict:
+        """Blocking variant of moderate_text, for running in a worker thread"""
         if not text or len(text.strip()) == 0:
-            return {
-                "is_toxic": False,
-                "is_spam": False,
-                "is_hate_speech": False,
-                "confidence_score": 0.0,
-                "details": "empty content"
-            }
+            return self._empty_result()
 
         # If model loaded successfully, use AI detection
         if self.classifier is not None:
+            # Cheap tiers first, only ambiguous text reaches toxic-bert
+            if self.cascade_enabled:
+                result = self.cascade.try_early_exit(text)
+                if result is not None:
+                    return result
             try:
-                return await self._ai_moderate_text(text)
+                result = self._ai_moderate_text(text)
+                self.cascade.counters.record(TIER_FULL_MODEL)
+                return result
+            except ModelServerOverloaded:
+                # Not a model failure, the caller decides how to degrade
+                raise
             except Exception as e:
                 logger.error(f"AI moderation failed: {e}, falling back to rules")
-                return self._fallback_moderate_text(text)
-        else:
-            # Use fallback rule-based detection
-            return self._fallback_moderate_text(text)
 
-    async def _ai_moderate_text(self, text: str) -> Dict:
+        # Use fallback rule-based detection
+        return self.moderate_text_rules(text)
+
+    def moderate_texts_sync(self, texts: List[str]) -> List[Dict]:
+        """
+        Moderate many texts at once (batch jobs): cascade exits first, then one
+        batched toxic-bert call for the remaining texts
+        """
+        results: List[Optional[Dict]] = [None] * len(texts)
+        pending = []
+        for i, text in enumerate(texts):
+            if not text or len(text.strip()) == 0:
+                results[i] = self._empty_result()
+            elif self.classifier is None:
+                results[i] = self.moderate_text_rules(text)
+            elif self.cascade_enabled and (early := self.cascade.try_early_exit(text)) is not None:
+                results[i] = early
+            else:
+                pending.append(i)
+
+        if pending:
+            batch = [texts[i][:512] for i in pending]
+            try:
+                outputs = self.classifier(batch)
+                for i, text, output in zip(pending, batch, outputs):
+                    results[i] = self._text_result_from_scores(text, self._label_scores(output))
+                    self.cascade.counters.record(TIER_FULL_MODEL)
+            except ModelServerOverloaded:
+                raise
+            except Exception as e:
+                logger.error(f"Batched AI moderation failed: {e}, falling back to rules")
+                for i in pending:
+                    results[i] = self.moderate_text_rules(texts[i])
+        return results
+
+    def _empty_result(self) -> Dict:
+        return {
+            "is_toxic": False,
+            "is_spam": False,
+            "is_hate_speech": False,
+            "confidence_score": 0.0,
+            "details": "empty content"
+        }
+
+    def moderate_text_rules(self, text: str) -> Dict:
+        """Rule-based moderation only - no model, used as fallback and when degraded under load"""
+        self.cascade.counters.record(TIER_RULE_FALLBACK)
+        return self._fallback_moderate_text(text)
+
+    def _ai_moderate_text(self, text: str) -> Dict:
         """AI-based text moderation using toxic-bert"""
         print("Using TRAINED ML MODEL (toxic-bert) for text moderation")
         print(f"Text length: {len(text)} characters")
@@ -132,13 +240,20 @@ class ContentModerationService:
         print(f"ML Model prediction complete!")
         logger.info(f"ML Model prediction complete!")
 
-        # Parse results
+        return self._text_result_from_scores(text, self._label_scores(results[0]))
+
+    @staticmethod
+    def _label_scores(output) -> Dict[str, float]:
+        """Per-label scores of one text from the pipeline output"""
         scores = {}
-        for result in results[0]:
+        for result in output:
             label = result['label'].lower()
             score = result['score']
             scores[label] = score
+        return scores
 
+    def _text_result_from_scores(self, text: str, scores: Dict[str, float]) -> Dict:
+        """Apply the toxic-bert thresholds to the label scores of one text"""
         # Determine toxicity
         toxic_score = scores.get('toxic', 0.0)
         severe_toxic_score = scores.get('severe_toxic', 0.0)
@@ -208,31 +323,23 @@ class ContentModerationService:
             "is_spam": is_spam,
             "is_hate_speech": is_hate_speech,
             "confidence_score": float(confidence_score),
-            "details": ", ".join(details) if details else "content appears safe"
+            "details": ", ".join(details) if details else "content appears safe",
+            "moderation_tier": TIER_FULL_MODEL
         }
 
     def _check_spam(self, text: str) -> bool:
         """Enhanced spam detection including gibberish/nonsense text"""
-        import re
-
         print(f"[SPAM CHECK] Checking text: '{text}' (length: {len(text)})")
 
-        # Traditional spam patterns
-        spam_patterns = [
-            r'(buy now|click here|limited offer|act fast)',
-            r'(www\.|http|\.com){3,}',
-            r'([A-Z]{5,}.*){3,}',
-            r'(\$\$\$|!!!){3,}'
-        ]
         text_lower = text.lower()
 
         # Check traditional spam patterns
-        if any(re.search(pattern, text_lower) for pattern in spam_patterns):
+        if any(pattern.search(text_lower) for pattern in SPAM_PATTERNS):
             return True
 
         # NEW: Detect gibberish/random text
         # Remove spaces and count only alphabetic characters
-        clean_text = re.sub(r'[^a-zA-Z]', '', text)
+        clean_text = NON_ALPHA_PATTERN.sub('', text)
 
         # Skip if too short, but allow checking for very short meaningless strings
         if len(clean_text) < 3:
@@ -254,8 +361,8 @@ class ContentModerationService:
                 return True
 
         # Pattern 2: Mixed numbers and letters randomly (e.g., àle12321, abc123xyz456)
-        mixed_pattern = re.search(r'[a-zA-Z]+\d+[a-zA-Z]*\d+', text)
-        if mixed_pattern and len(re.findall(r'\d', text)) > 3:
+        mixed_pattern = MIXED_ALNUM_PATTERN.search(text)
+        if mixed_pattern and len(DIGIT_PATTERN.findall(text)) > 3:
             print(f"SPAM DETECTED: Random number/letter mix")
             return True
 
@@ -340,7 +447,8 @@ class ContentModerationService:
             "is_spam": is_spam,
             "is_hate_speech": is_hate_speech,
             "confidence_score": confidence_score,
-            "details": ", ".join(details) if details else "content appears safe"
+            "details": ", ".join(details) if details else "content appears safe",
+            "moderation_tier": TIER_RULE_FALLBACK
         }
 
     async def should_block_content(self, moderation_result: Dict) -> bool:
@@ -360,24 +468,21 @@ class ImageModerationService:
     Model: Falconsai/nsfw_image_detection
     """
 
-    def __init__(self):
+    def __init__(self, backend: Optional[str] = None):
         try:
             print("=" * 60)
             print("LOADING AI IMAGE MODERATION MODEL...")
             print("=" * 60)
             logger.info("Loading NSFW detection model...")
-            from transformers import pipeline
 
             # Load NSFW detection model
-            self.model_name = "Falconsai/nsfw_image_detection"
+            self.model_name = settings.nsfw_image_model
+            self.backend = backend or settings.nsfw_image_backend
             print(f"Model: {self.model_name}")
+            print(f"Inference backend: {self.backend}")
             print("Downloading/Loading image classification model...")
 
-            self.classifier = pipeline(
-                "image-classification",
-                model=self.model_name,
-                device=0 if torch.cuda.is_available() else -1
-            )
+            self.classifier = load_image_classification_pipeline(self.model_name, self.backend)
 
             print("=" * 60)
             print("IMAGE MODERATION MODEL READY!")
@@ -391,15 +496,13 @@ class ImageModerationService:
             print("\n" + "=" * 60)
             print("LOADING CLIP MODEL FOR MULTI-LABEL CLASSIFICATION...")
             print("=" * 60)
-            self.clip_model_name = "openai/clip-vit-base-patch32"
+            self.clip_model_name = settings.clip_model
+            self.clip_backend = backend or settings.clip_backend
             print(f"Model: {self.clip_model_name}")
+            print(f"Inference backend: {self.clip_backend}")
             print("Loading zero-shot classification model...")
 
-            self.clip_classifier = pipeline(
-                "zero-shot-image-classification",
-                model=self.clip_model_name,
-                device=0 if torch.cuda.is_available() else -1
-            )
+            self.clip_classifier = load_zero_shot_image_pipeline(self.clip_model_name, self.clip_backend)
 
             print("=" * 60)
             print("CLIP MODEL READY!")
@@ -415,6 +518,20 @@ class ImageModerationService:
             self.classifier = None
             self.clip_classifier = None
 
+    def warm_up(self, batch_size: int = 4) -> bool:
+        """
+        Run synthetic images through the NSFW and CLIP models
+        Returns False when no image model is available (moderation defaults to safe)
+        """
+        if not self.classifier and not self.clip_classifier:
+            return False
+        images = [Image.new('RGB', (224, 224), color=(i * 60 % 256, 128, 200)) for i in range(batch_size)]
+        if self.classifier:
+            self.classifier(images)
+        if self.clip_classifier:
+            self.clip_classifier(images, candidate_labels=CLIP_CANDIDATE_LABELS)
+        return True
+
     async def moderate_image(self, image_url: str) -> Dict:
         """
         Moderate image for multiple content types:
@@ -452,111 +569,94 @@ class ImageModerationService:
                 image_bytes = base64.b64decode(image_data)
                 print(f"[IMAGE MOD] Decoded base64, size: {len(image_bytes)} bytes")
             else:
-                # Download image from URL
-                print(f"[IMAGE MOD] Downloading image from URL...")
-                async with httpx.AsyncClient(timeout=10.0) as client:
-                    response = await client.get(image_url)
-                    response.raise_for_status()
-                    image_bytes = response.content
-                print(f"[IMAGE MOD] Downloaded, size: {len(image_bytes)} bytes")
+                image_bytes = await self.download_image(image_url)
+        except Exception as e:
+            logger.error(f"Image moderation failed: {e}")
+            # On error, default to safe to not block legitimate content
+            return {
+                "is_nsfw": False,
+                "confidence_score": 0.0,
+                "passed": True,
+                "details": f"Moderation failed: {str(e)}, defaulting to safe"
+            }
+
+        return self.moderate_image_bytes_sync(image_bytes)
+
+    async def download_image(self, image_url: str) -> bytes:
+        """Download an external image (raises on network or HTTP errors)"""
+        print(f"[IMAGE MOD] Downloading image from URL...")
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            response = await client.get(image_url)
+            response.raise_for_status()
+            image_bytes = response.content
+        print(f"[IMAGE MOD] Downloaded, size: {len(image_bytes)} bytes")
+        return image_bytes
 
+    def moderate_image_bytes_sync(self, image_bytes: bytes) -> Dict:
+        """Decode and moderate image bytes, blocking - for running in a worker thread"""
+        if not self.classifier and not self.clip_classifier:
+            print("[IMAGE MOD] No classifiers available, defaulting to safe")
+            return {
+                "is_nsfw": False,
+                "confidence_score": 0.0,
+                "passed": True,
+                "details": "Image moderation unavailable, defaulting to safe"
+            }
+
+        try:
             # Open image
             image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
             print(f"[IMAGE MOD] Image loaded successfully, size: {image.size}")
 
-            # Initialize scores
-            nsfw_score = 0.0
-            violence_score = 0.0
-            gore_score = 0.0
-            scary_score = 0.0
-
-            # 1. NSFW Detection with trained model
-            if self.classifier:
-                print("\n[IMAGE MODERATION] === NSFW DETECTION ===")
-                results = self.classifier(image)
-
-                for result in results:
-                    label = result['label'].lower()
-                    score = result['score']
-                    print(f"[IMAGE MODERATION] {label}: {score:.4f}")
-
-                    if 'nsfw' in label:
-                        nsfw_score = max(nsfw_score, score)
-
-            # 2. Multi-label classification with CLIP
-            if self.clip_classifier:
-                print("\n[IMAGE MODERATION] === CLIP MULTI-LABEL CLASSIFICATION ===")
-
-                # Define categories for zero-shot classification
-                candidate_labels = [
-                    "safe normal content",
-                    "violence weapons war military combat",
-                    "gore blood graphic injury death",
-                    "scary horror disturbing frightening ghost"
-                ]
-
-                clip_results = self.clip_classifier(image, candidate_labels=candidate_labels)
-
-                for result in clip_results:
-                    label = result['label'].lower()
-                    score = result['score']
-                    print(f"[IMAGE MODERATION] {label}: {score:.4f}")
-
-                    if 'violence' in label or 'weapon' in label or 'war' in label:
-                        violence_score = max(violence_score, score)
-                    elif 'gore' in label or 'blood' in label:
-                        gore_score = max(gore_score, score)
-                    elif 'scary' in label or 'horror' in label:
-                        scary_score = max(scary_score, score)
-
-            # Define thresholds
-            nsfw_threshold = 0.30     # 30% for NSFW
-            violence_threshold = 0.40  # 40% for violence
-            gore_threshold = 0.30      # 30% for gore
-            scary_threshold = 0.50     # 50% for scary
-
-            # Check if any category exceeds threshold
-            is_nsfw = nsfw_score > nsfw_threshold
-            is_violence = violence_score > violence_threshold
-            is_gore = gore_score > gore_threshold
-            is_scary = scary_score > scary_threshold
-
-            # Block if ANY category fails
-            passed = not (is_nsfw or is_violence or is_gore or is_scary)
-
-            print(f"\n[IMAGE MODERATION] === FINAL RESULTS ===")
-            print(f"[IMAGE MODERATION] NSFW: {nsfw_score:.4f} (threshold: {nsfw_threshold}) - {'BLOCKED' if is_nsfw else 'OK'}")
-            print(f"[IMAGE MODERATION] Violence: {violence_score:.4f} (threshold: {violence_threshold}) - {'BLOCKED' if is_violence else 'OK'}")
-            print(f"[IMAGE MODERATION] Gore: {gore_score:.4f} (threshold: {gore_threshold}) - {'BLOCKED' if is_gore else 'OK'}")
-            print(f"[IMAGE MODERATION] Scary: {scary_score:.4f} (threshold: {scary_threshold}) - {'BLOCKED' if is_scary else 'OK'}")
-            print(f"[IMAGE MODERATION] Overall: {'BLOCKED' if not passed else 'PASSED'}")
-
-            # Build detailed message
-            blocked_categories = []
-            if is_nsfw:
-                blocked_categories.append(f"NSFW ({nsfw_score:.2f})")
-            if is_violence:
-                blocked_categories.append(f"Violence ({violence_score:.2f})")
-            if is_gore:
-                blocked_categories.append(f"Gore ({gore_score:.2f})")
-            if is_scary:
-                blocked_categories.append(f"Scary content ({scary_score:.2f})")
-
-            if blocked_categories:
-                details = f"Blocked: {', '.join(blocked_categories)}"
-            else:
-                details = f"Safe content - NSFW: {nsfw_score:.2f}, Violence: {violence_score:.2f}, Gore: {gore_score:.2f}, Scary: {scary_score:.2f}"
+            return self._moderate_pil_image(image)
+
+        except ModelServerOverloaded:
+            # Never "default to safe" because the model server was busy
+            raise
+        except Exception as e:
+            logger.error(f"Image moderation failed: {e}")
+            # On error, default to safe to not block legitimate content
+            return {
+                "is_nsfw": False,
+                "confidence_score": 0.0,
+                "passed": True,
+                "details": f"Moderation failed: {str(e)}, defaulting to safe"
+            }
+
+    async def moderate_image_file(self, image_path: str) -> Dict:
+        """
+        Moderate an image already stored on local disk (e.g. a multipart upload)
+        Avoids re-encoding the upload to base64 just to decode it again
 
-            # Return max confidence score of all categories
-            max_score = max(nsfw_score, violence_score, gore_score, scary_score)
+        Args:
+            image_path: Path to the image file
 
+        Returns:
+            Dictionary with moderation results
+        """
+        return self.moderate_image_file_sync(image_path)
+
+    def moderate_image_file_sync(self, image_path: str) -> Dict:
+        """Blocking variant of moderate_image_file, for running in a worker thread"""
+        print(f"[IMAGE MOD] moderate_image_file called, path: {image_path}")
+
+        if not self.classifier and not self.clip_classifier:
+            print("[IMAGE MOD] No classifiers available, defaulting to safe")
             return {
-                "is_nsfw": is_nsfw or is_violence or is_gore or is_scary,  # True if any category is flagged
-                "confidence_score": float(max_score),
-                "passed": passed,
-                "details": details
+                "is_nsfw": False,
+                "confidence_score": 0.0,
+                "passed": True,
+                "details": "Image moderation unavailable, defaulting to safe"
             }
 
+        try:
+            with Image.open(image_path) as source:
+                image = source.convert('RGB')
+            print(f"[IMAGE MOD] Image loaded successfully, size: {image.size}")
+            return self._moderate_pil_image(image)
+        except ModelServerOverloaded:
+            # Never "default to safe" because the model server was busy
+            raise
         except Exception as e:
             logger.error(f"Image moderation failed: {e}")
             # On error, default to safe to not block legitimate content
@@ -567,7 +667,122 @@ class ImageModerationService:
                 "details": f"Moderation failed: {str(e)}, defaulting to safe"
             }
 
+    def moderate_images_sync(self, images: List[Image.Image]) -> List[Dict]:
+        """
+        Moderate many decoded RGB images at once (batch jobs) - one batched
+        call per model instead of one per image
+        """
+        if not self.classifier and not self.clip_classifier:
+            return [{
+                "is_nsfw": False,
+                "confidence_score": 0.0,
+                "passed": True,
+                "details": "Image moderation unavailable, defaulting to safe"
+            } for _ in images]
+        if not images:
+            return []
+
+        nsfw_outputs = self.classifier(images) if self.classifier else [None] * len(images)
+        clip_outputs = (
+            self.clip_classifier(images, candidate_labels=CLIP_CANDIDATE_LABELS)
+            if self.clip_classifier else [None] * len(images)
+        )
+        return [
+            self._image_result_from_scores(nsfw_results, clip_results)
+            for nsfw_results, clip_results in zip(nsfw_outputs, clip_outputs)
+        ]
+
+    def _moderate_pil_image(self, image: Image.Image) -> Dict:
+        """Run NSFW + CLIP classification on a decoded RGB image"""
+        nsfw_results = None
+        clip_results = None
+
+        # 1. NSFW Detection with trained model
+        if self.classifier:
+            print("\n[IMAGE MODERATION] === NSFW DETECTION ===")
+            nsfw_results = self.classifier(image)
+
+        # 2. Multi-label classification with CLIP
+        if self.clip_classifier:
+            print("\n[IMAGE MODERATION] === CLIP MULTI-LABEL CLASSIFICATION ===")
+            clip_results = self.clip_classifier(image, candidate_labels=CLIP_CANDIDATE_LABELS)
+
+        return self._image_result_from_scores(nsfw_results, clip_results)
+
+    def _image_result_from_scores(self, nsfw_results: Optional[List[Dict]], clip_results: Optional[List[Dict]]) -> Dict:
+        """Apply the per-category thresholds to the NSFW and CLIP outputs of one image"""
+        # Initialize scores
+        nsfw_score = 0.0
+        violence_score = 0.0
+        gore_score = 0.0
+        scary_score = 0.0
+
+        if nsfw_results:
+            for result in nsfw_results:
+                label = result['label'].lower()
+                score = result['score']
+                print(f"[IMAGE MODERATION] {label}: {score:.4f}")
+
+                if 'nsfw' in label:
+                    nsfw_score = max(nsfw_score, score)
+
+        if clip_results:
+            for result in clip_results:
+                label = result['label'].lower()
+                score = result['score']
+                print(f"[IMAGE MODERATION] {label}: {score:.4f}")
+
+                if 'violence' in label or 'weapon' in label or 'war' in label:
+                    violence_score = max(violence_score, score)
+                elif 'gore' in label or 'blood' in label:
+                    gore_score = max(gore_score, score)
+                elif 'scary' in label or 'horror' in label:
+                    scary_score = max(scary_score, score)
+
+        # Define thresholds
+        nsfw_threshold = 0.30     # 30% for NSFW
+        violence_threshold = 0.40  # 40% for violence
+        gore_threshold = 0.30      # 30% for gore
+        scary_threshold = 0.50     # 50% for scary
+
+        # Check if any category exceeds threshold
+        is_nsfw = nsfw_score > nsfw_threshold
+        is_violence = violence_score > violence_threshold
+        is_gore = gore_score > gore_threshold
+        is_scary = scary_score > scary_threshold
+
+        # Block if ANY category fails
+        passed = not (is_nsfw or is_violence or is_gore or is_scary)
+
+        print(f"\n[IMAGE MODERATION] === FINAL RESULTS ===")
+        print(f"[IMAGE MODERATION] NSFW: {nsfw_score:.4f} (threshold: {nsfw_threshold}) - {'BLOCKED' if is_nsfw else 'OK'}")
+        print(f"[IMAGE MODERATION] Violence: {violence_score:.4f} (threshold: {violence_threshold}) - {'BLOCKED' if is_violence else 'OK'}")
+        print(f"[IMAGE MODERATION] Gore: {gore_score:.4f} (threshold: {gore_threshold}) - {'BLOCKED' if is_gore else 'OK'}")
+        print(f"[IMAGE MODERATION] Scary: {scary_score:.4f} (threshold: {scary_threshold}) - {'BLOCKED' if is_scary else 'OK'}")
+        print(f"[IMAGE MODERATION] Overall: {'BLOCKED' if not passed else 'PASSED'}")
+
+        # Build detailed message
+        blocked_categories = []
+        if is_nsfw:
+            blocked_categories.append(f"NSFW ({nsfw_score:.2f})")
+        if is_violence:
+            blocked_categories.append(f"Violence ({violence_score:.2f})")
+        if is_gore:
+            blocked_categories.append(f"Gore ({gore_score:.2f})")
+        if is_scary:
+            blocked_categories.append(f"Scary content ({scary_score:.2f})")
+
+        if blocked_categories:
+            details = f"Blocked: {', '.join(blocked_categories)}"
+        else:
+            details = f"Safe content - NSFW: {nsfw_score:.2f}, Violence: {violence_score:.2f}, Gore: {gore_score:.2f}, Scary: {scary_score:.2f}"
 
-# Singleton instances
-content_moderation_service = ContentModerationService()
-image_moderation_service = ImageModerationService()
+        # Return max confidence score of all categories
+        max_score = max(nsfw_score, violence_score, gore_score, scary_score)
+
+        return {
+            "is_nsfw": is_nsfw or is_violence or is_gore or is_scary,  # True if any category is flagged
+            "confidence_score": float(max_score),
+            "passed": passed,
+            "details": details
+        }
@@ -0,0 +1,258 @@
+"""
+Near-Duplicate Detection (MinHash + LSH)
+Spam campaigns post slightly varied copies of the same text. Recent posts and
+comments are indexed by the MinHash signature of their word shingles, and
+locality-sensitive hashing (signature split into bands, one hash table per band)
+finds similar texts without scanning the whole index. This lets us:
+- block text whose near-duplicate was already blocked, without running the models
+- flag bursts of near-duplicates coming from many different accounts
+Only entries from the last near_duplicate_window_seconds are kept (and at most
+near_duplicate_max_entries), so memory stays bounded.
+"""
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+import hashlib
+import re
+import threading
+import time
+import zlib
+import logging
+
+import numpy as np
+
+from app.config import settings
+from app.services.moderation_cascade import TIER_NEAR_DUPLICATE
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_TOKEN_PATTERN = re.compile(r"\w+")
+# Flags copied from the blocked original's moderation result
+_VERDICT_FLAGS = ("is_toxic", "is_spam", "is_hate_speech")
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def shingles(tokens: List[str], size: int = 3) -> Set[str]:
+    """Overlapping word n-grams (the whole text if it is shorter than one shingle)"""
+    if len(tokens) <= size:
+        return {" ".join(tokens)}
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+@dataclass
+class IndexEntry:
+    entry_id: str
+    kind: str  # "post" or "comment"
+    user_id: str
+    signature: np.ndarray
+    created_at: float
+    blocked: bool = False
+    flags: Dict[str, bool] = field(default_factory=dict)
+
+
+@dataclass
+class DuplicateCheck:
+    """What the index knows about a new text"""
+    signature: Optional[np.ndarray]
+    matches: List[Tuple[IndexEntry, float]]  # (entry, estimated Jaccard similarity)
+    blocked_match: Optional[Tuple[IndexEntry, float]] = None
+    distinct_users: int = 0
+    burst: bool = False
+
+
+class NearDuplicateIndex:
+    """Thread-safe MinHash/LSH index over a sliding time window"""
+
+    def __init__(
+        self,
+        num_perm: int,
+        bands: int,
+        threshold: float,
+        window_seconds: float,
+        max_entries: int,
+        min_words: int,
+        burst_min_users: int,
+        seed: int = 1
+    ):
+        if num_perm % bands:
+            raise ValueError("near_duplicate_num_perm must be a multiple of near_duplicate_bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.window = window_seconds
+        self.max_entries = max_entries
+        self.min_words = min_words
+        self.burst_min_users = burst_min_users
+
+        # Universal hash functions h(x) = (a * x + b) mod p, a and b below 2^32 so the
+        # product with a 32-bit shingle hash fits in uint64
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 2 ** 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 2 ** 32, size=num_perm, dtype=np.uint64)
+
+        self._lock = threading.Lock()
+        self._entries: Dict[str, IndexEntry] = {}
+        self._buckets: List[Dict[bytes, Set[str]]] = [{} for _ in range(bands)]
+        self._order: deque = deque()  # (created_at, entry_id), oldest first
+        self.counts = {"checked": 0, "blocked_without_inference": 0, "bursts_flagged": 0}
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """MinHash signature, None for text too short to be meaningful (e.g. "great post!")"""
+        tokens = _tokens(text)
+        if len(tokens) < self.min_words:
+            return None
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles(tokens)),
+            dtype=np.uint64
+        )
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME
+        return permuted.min(axis=0)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [
+            hashlib.blake2b(signature[band * self.rows:(band + 1) * self.rows].tobytes(), digest_size=8).digest()
+            for band in range(self.bands)
+        ]
+
+    def _remove(self, entry_id: str):
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        for band, key in enumerate(self._band_keys(entry.signature)):
+            bucket = self._buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[band][key]
+
+    def _expire(self, now: float):
+        while self._order and (now - self._order[0][0] > self.window or len(self._entries) > self.max_entries):
+            created_at, entry_id = self._order.popleft()
+            entry = self._entries.get(entry_id)
+            # Skip stale order records of entries that were re-added later
+            if entry is not None and entry.created_at == created_at:
+                self._remove(entry_id)
+
+    def check(self, text: str, user_id: Optional[str] = None) -> DuplicateCheck:
+        """Find indexed near-duplicates of a text (candidates from LSH, verified on the signature)"""
+        signature = self.signature(text)
+        if signature is None:
+            return DuplicateCheck(signature=None, matches=[])
+
+        with self._lock:
+            self._expire(time.time())
+            self.counts["checked"] += 1
+            candidates: Set[str] = set()
+            for band, key in enumerate(self._band_keys(signature)):
+                candidates.update(self._buckets[band].get(key, ()))
+
+            matches = []
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                similarity = float(np.mean(entry.signature == signature))
+                if similarity >= self.threshold:
+                    matches.append((entry, similarity))
+
+            blocked = [match for match in matches if match[0].blocked]
+            blocked_match = max(blocked, key=lambda match: match[1]) if blocked else None
+            users = {entry.user_id for entry, _ in matches}
+            if user_id:
+                users.add(user_id)
+            burst = len(matches) > 0 and len(users) >= self.burst_min_users
+            if blocked_match:
+                self.counts["blocked_without_inference"] += 1
+            if burst:
+                self.counts["bursts_flagged"] += 1
+
+        if burst:
+            logger.warning(f"Near-duplicate burst: {len(matches) + 1} similar texts from {len(users)} accounts")
+        return DuplicateCheck(
+            signature=signature,
+            matches=sorted(matches, key=lambda match: -match[1]),
+            blocked_match=blocked_match,
+            distinct_users=len(users),
+            burst=burst
+        )
+
+    def add(
+        self,
+        entry_id: str,
+        kind: str,
+        user_id: str,
+        text: str = "",
+        blocked: bool = False,
+        flags: Optional[Dict] = None,
+        signature: Optional[np.ndarray] = None
+    ):
+        """Index a text (pass the signature from check() to avoid hashing it twice)"""
+        if signature is None:
+            signature = self.signature(text)
+            if signature is None:
+                return
+        now = time.time()
+        entry = IndexEntry(
+            entry_id=entry_id,
+            kind=kind,
+            user_id=user_id,
+            signature=signature,
+            created_at=now,
+            blocked=blocked,
+            flags={flag: bool((flags or {}).get(flag, False)) for flag in _VERDICT_FLAGS}
+        )
+        with self._lock:
+            self._remove(entry_id)
+            self._entries[entry_id] = entry
+            self._order.append((now, entry_id))
+            for band, key in enumerate(self._band_keys(signature)):
+                self._buckets[band].setdefault(key, set()).add(entry_id)
+            self._expire(now)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "window_seconds": self.window, **self.counts}
+
+
+def duplicate_moderation_result(match: Tuple[IndexEntry, float]) -> Dict:
+    """Moderation result for text blocked as a near-duplicate of blocked content"""
+    entry, similarity = match
+    flags = dict(entry.flags)
+    if not any(flags.values()):
+        flags["is_spam"] = True
+    return {
+        **flags,
+        "confidence_score": similarity,
+        "details": f"near-duplicate of blocked content (similarity {similarity:.2f})",
+        "moderation_tier": TIER_NEAR_DUPLICATE
+    }
+
+
+# Singleton instance
+near_duplicate_index = NearDuplicateIndex(
+    num_perm=settings.near_duplicate_num_perm,
+    bands=settings.near_duplicate_bands,
+    threshold=settings.near_duplicate_threshold,
+    window_seconds=settings.near_duplicate_window_seconds,
+    max_entries=settings.near_duplicate_max_entries,
+    min_words=settings.near_duplicate_min_words,
+    burst_min_users=settings.near_duplicate_burst_min_users
+)
+
+
+def check_near_duplicates(text: str, user_id: str) -> Optional[DuplicateCheck]:
+    """Index lookup for new content, None when near-duplicate detection is disabled"""
+    if not settings.near_duplicate_enabled:
+        return None
+    return near_duplicate_index.check(text, user_id)
+
+
+def index_content(entry_id: str, kind: str, user_id: str, check: Optional[DuplicateCheck],
+                  blocked: bool = False, flags: Optional[Dict] = None):
+    """Add new content to the index, reusing the signature computed by check_near_duplicates"""
+    if check is None or check.signature is None:
+        return
+    near_duplicate_index.add(entry_id, kind, user_id, blocked=blocked, flags=flags, signature=check.signature)
@@ -0,0 +1,67 @@
+"""
+Post Deletion Cascade
+delete_post removes the post document synchronously (lists and reads stop
+seeing it at once) and records a job in post_deletions/{post_id} in the same
+batched write. A background worker then deletes the post's likes, comments
+and counter shards in batched writes of up to 500 operations, recording
+progress on the job document.
+
+Jobs are idempotent (deleting what is already gone is a no-op), retried with
+exponential backoff, and jobs left unfinished by a restart are resumed on
+startup. One process at a time runs a job, and a job that keeps failing is
+marked dead (see background_jobs).
+"""
+from typing import Dict
+
+from google.cloud import firestore
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+from app.config import settings
+from app.services.background_jobs import BackgroundJobWorker, new_job
+from app.services.counters import SHARDS_COLLECTION
+from app.utils.firestore_helpers import MAX_BATCH_WRITES
+
+JOBS_COLLECTION = "post_deletions"
+
+
+def deletion_job(post_id: str) -> Dict:
+    """Initial job document for a deleted post"""
+    return new_job(post_id=post_id, deleted={"likes": 0, "comments": 0, "counter_shards": 0})
+
+
+class PostDeletionWorker(BackgroundJobWorker):
+    """Background cascade of post deletions"""
+
+    jobs_collection = JOBS_COLLECTION
+    name = "post deletion"
+    extra_counts = ("documents_deleted",)
+
+    def _children(self, post_id: str):
+        """(progress key, query) for every kind of document that belongs to a post"""
+        db = self._db
+        return [
+            ("likes", db.collection('likes').where(filter=FieldFilter('post_id', '==', post_id))),
+            ("comments", db.collection('comments').where(filter=FieldFilter('post_id', '==', post_id))),
+            ("counter_shards", db.collection('posts').document(post_id).collection(SHARDS_COLLECTION)),
+        ]
+
+    async def _execute(self, post_id: str, job_ref):
+        for key, query in self._children(post_id):
+            while True:
+                docs = await query.limit(MAX_BATCH_WRITES).get()
+                if not docs:
+                    break
+                batch = self._db.batch()
+                for doc in docs:
+                    batch.delete(doc.reference)
+                await batch.commit()
+                self.counts["documents_deleted"] += len(docs)
+                await self._progress(job_ref, {f"deleted.{key}": firestore.Increment(len(docs))})
+
+
+# Singleton instance
+post_deletion_worker = PostDeletionWorker(
+    workers=settings.post_deletion_workers,
+    max_attempts=settings.post_deletion_max_attempts,
+    retry_base_seconds=settings.post_deletion_retry_base_seconds
+)
@@ -2,22 +2,31 @@
 Recommendation Service for personalized feed
 Uses content-based filtering with sentence embeddings
 """
-from typing import List, Dict
+from typing import List, Dict, Optional
 import logging
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 
+from app.config import settings
+from app.services.inference_backends import load_sentence_transformer
+
 logger = logging.getLogger(__name__)
 
 
+def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Cosine similarity of two 1-D vectors (0.0 if either is all zeros)"""
+    norm = np.linalg.norm(a) * np.linalg.norm(b)
+    if norm == 0:
+        return 0.0
+    return float(np.dot(a, b) / norm)
+
+
 class RecommendationService:
     """
     Service for generating personalized post recommendations
     Uses sentence embeddings for semantic similarity
     """
 
-    def __init__(self):
+    def __init__(self, backend: Optional[str] = None):
         try:
             print("=" * 60)
             print("LOADING AI RECOMMENDATION MODEL...")
@@ -27,13 +36,17 @@ class RecommendationService:
             logger.info("=" * 60)
 
             # Load lightweight sentence transformer model
-            model_name = 'all-MiniLM-L6-v2'
+            model_name = settings.embedding_model
+            self.model_name = model_name
+            self.backend = backend or settings.embedding_backend
             print(f"Model: {model_name}")
+            print(f"Inference backend: {self.backend}")
             print("Loading sentence transformer (TRAINED ML MODEL)...")
             logger.info(f"Model: {model_name}")
+            logger.info(f"Inference backend: {self.backend}")
             logger.info("Loading sentence transformer (TRAINED ML MODEL)...")
 
-            self.model = SentenceTransformer(model_name)
+            self.model = load_sentence_transformer(model_name, self.backend)
 
             print("=" * 60)
             print("SENTENCE EMBEDDING MODEL READY!")
@@ -54,6 +67,16 @@ class RecommendationService:
             self.model = None
             self.use_embeddings = False
 
+    def warm_up(self, batch_size: int = 4) -> bool:
+        """
+        Encode a synthetic batch so the first feed request is not slowed down
+        Returns False when running on the tag-based fallback
+        """
+        if not self.use_embeddings or self.model is None:
+            return False
+        self.model.encode(["synthetic post about technology and cooking"] * batch_size)
+        return True
+
     def _create_post_text(self, post: Dict) -> str:
         """Create a text representation of a post for embedding"""
         content = post.get("content", "")
@@ -138,10 +161,7 @@ class RecommendationService:
         post_embedding = self.model.encode([post_text])[0]
 
         # Calculate cosine similarity
-        similarity = cosine_similarity(
-            user_embedding.reshape(1, -1),
-            post_embedding.reshape(1, -1)
-        )[0][0]
+        similarity = cosine_similarity(user_embedding, post_embedding)
 
         # Normalize to 0-1 range (cosine similarity is -1 to 1)
         # Apply exponential boost for high similarity
@@ -250,13 +270,27 @@ class RecommendationService:
         Returns:
             List of posts sorted by relevance with diversity
         """
+        return self.get_recommended_posts_sync(all_posts, user_preferences, liked_posts, limit)
+
+    def get_recommended_posts_sync(
+        self,
+        all_posts: List[Dict],
+        user_preferences: Dict,
+        liked_posts: List[Dict] = None,
+        limit: int = 20,
+        tag_based: bool = False
+    ) -> List[Dict]:
+        """
+        Blocking variant of get_recommended_posts, for running in a worker thread
+        tag_based=True skips the embedding model (degraded mode under load)
+        """
         if not all_posts:
             return []
 
         # Pre-compute user embedding if using embeddings
         # AI learns from both manual preferences AND actual behavior (likes)
         user_embedding = None
-        if self.use_embeddings and self.model is not None:
+        if self.use_embeddings and self.model is not None and not tag_based:
             try:
                 user_profile_text = self._create_user_profile_text(user_preferences, liked_posts)
                 if user_profile_text:
@@ -370,10 +404,7 @@ class RecommendationService:
             candidate_embedding = self.model.encode([candidate_text])[0]
 
             # Calculate cosine similarity
-            similarity = cosine_similarity(
-                post_embedding.reshape(1, -1),
-                candidate_embedding.reshape(1, -1)
-            )[0][0]
+            similarity = cosine_similarity(post_embedding, candidate_embedding)
 
             # Normalize to 0-1
             similarity_score = (similarity + 1) / 2
@@ -438,7 +469,3 @@ class RecommendationService:
         similar_posts.sort(key=lambda x: x["score"], reverse=True)
 
         return [item["post"] for item in similar_posts[:limit]]
-
-
-# Singleton instance
-recommendation_service = RecommendationService()
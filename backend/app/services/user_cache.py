@@ -0,0 +1,159 @@
+"""
+User Document Cache
+Read-through, in-process cache of users/{id} documents, used by
+get_current_user (one lookup per authenticated request) and by author
+hydration of post and comment lists. Entries live for user_cache_ttl_seconds
+and at most user_cache_max_entries are kept (least recently used dropped first).
+
+Writes through the API invalidate the entry locally. With several workers, set
+user_cache_invalidation_group ("239.255.0.1:50070") to also broadcast the
+invalidated ids over UDP multicast to the other workers on the network; without
+it, other workers see the change once their entry expires.
+"""
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+import asyncio
+import copy
+import socket
+import struct
+import threading
+import time
+import logging
+
+from app.config import settings
+from app.utils.firestore_helpers import doc_to_dict
+
+logger = logging.getLogger(__name__)
+
+
+class UserCache:
+    """TTL + LRU cache of user dicts, thread-safe"""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self.counts = {"hits": 0, "misses": 0, "invalidations": 0, "remote_invalidations": 0}
+
+    def get(self, user_id: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= time.monotonic():
+                self.counts["misses"] += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.counts["hits"] += 1
+        # Callers get their own copy, the cached dict is never mutated
+        return copy.deepcopy(entry[1])
+
+    def peek(self, user_id: str) -> Optional[Dict]:
+        """Cached user without copying or counting a lookup (read-only, may be None)"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+        return entry[1] if entry and entry[0] > time.monotonic() else None
+
+    def get_many(self, user_ids: Iterable[str]) -> Tuple[Dict[str, Dict], List[str]]:
+        """(cached users by id, ids that have to be read)"""
+        found, missing = {}, []
+        for user_id in dict.fromkeys(user_ids):
+            user = self.get(user_id)
+            if user is None:
+                missing.append(user_id)
+            else:
+                found[user_id] = user
+        return found, missing
+
+    def put(self, user: Dict):
+        with self._lock:
+            self._entries[user["id"]] = (time.monotonic() + self.ttl, copy.deepcopy(user))
+            self._entries.move_to_end(user["id"])
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str, broadcast: bool = True):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self.counts["invalidations" if broadcast else "remote_invalidations"] += 1
+        if broadcast:
+            invalidation_channel.publish(user_id)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            lookups = self.counts["hits"] + self.counts["misses"]
+            return {
+                "entries": len(self._entries),
+                "hit_rate": self.counts["hits"] / lookups if lookups else None,
+                **self.counts
+            }
+
+
+class InvalidationChannel:
+    """
+    Fire-and-forget UDP multicast of invalidated user ids between workers
+    Lost datagrams only delay the update until the entry expires
+    """
+
+    def __init__(self, group: Optional[str]):
+        self.address = None
+        if group:
+            host, _, port = group.rpartition(":")
+            self.address = (host, int(port))
+        self._send_socket = None
+        self._transport = None
+
+    def publish(self, user_id: str):
+        if self.address is None:
+            return
+        try:
+            if self._send_socket is None:
+                self._send_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+                self._send_socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+            self._send_socket.sendto(user_id.encode("utf-8"), self.address)
+        except OSError as e:
+            logger.warning(f"User cache invalidation broadcast failed: {e}")
+
+    async def start(self, cache: UserCache):
+        """Listen for invalidations from other workers (no-op without a group)"""
+        if self.address is None or self._transport is not None:
+            return
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(("", self.address[1]))
+        membership = struct.pack("4sl", socket.inet_aton(self.address[0]), socket.INADDR_ANY)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+
+        class Protocol(asyncio.DatagramProtocol):
+            def datagram_received(self, data, addr):
+                cache.invalidate(data.decode("utf-8", "ignore"), broadcast=False)
+
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(Protocol, sock=sock)
+        print(f"[INFO] User cache invalidations on {self.address[0]}:{self.address[1]}")
+
+    def stop(self):
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+        if self._send_socket is not None:
+            self._send_socket.close()
+            self._send_socket = None
+
+
+# Singleton instances
+invalidation_channel = InvalidationChannel(settings.user_cache_invalidation_group)
+user_cache = UserCache(ttl=settings.user_cache_ttl_seconds, max_entries=settings.user_cache_max_entries)
+
+
+async def get_user(db, user_id: str) -> Optional[Dict]:
+    """users/{id} as a dict with id, from the cache or Firestore"""
+    if settings.user_cache_enabled:
+        user = user_cache.get(user_id)
+        if user is not None:
+            return user
+    user = doc_to_dict(await db.collection('users').document(user_id).get())
+    if user is not None and settings.user_cache_enabled:
+        user_cache.put(user)
+    return user
@@ -0,0 +1,717 @@
+"""
+Embedded SQLite Storage Backend
+Implements the part of the Firestore client API the app uses (collections and
+subcollections, document get/set/update/delete/create, add, get_all, batched
+writes, transactions, firestore.Increment, where/order_by/limit/offset/
+start_after queries and count aggregations) on top of one SQLite table, so the
+routes, services and jobs run unchanged against a local file. Selected with
+STORAGE_BACKEND=sqlite, for single-node deployments and offline load tests.
+
+Documents are stored as JSON in documents(collection, id, data). Datetimes are
+encoded as "$dt:<UTC ISO timestamp>" strings, which sort chronologically, and
+are returned as timezone-aware UTC datetimes like Firestore returns them.
+Partial expression indexes cover the query shapes the routes use (approved
+posts by date, posts by author, likes by (post_id, user_id), comments by post,
+users by username / email). The database runs in WAL mode.
+
+SqliteClient is synchronous (jobs and scripts); AsyncSqliteClient wraps it with
+the async client API used by the routes and runs every SQLite call on its own
+small thread pool, so a write waiting on the database lock (busy_timeout) or a
+long scan never blocks the event loop. Transactions are optimistic like
+Firestore's: documents read with transaction= are recorded, and the commit
+(BEGIN IMMEDIATE) first checks they are unchanged; if one changed nothing is
+written and the transaction function runs again, up to MAX_TRANSACTION_ATTEMPTS.
+
+Document reads and writes are counted the way Firestore bills them (a query
+returning nothing is one read, a count is one read per 1000 matches) into the
+dict set in operation_counter, so harnesses can attribute them to a request,
+together with the bytes of document data returned (after select() projections).
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import random
+import sqlite3
+import string
+import threading
+
+from google.api_core.exceptions import AlreadyExists, Aborted, NotFound
+from google.cloud.firestore_v1.transforms import Increment
+
+DOCUMENT_ID = "__name__"
+_DATETIME_PREFIX = "$dt:"
+_AUTO_ID_CHARS = string.ascii_letters + string.digits
+# Runs of a transaction function before giving up on contention (Firestore's default)
+MAX_TRANSACTION_ATTEMPTS = 5
+
+# {"reads": n, "writes": n, "bytes": n} of the current context (None = not counted)
+operation_counter: ContextVar[Optional[Dict[str, int]]] = ContextVar("operation_counter", default=None)
+
+
+def _count(kind: str, n: int):
+    counter = operation_counter.get()
+    if counter is not None:
+        counter[kind] = counter.get(kind, 0) + n
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    collection TEXT NOT NULL,
+    id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (collection, id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS posts_approved_created ON documents (
+    json_extract(data, '$.is_approved'), json_extract(data, '$.created_at'), id
+) WHERE collection = 'posts';
+CREATE INDEX IF NOT EXISTS posts_user_created ON documents (
+    json_extract(data, '$.user_id'), json_extract(data, '$.created_at'), id
+) WHERE collection = 'posts';
+CREATE INDEX IF NOT EXISTS likes_post_user ON documents (
+    json_extract(data, '$.post_id'), json_extract(data, '$.user_id')
+) WHERE collection = 'likes';
+CREATE INDEX IF NOT EXISTS likes_user ON documents (
+    json_extract(data, '$.user_id')
+) WHERE collection = 'likes';
+CREATE INDEX IF NOT EXISTS comments_post_created ON documents (
+    json_extract(data, '$.post_id'), json_extract(data, '$.created_at'), id
+) WHERE collection = 'comments';
+CREATE INDEX IF NOT EXISTS users_username ON documents (
+    json_extract(data, '$.username')
+) WHERE collection = 'users';
+CREATE INDEX IF NOT EXISTS users_email ON documents (
+    json_extract(data, '$.email')
+) WHERE collection = 'users';
+"""
+
+
+# ---------------------------------------------------------------------------
+# Value encoding
+
+def _encode_datetime(value: datetime) -> str:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return _DATETIME_PREFIX + value.strftime("%Y-%m-%dT%H:%M:%S.%f")
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return _encode_datetime(value)
+    raise TypeError(f"Cannot store value of type {type(value).__name__}")
+
+
+def _encode(data: Dict) -> str:
+    return json.dumps(data, default=_json_default, separators=(",", ":"))
+
+
+def _decode_value(value):
+    if isinstance(value, str) and value.startswith(_DATETIME_PREFIX):
+        return datetime.fromisoformat(value[len(_DATETIME_PREFIX):]).replace(tzinfo=timezone.utc)
+    if isinstance(value, dict):
+        return {key: _decode_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode_value(item) for item in value]
+    return value
+
+
+def _decode(raw: str) -> Dict:
+    return _decode_value(json.loads(raw))
+
+
+def _param(value):
+    """Query parameter in the representation json_extract returns"""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, datetime):
+        return _encode_datetime(value)
+    if isinstance(value, (DocumentReference, AsyncDocumentReference)):
+        return value.id
+    return value
+
+
+def _field_sql(field_path: str) -> str:
+    if field_path == DOCUMENT_ID:
+        return "id"
+    return f"json_extract(data, '$.{field_path}')"
+
+
+def _literal(text: str) -> str:
+    """Collection names are inlined so SQLite can match the partial indexes"""
+    return "'" + text.replace("'", "''") + "'"
+
+
+def _get_path(data: Dict, field_path: str):
+    value = data
+    for part in field_path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def _load(raw: str, field_paths: Optional[Iterable[str]] = None) -> Dict:
+    """Stored document projected to field_paths (None = every field), counting the bytes returned"""
+    data = json.loads(raw)
+    if field_paths is None:
+        _count("bytes", len(raw))
+        return data
+    projected: Dict = {}
+    for field_path in field_paths:
+        parts = field_path.split(".")
+        source = data
+        for part in parts[:-1]:
+            source = source.get(part) if isinstance(source, dict) else None
+        if isinstance(source, dict) and parts[-1] in source:
+            target = projected
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = source[parts[-1]]
+    _count("bytes", len(_encode(projected)))
+    return projected
+
+
+def _apply_fields(document: Dict, fields: Dict, dotted: bool, merge: bool):
+    """Write fields into document, resolving Increment transforms and nested paths"""
+    for key, value in fields.items():
+        path = key.split(".") if dotted else [key]
+        target = document
+        for part in path[:-1]:
+            if not isinstance(target.get(part), dict):
+                target[part] = {}
+            target = target[part]
+        name = path[-1]
+        if isinstance(value, Increment):
+            current = target.get(name)
+            target[name] = (current if isinstance(current, (int, float)) else 0) + value.value
+        elif merge and isinstance(value, dict) and isinstance(target.get(name), dict):
+            _apply_fields(target[name], value, dotted=False, merge=True)
+        elif isinstance(value, dict):
+            # Resolve transforms nested in maps
+            nested = {}
+            _apply_fields(nested, value, dotted=False, merge=False)
+            target[name] = nested
+        else:
+            target[name] = value
+
+
+def _auto_id() -> str:
+    return "".join(random.choices(_AUTO_ID_CHARS, k=20))
+
+
+# ---------------------------------------------------------------------------
+# Synchronous client
+
+class DocumentSnapshot:
+    def __init__(self, reference, data: Optional[Dict]):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self) -> Optional[Dict]:
+        return _decode_value(self._data) if self._data is not None else None
+
+    def get(self, field_path: str):
+        return _get_path(self.to_dict() or {}, field_path)
+
+
+class AggregationResult:
+    def __init__(self, alias: str, value):
+        self.alias = alias
+        self.value = value
+
+
+class AggregationQuery:
+    def __init__(self, query: "Query", alias: str):
+        self._query = query
+        self._alias = alias
+
+    def get(self) -> List[List[AggregationResult]]:
+        sql, params = self._query._sql("1")
+        (value,) = self._query._client._fetchone(f"SELECT COUNT(*) FROM ({sql})", params)
+        _count("reads", max(1, -(-value // 1000)))
+        return [[AggregationResult(self._alias, value)]]
+
+
+class Query:
+    def __init__(self, client: "SqliteClient", collection: str, filters=(), orders=(),
+                 limit: Optional[int] = None, offset: int = 0, cursor: Optional[Tuple] = None,
+                 projection: Optional[Tuple[str, ...]] = None):
+        self._client = client
+        self._collection = collection
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit
+        self._offset = offset
+        self._cursor = cursor
+        self._projection = projection
+
+    def _copy(self, **changes) -> "Query":
+        state = {
+            "filters": self._filters, "orders": self._orders, "limit": self._limit,
+            "offset": self._offset, "cursor": self._cursor, "projection": self._projection,
+        }
+        state.update(changes)
+        return Query(self._client, self._collection, **state)
+
+    def where(self, field_path: Optional[str] = None, op_string: Optional[str] = None, value=None, *, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path: str, direction: str = "ASCENDING"):
+        return self._copy(orders=self._orders + ((field_path, direction.upper()),))
+
+    def limit(self, count: int):
+        return self._copy(limit=count)
+
+    def offset(self, num_to_skip: int):
+        return self._copy(offset=num_to_skip)
+
+    def select(self, field_paths: Iterable[str]):
+        return self._copy(projection=tuple(field_paths))
+
+    def _full_orders(self) -> Tuple:
+        """Explicit orderings plus the implicit document id ordering"""
+        orders = self._orders
+        if not orders or orders[-1][0] != DOCUMENT_ID:
+            direction = orders[-1][1] if orders else "ASCENDING"
+            orders = orders + ((DOCUMENT_ID, direction),)
+        return orders
+
+    def start_after(self, document_fields_or_snapshot):
+        orders = self._full_orders()
+        if isinstance(document_fields_or_snapshot, DocumentSnapshot):
+            data = document_fields_or_snapshot.to_dict() or {}
+            values = tuple(
+                document_fields_or_snapshot.id if field == DOCUMENT_ID else _get_path(data, field)
+                for field, _ in orders
+            )
+        else:
+            fields = document_fields_or_snapshot
+            values = tuple(fields[field] for field, _ in orders if field in fields)
+        return self._copy(cursor=values)
+
+    def _sql(self, select: str = "id, data") -> Tuple[str, List]:
+        where = [f"collection = {_literal(self._collection)}"]
+        params: List[Any] = []
+        for field_path, op, value in self._filters:
+            column = _field_sql(field_path)
+            if op == "array_contains":
+                where.append(f"EXISTS (SELECT 1 FROM json_each(data, '$.{field_path}') WHERE value = ?)")
+                params.append(_param(value))
+            elif op == "array_contains_any":
+                marks = ", ".join("?" for _ in value)
+                where.append(f"EXISTS (SELECT 1 FROM json_each(data, '$.{field_path}') WHERE value IN ({marks}))")
+                params.extend(_param(item) for item in value)
+            elif op in ("in", "not-in"):
+                marks = ", ".join("?" for _ in value)
+                where.append(f"{column} {'IN' if op == 'in' else 'NOT IN'} ({marks})")
+                params.extend(_param(item) for item in value)
+            elif op == "==" and value is None:
+                where.append(f"json_type(data, '$.{field_path}') = 'null'")
+            elif op in ("==", "!=", "<", "<=", ">", ">="):
+                where.append(f"{column} {'=' if op == '==' else op} ?")
+                params.append(_param(value))
+            else:
+                raise ValueError(f"Unsupported filter operator '{op}'")
+
+        orders = self._full_orders()
+        for field_path, _ in self._orders:
+            if field_path != DOCUMENT_ID:
+                # Like Firestore, documents without the ordered field are not returned
+                where.append(f"{_field_sql(field_path)} IS NOT NULL")
+
+        if self._cursor:
+            # Keyset condition: (o1, o2, ...) after (v1, v2, ...) in the query order
+            alternatives = []
+            for i, value in enumerate(self._cursor):
+                terms = [f"{_field_sql(orders[j][0])} = ?" for j in range(i)]
+                params_i = [_param(self._cursor[j]) for j in range(i)]
+                terms.append(f"{_field_sql(orders[i][0])} {'<' if orders[i][1] == 'DESCENDING' else '>'} ?")
+                params_i.append(_param(value))
+                alternatives.append("(" + " AND ".join(terms) + ")")
+                params.extend(params_i)
+            where.append("(" + " OR ".join(alternatives) + ")")
+
+        order_sql = ", ".join(
+            f"{_field_sql(field)} {'DESC' if direction == 'DESCENDING' else 'ASC'}" for field, direction in orders
+        )
+        sql = f"SELECT {select} FROM documents WHERE {' AND '.join(where)} ORDER BY {order_sql}"
+        if self._limit is not None or self._offset:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([self._limit if self._limit is not None else -1, self._offset])
+        return sql, params
+
+    def stream(self):
+        sql, params = self._sql()
+        rows = self._client._fetchall(sql, params)
+        _count("reads", max(1, len(rows)))
+        for doc_id, raw in rows:
+            yield DocumentSnapshot(
+                DocumentReference(self._client, self._collection, doc_id), _load(raw, self._projection)
+            )
+
+    def get(self) -> List[DocumentSnapshot]:
+        return list(self.stream())
+
+    def count(self, alias: str = "count") -> AggregationQuery:
+        return AggregationQuery(self, alias)
+
+
+class CollectionReference(Query):
+    def __init__(self, client: "SqliteClient", path: str):
+        super().__init__(client, path)
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def document(self, document_id: Optional[str] = None) -> "DocumentReference":
+        return DocumentReference(self._client, self.path, document_id or _auto_id())
+
+    def add(self, document_data: Dict, document_id: Optional[str] = None):
+        ref = self.document(document_id)
+        ref.create(document_data)
+        return datetime.now(timezone.utc), ref
+
+
+class DocumentReference:
+    def __init__(self, client: "SqliteClient", collection: str, document_id: str):
+        self._client = client
+        self._collection = collection
+        self.id = document_id
+        self.path = f"{collection}/{document_id}"
+
+    def collection(self, name: str) -> CollectionReference:
+        return CollectionReference(self._client, f"{self.path}/{name}")
+
+    def get(self, field_paths: Optional[Iterable[str]] = None, transaction=None) -> DocumentSnapshot:
+        _count("reads", 1)
+        return DocumentSnapshot(self, self._client._read(self._collection, self.id, field_paths))
+
+    def create(self, document_data: Dict):
+        self._client._commit([("create", self, document_data, False)])
+
+    def set(self, document_data: Dict, merge: bool = False):
+        self._client._commit([("set", self, document_data, merge)])
+
+    def update(self, field_updates: Dict):
+        self._client._commit([("update", self, field_updates, False)])
+
+    def delete(self):
+        self._client._commit([("delete", self, None, False)])
+
+
+class WriteBatch:
+    """Writes applied together in one SQLite transaction"""
+
+    def __init__(self, client: "SqliteClient"):
+        self._client = client
+        self._ops: List[Tuple] = []
+
+    def create(self, reference, document_data: Dict):
+        self._ops.append(("create", reference, document_data, False))
+
+    def set(self, reference, document_data: Dict, merge: bool = False):
+        self._ops.append(("set", reference, document_data, merge))
+
+    def update(self, reference, field_updates: Dict):
+        self._ops.append(("update", reference, field_updates, False))
+
+    def delete(self, reference):
+        self._ops.append(("delete", reference, None, False))
+
+    def commit(self):
+        ops, self._ops = self._ops, []
+        self._client._commit(ops)
+        return []
+
+
+class Transaction(WriteBatch):
+    """Writes of a transaction plus the documents it read, checked at commit"""
+
+    def __init__(self, client: "SqliteClient"):
+        super().__init__(client)
+        self._reads: Dict[Tuple[str, str], Optional[str]] = {}
+
+    def _record_read(self, reference) -> Optional[str]:
+        """Read the stored document and remember it (the first read of a document counts)"""
+        raw = self._client._read_raw(reference._collection, reference.id)
+        self._reads.setdefault((reference._collection, reference.id), raw)
+        return raw
+
+    def commit(self):
+        ops, self._ops = self._ops, []
+        self._client._commit(ops, self._reads)
+        return []
+
+
+class SqliteClient:
+    def __init__(self, path: str):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA)
+
+    def collection(self, path: str) -> CollectionReference:
+        return CollectionReference(self, path)
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    def get_all(self, references: Iterable, field_paths: Optional[Iterable[str]] = None) -> Iterable[DocumentSnapshot]:
+        by_collection: Dict[str, List] = {}
+        for reference in references:
+            by_collection.setdefault(reference._collection, []).append(reference)
+        for collection, refs in by_collection.items():
+            ids = list(dict.fromkeys(ref.id for ref in refs))
+            _count("reads", len(ids))
+            found = {}
+            # Stay below SQLite's bound parameter limit
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                marks = ", ".join("?" for _ in chunk)
+                rows = self._fetchall(
+                    f"SELECT id, data FROM documents WHERE collection = {_literal(collection)} AND id IN ({marks})",
+                    chunk
+                )
+                found.update({doc_id: _load(raw, field_paths) for doc_id, raw in rows})
+            for doc_id in ids:
+                yield DocumentSnapshot(DocumentReference(self, collection, doc_id), found.get(doc_id))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _fetchall(self, sql: str, params) -> List[Tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _fetchone(self, sql: str, params) -> Tuple:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    def _read_raw(self, collection: str, document_id: str) -> Optional[str]:
+        row = self._fetchone(
+            f"SELECT data FROM documents WHERE collection = {_literal(collection)} AND id = ?",
+            (document_id,)
+        )
+        return row[0] if row else None
+
+    def _read(self, collection: str, document_id: str, field_paths: Optional[Iterable[str]] = None) -> Optional[Dict]:
+        raw = self._read_raw(collection, document_id)
+        return _load(raw, field_paths) if raw is not None else None
+
+    def _commit(self, ops: List[Tuple], reads: Optional[Dict[Tuple[str, str], Optional[str]]] = None):
+        """
+        Apply (kind, reference, data, merge) writes atomically
+        reads maps (collection, id) to the data a transaction read; if any of them
+        changed since, nothing is written and Aborted is raised
+        """
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for (collection, doc_id), raw in (reads or {}).items():
+                    row = conn.execute(
+                        "SELECT data FROM documents WHERE collection = ? AND id = ?", (collection, doc_id)
+                    ).fetchone()
+                    if (row[0] if row else None) != raw:
+                        raise Aborted(f"Transaction contention on {collection}/{doc_id}")
+                for kind, reference, data, merge in ops:
+                    collection, doc_id = reference._collection, reference.id
+                    row = conn.execute(
+                        "SELECT data FROM documents WHERE collection = ? AND id = ?", (collection, doc_id)
+                    ).fetchone()
+                    if kind == "delete":
+                        conn.execute("DELETE FROM documents WHERE collection = ? AND id = ?", (collection, doc_id))
+                        continue
+                    if kind == "create" and row:
+                        raise AlreadyExists(f"Document already exists: {reference.path}")
+                    if kind == "update" and not row:
+                        raise NotFound(f"No document to update: {reference.path}")
+
+                    document = json.loads(row[0]) if row and (merge or kind == "update") else {}
+                    encoded_fields = json.loads(_encode({key: value for key, value in data.items()
+                                                         if not isinstance(value, Increment)}))
+                    fields = {key: (value if isinstance(value, Increment) else encoded_fields[key])
+                              for key, value in data.items()}
+                    _apply_fields(document, fields, dotted=kind == "update", merge=merge)
+                    conn.execute(
+                        "INSERT OR REPLACE INTO documents (collection, id, data) VALUES (?, ?, ?)",
+                        (collection, doc_id, _encode(document))
+                    )
+                conn.execute("COMMIT")
+                _count("writes", len(ops))
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+
+# ---------------------------------------------------------------------------
+# Async facade (the API the routes use)
+
+def _async_snapshot(client: "AsyncSqliteClient", snapshot: DocumentSnapshot) -> DocumentSnapshot:
+    return DocumentSnapshot(AsyncDocumentReference(client, snapshot.reference), snapshot._data)
+
+
+class AsyncAggregationQuery:
+    def __init__(self, client: "AsyncSqliteClient", aggregation: AggregationQuery):
+        self._client = client
+        self._aggregation = aggregation
+
+    async def get(self):
+        return await self._client._call(self._aggregation.get)
+
+
+class AsyncQuery:
+    def __init__(self, client: "AsyncSqliteClient", query: Query):
+        self._client = client
+        self._query = query
+
+    def _wrap(self, query: Query) -> "AsyncQuery":
+        return AsyncQuery(self._client, query)
+
+    def where(self, *args, **kwargs):
+        return self._wrap(self._query.where(*args, **kwargs))
+
+    def order_by(self, *args, **kwargs):
+        return self._wrap(self._query.order_by(*args, **kwargs))
+
+    def limit(self, count: int):
+        return self._wrap(self._query.limit(count))
+
+    def offset(self, num_to_skip: int):
+        return self._wrap(self._query.offset(num_to_skip))
+
+    def select(self, field_paths: Iterable[str]):
+        return self._wrap(self._query.select(field_paths))
+
+    def start_after(self, document_fields_or_snapshot):
+        if isinstance(document_fields_or_snapshot, dict):
+            document_fields_or_snapshot = {
+                key: value.id if isinstance(value, AsyncDocumentReference) else value
+                for key, value in document_fields_or_snapshot.items()
+            }
+        return self._wrap(self._query.start_after(document_fields_or_snapshot))
+
+    async def stream(self):
+        for snapshot in await self._client._call(self._query.get):
+            yield _async_snapshot(self._client, snapshot)
+
+    async def get(self) -> List[DocumentSnapshot]:
+        return [_async_snapshot(self._client, snapshot) for snapshot in await self._client._call(self._query.get)]
+
+    def count(self, alias: str = "count") -> AsyncAggregationQuery:
+        return AsyncAggregationQuery(self._client, self._query.count(alias))
+
+
+class AsyncCollectionReference(AsyncQuery):
+    def __init__(self, client: "AsyncSqliteClient", collection: CollectionReference):
+        super().__init__(client, collection)
+        self.path = collection.path
+        self.id = collection.id
+
+    def document(self, document_id: Optional[str] = None) -> "AsyncDocumentReference":
+        return AsyncDocumentReference(self._client, self._query.document(document_id))
+
+    async def add(self, document_data: Dict, document_id: Optional[str] = None):
+        timestamp, ref = await self._client._call(self._query.add, document_data, document_id)
+        return timestamp, AsyncDocumentReference(self._client, ref)
+
+
+class AsyncDocumentReference:
+    def __init__(self, client: "AsyncSqliteClient", reference: DocumentReference):
+        self._client = client
+        self._ref = reference
+        self._collection = reference._collection
+        self.id = reference.id
+        self.path = reference.path
+
+    def collection(self, name: str) -> AsyncCollectionReference:
+        return AsyncCollectionReference(self._client, self._ref.collection(name))
+
+    def _get(self, field_paths: Optional[Iterable[str]], transaction: Optional[Transaction]) -> DocumentSnapshot:
+        if transaction is None:
+            return self._ref.get(field_paths)
+        _count("reads", 1)
+        raw = transaction._record_read(self._ref)
+        return DocumentSnapshot(self._ref, _load(raw, field_paths) if raw is not None else None)
+
+    async def get(self, field_paths: Optional[Iterable[str]] = None, transaction=None) -> DocumentSnapshot:
+        snapshot = await self._client._call(self._get, field_paths, transaction)
+        return DocumentSnapshot(self, snapshot._data)
+
+    async def create(self, document_data: Dict):
+        await self._client._call(self._ref.create, document_data)
+
+    async def set(self, document_data: Dict, merge: bool = False):
+        await self._client._call(self._ref.set, document_data, merge)
+
+    async def update(self, field_updates: Dict):
+        await self._client._call(self._ref.update, field_updates)
+
+    async def delete(self):
+        await self._client._call(self._ref.delete)
+
+
+class AsyncWriteBatch(WriteBatch):
+    def __init__(self, client: "AsyncSqliteClient"):
+        super().__init__(client._sync)
+        self._async_client = client
+
+    async def commit(self):
+        return await self._async_client._call(WriteBatch.commit, self)
+
+
+class AsyncSqliteClient:
+    def __init__(self, client: SqliteClient, max_workers: int = 4):
+        self._sync = client
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sqlite")
+
+    async def _call(self, fn, *args):
+        """Run a SQLite call on the pool, in the caller's context (operation_counter)"""
+        context = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(context.run, fn, *args))
+
+    def close(self):
+        """Wait for running calls and stop the pool (the SqliteClient stays open)"""
+        self._executor.shutdown(wait=True)
+
+    def collection(self, path: str) -> AsyncCollectionReference:
+        return AsyncCollectionReference(self, self._sync.collection(path))
+
+    def batch(self) -> AsyncWriteBatch:
+        return AsyncWriteBatch(self)
+
+    async def get_all(self, references: Iterable, field_paths: Optional[Iterable[str]] = None):
+        snapshots = await self._call(lambda: list(self._sync.get_all(list(references), field_paths)))
+        for snapshot in snapshots:
+            yield _async_snapshot(self, snapshot)
+
+    async def run_transaction(self, fn, *args):
+        """
+        Run fn(transaction, *args) and apply its writes together when it returns
+        (nothing is written if it raises). fn runs again if a document it read
+        with transaction= changed before the commit
+        """
+        for attempt in range(1, MAX_TRANSACTION_ATTEMPTS + 1):
+            transaction = Transaction(self._sync)
+            result = await fn(transaction, *args)
+            try:
+                await self._call(transaction.commit)
+                return result
+            except Aborted:
+                if attempt == MAX_TRANSACTION_ATTEMPTS:
+                    raise
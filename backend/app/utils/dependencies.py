@@ -1,38 +1,116 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.utils.security import decode_access_token
+from app.utils.security import decode_access_token, CLAIMS_VERSION
 from app.database import get_database
+from app.config import settings
+from app.services.model_registry import model_registry
+from app.services.admission import AdmissionController, MODE_SHEDDING
+from app.services.user_cache import get_user, user_cache
 
 security = HTTPBearer()
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security)
-):
-    token = credentials.credentials
-    payload = decode_access_token(token)
+def _token_payload(credentials: HTTPAuthorizationCredentials) -> dict:
+    payload = decode_access_token(credentials.credentials)
 
-    if payload is None:
+    if payload is None or payload.get("sub") is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials"
         )
+    return payload
+
 
-    user_id = payload.get("sub")
-    if user_id is None:
+def _check_token_version(payload: dict, user: dict):
+    """Tokens issued before the user's token_version was bumped are revoked"""
+    if payload.get("tv", 0) != user.get("token_version", 0):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid authentication credentials"
+            detail="Token has been revoked"
         )
 
-    db = get_database()
-    user_doc = db.collection('users').document(user_id).get()
 
-    if not user_doc.exists:
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Full, fresh user record (routes that write or need more than the token claims)"""
+    payload = _token_payload(credentials)
+    user = await get_user(get_database(), payload["sub"])
+
+    if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
 
-    user = user_doc.to_dict()
-    user["id"] = user_doc.id
+    _check_token_version(payload, user)
     return user
+
+
+async def get_current_claims(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """
+    The signed claims of the access token (id, username, preferences_version),
+    without reading the user document while it is cached. For read-only routes;
+    the token version is always checked against the cached or freshly read user,
+    legacy tokens fall back to get_current_user
+    A revocation made on another worker is seen here once the cached entry
+    expires (user_cache_ttl_seconds) unless invalidations are broadcast. The
+    claims are not a user document, fetch the user for anything beyond the id
+    """
+    payload = _token_payload(credentials)
+    if payload.get("ver") != CLAIMS_VERSION:
+        return await get_current_user(credentials)
+
+    user = user_cache.peek(payload["sub"])
+    if user is None:
+        # Cache miss: read (and cache) the user, a token is never accepted unchecked
+        user = await get_user(get_database(), payload["sub"])
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
+        )
+    _check_token_version(payload, user)
+
+    return {
+        "id": payload["sub"],
+        "username": payload["username"],
+        "preferences_version": payload.get("pv", 0),
+        "token_version": payload.get("tv", 0),
+    }
+
+
+def ensure_model_ready(name: str):
+    """
+    Fail fast with 503 while a model is loading or warming up,
+    instead of queueing the request behind a cold model
+    """
+    if not model_registry.ensure_loading(name):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Model '{name}' is not ready yet, please retry shortly",
+            headers={"Retry-After": str(settings.model_not_ready_retry_after)}
+        )
+
+
+def require_model_ready(name: str):
+    """Dependency factory gating a route on a model's readiness"""
+    async def dependency():
+        ensure_model_ready(name)
+    return dependency
+
+
+def admit_inference(controller: AdmissionController, can_shed: bool = True) -> str:
+    """
+    Admission decision for a model-backed request, 429 with Retry-After while shedding load
+    Returns the mode the request should be served in (normal or degraded)
+    """
+    mode = controller.admit(can_shed=can_shed)
+    if mode == MODE_SHEDDING:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Server is under heavy load, please retry shortly",
+            headers={"Retry-After": str(settings.admission_retry_after)}
+        )
+    return mode
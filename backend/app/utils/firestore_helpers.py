@@ -1,9 +1,29 @@
 """
 Helper functions for Firestore operations
 """
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterable, List, Any, Optional, Tuple
 from datetime import datetime
 
+from app.config import settings
+
+# Firestore limit of operations per batched write
+MAX_BATCH_WRITES = 500
+
+# Fields each read needs, applied as server-side projections (select() on
+# queries, field_paths on document reads) so the rest is never transferred
+# An empty projection returns only the document id (existence checks)
+EXISTS_ONLY: Tuple[str, ...] = ()
+# Post lists and the feed: everything a PostResponse and the recommender use,
+# of moderation_result only the details shown on posts pending approval
+POST_LIST_FIELDS = (
+    "user_id", "author", "content", "image_url", "tags", "categories", "moderation_result.details",
+    "image_moderation_passed", "is_approved", "likes_count", "comments_count", "counter_shards",
+    "created_at", "updated_at"
+)
+# Counter updates and like status
+POST_COUNTER_FIELDS = ("likes_count", "comments_count", "counter_shards")
+LIKE_POST_FIELDS = ("post_id",)
+
 def doc_to_dict(doc) -> Optional[Dict[str, Any]]:
     """Convert Firestore document to dictionary with id"""
     if not doc or not doc.exists:
@@ -27,3 +47,23 @@ def prepare_doc_for_firestore(doc_dict: Dict[str, Any]) -> Dict[str, Any]:
             # Firestore handles datetime objects natively
             cleaned[key] = value
     return cleaned
+
+def projection(fields: Iterable[str]) -> Optional[List[str]]:
+    """field_paths argument for document reads (None = whole document when projections are off)"""
+    return list(fields) if settings.firestore_projections else None
+
+def select_fields(query, fields: Iterable[str]):
+    """Query that returns only the given fields of each document"""
+    field_paths = projection(fields)
+    return query.select(field_paths) if field_paths is not None else query
+
+async def get_fields(ref, fields: Iterable[str]):
+    """Snapshot of a document with only the given fields (exists is still accurate)"""
+    return await ref.get(field_paths=projection(fields))
+
+def like_id(post_id: str, user_id: str) -> str:
+    """
+    Deterministic like document id, one like per (post, user)
+    "Is liked" is a direct document get and toggling is idempotent
+    """
+    return f"{post_id}_{user_id}"
@@ -0,0 +1,108 @@
+"""
+Keyset Pagination for Firestore Queries
+Lists are ordered by (created_at, document id) and read with
+start_after(last item) + limit(page_size + 1), so a page costs page_size + 1
+document reads however deep it is. The position is handed to clients as an
+opaque cursor token (urlsafe base64 of the last item's created_at and id).
+
+Offset pagination (?page=N) is still served for older clients, but only up to
+settings.pagination_max_offset skipped documents, since Firestore bills
+skipped documents as reads.
+
+Queries ordered this way use the same composite index as the plain
+created_at ordering (Firestore appends the document id to every index).
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from datetime import datetime
+import base64
+import json
+
+from google.cloud.firestore_v1.field_path import FieldPath
+
+from app.utils.firestore_helpers import doc_to_dict
+
+DESCENDING = "DESCENDING"
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(item: Dict, field: str = "created_at") -> str:
+    """Opaque token for the position right after item"""
+    value = item[field]
+    payload = {"v": value.isoformat() if isinstance(value, datetime) else value, "id": item["id"]}
+    if isinstance(value, datetime):
+        payload["t"] = "dt"
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[Any, str]:
+    """(order field value, document id) from a cursor token"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        value = payload["v"]
+        if payload.get("t") == "dt":
+            value = datetime.fromisoformat(value)
+        return value, str(payload["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursorError("Invalid pagination cursor") from e
+
+
+def keyset_query(query, field: str = "created_at", direction: str = DESCENDING):
+    """Order a query by field then document id, the total order used by cursors"""
+    return query.order_by(field, direction=direction).order_by(FieldPath.document_id(), direction=direction)
+
+
+async def fetch_page(
+    query,
+    collection_ref,
+    page_size: int,
+    cursor: Optional[str] = None,
+    offset: int = 0,
+    predicate: Optional[Callable[[Dict], bool]] = None,
+    field: str = "created_at",
+    max_scan: Optional[int] = None
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    One page of a keyset-ordered query, returns (items, next_cursor)
+    next_cursor is None on the last page. predicate filters items in memory for
+    conditions Firestore cannot express; matching items are read in chunks until
+    the page is full or max_scan documents were read
+    """
+    chunk_query = query
+    if cursor:
+        value, doc_id = decode_cursor(cursor)
+        chunk_query = query.start_after({field: value, FieldPath.document_id(): collection_ref.document(doc_id)})
+    elif offset:
+        chunk_query = query.offset(offset)
+
+    items: List[Dict] = []
+    scanned = 0
+    while True:
+        chunk = [doc async for doc in chunk_query.limit(page_size + 1).stream()]
+        scanned += len(chunk)
+        for doc in chunk:
+            item = doc_to_dict(doc)
+            if predicate is None or predicate(item):
+                items.append(item)
+        if len(items) > page_size or len(chunk) <= page_size:
+            break
+        if max_scan is not None and scanned >= max_scan:
+            # Stop scanning, the client continues from the last document read
+            last = doc_to_dict(chunk[-1])
+            return items, encode_cursor(last, field)
+        chunk_query = query.start_after(chunk[-1])
+
+    if len(items) > page_size:
+        items = items[:page_size]
+        return items, encode_cursor(items[-1], field)
+    return items, None
+
+
+async def count(query) -> int:
+    """Number of documents matching a query, counted server-side without reading them"""
+    result = await query.count().get()
+    return int(result[0][0].value)
@@ -0,0 +1,171 @@
+"""
+In-memory Rate Limiting
+Token buckets per (route, user) and (route, client IP), refilled continuously,
+so a single account or address cannot flood the routes that run model
+inference and Firestore writes. Each bucket is three floats and is updated
+in O(log n). Buckets are dropped once they would be full again (idle for one
+refill period, tracked in a heap of expiry times), so memory is bounded by
+recently active clients. Buckets that are not full yet are never dropped,
+even beyond rate_limit_max_keys (a warning is logged instead), so cycling
+through keys cannot reset another key's limit.
+
+Limits are configured per route in settings.rate_limits as "<count>/<period>",
+e.g. {"create_post": "10/minute"}. The per-IP limit is the per-user limit
+times rate_limit_ip_multiplier, since many users may share an address.
+"""
+from typing import Dict, List, Optional, Tuple
+import heapq
+import math
+import threading
+import time
+import logging
+
+from fastapi import HTTPException, Request, status
+
+from app.config import settings
+from app.utils.security import decode_access_token
+
+logger = logging.getLogger(__name__)
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_limit(spec: str) -> Tuple[float, float]:
+    """"10/minute" -> (capacity 10, refill rate 10/60 per second)"""
+    count, _, period = spec.partition("/")
+    period = period.strip().lower().rstrip("s")
+    if period not in _PERIODS:
+        raise ValueError(f"Invalid rate limit '{spec}', expected <count>/<second|minute|hour|day>")
+    capacity = float(count)
+    return capacity, capacity / _PERIODS[period]
+
+
+class RateLimiter:
+    """Token buckets keyed by arbitrary strings, thread-safe"""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        # key -> [tokens, last_update, idle_expiry]
+        self._buckets: Dict[str, list] = {}
+        # (scheduled expiry, key), one entry per bucket, earliest first
+        self._expiries: List[Tuple[float, str]] = []
+        self.rejected: Dict[str, int] = {}
+        self.over_capacity = 0
+
+    def _expire(self, now: float):
+        """
+        Drop buckets that have refilled completely, in idle_expiry order
+        A bucket used again since it was scheduled is rescheduled at its new expiry
+        """
+        while self._expiries and self._expiries[0][0] <= now:
+            _, key = heapq.heappop(self._expiries)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                continue
+            if bucket[2] <= now:
+                del self._buckets[key]
+            else:
+                heapq.heappush(self._expiries, (bucket[2], key))
+
+    def hit(self, key: str, capacity: float, rate: float) -> float:
+        """
+        Take one token from the bucket, returns 0 if allowed, otherwise the
+        number of seconds until a token is available
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = capacity
+            else:
+                tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0.0
+            else:
+                retry_after = (1 - tokens) / rate
+
+            # Time at which the bucket is full again and can be forgotten
+            idle_expiry = now + (capacity - tokens) / rate
+            if bucket is None:
+                self._buckets[key] = [tokens, now, idle_expiry]
+                heapq.heappush(self._expiries, (idle_expiry, key))
+                if len(self._buckets) > self.max_keys:
+                    # Only full buckets are ever dropped: forgetting one that still
+                    # throttles a client would reset its limit
+                    self.over_capacity += 1
+                    if self.over_capacity == 1 or self.over_capacity % 10000 == 0:
+                        logger.warning(f"Rate limiter holds {len(self._buckets)} active buckets "
+                                       f"(rate_limit_max_keys={self.max_keys})")
+            else:
+                bucket[0], bucket[1], bucket[2] = tokens, now, idle_expiry
+            return retry_after
+
+    def record_rejection(self, route: str):
+        with self._lock:
+            self.rejected[route] = self.rejected.get(route, 0) + 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            self._expire(time.monotonic())
+            return {
+                "active_keys": len(self._buckets),
+                "over_capacity": self.over_capacity,
+                "rejected": dict(self.rejected)
+            }
+
+
+# Singleton instance
+rate_limiter = RateLimiter(max_keys=settings.rate_limit_max_keys)
+
+
+def client_ip(request: Request) -> str:
+    if settings.rate_limit_trust_forwarded_for:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def _user_id_from_request(request: Request) -> Optional[str]:
+    """User id from the bearer token without touching the database (auth validates it later)"""
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    payload = decode_access_token(token)
+    return payload.get("sub") if payload else None
+
+
+def rate_limit(route: str, per_user: bool = True):
+    """
+    Dependency factory enforcing settings.rate_limits[route] per user and per IP
+    Runs before the route body, so rejected requests never reach the models
+    """
+    async def dependency(request: Request):
+        spec = settings.rate_limits.get(route)
+        if not settings.rate_limit_enabled or not spec:
+            return
+        capacity, rate = parse_limit(spec)
+
+        waits = [rate_limiter.hit(
+            f"ip:{route}:{client_ip(request)}",
+            capacity * settings.rate_limit_ip_multiplier,
+            rate * settings.rate_limit_ip_multiplier
+        )]
+        user_id = _user_id_from_request(request) if per_user else None
+        if user_id:
+            waits.append(rate_limiter.hit(f"user:{route}:{user_id}", capacity, rate))
+
+        retry_after = max(waits)
+        if retry_after > 0:
+            rate_limiter.record_rejection(route)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Too many requests, limit is {spec}",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+    return dependency
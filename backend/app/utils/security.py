@@ -1,4 +1,7 @@
 import hashlib
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -10,6 +13,10 @@ def get_password_hash(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return hashlib.sha256(plain_password.encode()).hexdigest() == hashed_password
 
+# Version of the claim set in access tokens, tokens without it are legacy (sub only)
+CLAIMS_VERSION = 1
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -20,9 +27,64 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
+
+def user_claims(user: dict) -> dict:
+    """
+    Minimal signed claim set for a user: id, username, preferences version and
+    the token version (bumped server-side to revoke every token issued before)
+    """
+    return {
+        "sub": user["id"],
+        "ver": CLAIMS_VERSION,
+        "username": user["username"],
+        "pv": user.get("preferences_version", 0),
+        "tv": user.get("token_version", 0),
+    }
+
+
+class DecodedTokenCache:
+    """LRU of verified token payloads, so repeated requests skip the signature check"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._payloads: "OrderedDict[str, dict]" = OrderedDict()
+        self.counts = {"hits": 0, "misses": 0}
+
+    def get(self, token: str) -> Optional[dict]:
+        with self._lock:
+            payload = self._payloads.get(token)
+            if payload is not None and payload.get("exp", 0) > time.time():
+                self._payloads.move_to_end(token)
+                self.counts["hits"] += 1
+                return payload
+            if payload is not None:
+                del self._payloads[token]
+            self.counts["misses"] += 1
+            return None
+
+    def put(self, token: str, payload: dict):
+        with self._lock:
+            self._payloads[token] = payload
+            while len(self._payloads) > self.max_entries:
+                self._payloads.popitem(last=False)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._payloads), **self.counts}
+
+
+# Singleton instance
+decoded_token_cache = DecodedTokenCache(max_entries=settings.token_cache_max_entries)
+
+
 def decode_access_token(token: str):
+    payload = decoded_token_cache.get(token)
+    if payload is not None:
+        return dict(payload)
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        return payload
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+    decoded_token_cache.put(token, payload)
+    return dict(payload)
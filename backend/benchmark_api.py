@@ -0,0 +1,369 @@
+"""
+In-process API benchmark
+Runs app.main.app against an in-memory store (the SQLite backend opened on
+":memory:", which implements the Firestore calls the routes make), seeds it
+with generated users, posts, likes and comments, and drives a weighted mix of
+read and write requests through httpx's ASGI transport. No server, Firestore
+project or model download is needed, so the numbers isolate the request path:
+handler and serialization cost, event-loop blocking and documents read/written
+per request.
+
+Reports throughput, p50/p95/p99 latency, the average document reads/writes
+per endpoint (counted the way Firestore bills them) and bytes of document data
+read per request, plus event-loop lag. --compare-projections repeats each level
+with field projections turned off and prints the bytes saved per endpoint.
+
+Usage:
+    python benchmark_api.py                                  # tiny models, default scale
+    python benchmark_api.py --users 1000 --posts 20000 --concurrency 1 8 32
+    python benchmark_api.py --mix "GET /api/posts/=1"        # a single endpoint
+    python benchmark_api.py --models real                    # load the real checkpoints
+    python benchmark_api.py --compare-projections            # bytes read with vs without select()
+"""
+import sys
+import os
+import io
+
+# Fix encoding for Windows console
+if sys.platform == "win32":
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+sys.path.append(os.path.dirname(__file__))
+
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import httpx
+import numpy as np
+
+from app.config import settings
+from app.utils.firestore_helpers import MAX_BATCH_WRITES
+
+TAGS = ["tech", "ai", "python", "food", "cooking", "travel", "vietnam", "sports", "fitness",
+        "music", "photography", "nature", "art", "gaming", "books", "movies"]
+CATEGORIES = ["technology", "programming", "food", "travel", "sports", "music", "photography", "art"]
+WORDS = ["great", "photo", "today", "amazing", "trip", "new", "recipe", "run", "model", "song",
+         "weekend", "city", "friends", "learning", "coffee", "sunset", "game", "book", "training"]
+
+# Endpoint -> weight. Path placeholders are filled per request
+DEFAULT_MIX = {
+    "GET /api/posts/": 35,
+    "GET /api/posts/{post_id}": 15,
+    "GET /api/posts/{post_id}/comments": 15,
+    "GET /api/posts/{post_id}/like": 5,
+    "GET /api/posts/feed": 5,
+    "GET /api/auth/me": 5,
+    "POST /api/posts/{post_id}/like": 12,
+    "POST /api/posts/{post_id}/comments": 6,
+    "POST /api/posts/": 2,
+}
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)) + f" #{rng.randrange(10 ** 6)}"
+
+
+def seed(db, num_users: int, num_posts: int, max_likes: int, max_comments: int, rng: random.Random):
+    """Write generated users, posts, likes and comments, counters consistent with the documents"""
+    from app.utils.security import get_password_hash
+    from app.utils.firestore_helpers import like_id
+    from app.services.author_snapshots import AUTHOR_FIELD, author_snapshot
+
+    batch, pending = db.batch(), 0
+
+    def write(ref, data):
+        nonlocal batch, pending
+        batch.set(ref, data)
+        pending += 1
+        if pending == MAX_BATCH_WRITES:
+            batch.commit()
+            batch, pending = db.batch(), 0
+
+    # bcrypt is slow on purpose, every generated user shares one password
+    password_hash = get_password_hash("benchmark-password")
+    users = []
+    for i in range(num_users):
+        user = {
+            "username": f"bench_user_{i}",
+            "email": f"bench_user_{i}@example.com",
+            "password_hash": password_hash,
+            "full_name": f"Bench User {i}",
+            "bio": None,
+            "avatar_url": None,
+            "preferences": {"favorite_tags": rng.sample(TAGS, 3), "interests": rng.sample(CATEGORIES, 2)}
+        }
+        ref = db.collection('users').document(f"user{i:07d}")
+        write(ref, user)
+        users.append({"id": ref.id, **user})
+
+    now = datetime.utcnow()
+    post_ids, likes, comments = [], 0, 0
+    for i in range(num_posts):
+        author = rng.choice(users)
+        post_ref = db.collection('posts').document(f"post{i:08d}")
+        created_at = now - timedelta(seconds=rng.randrange(30 * 24 * 3600))
+        likers = rng.sample(users, min(len(users), rng.randint(0, max_likes)))
+        num_comments = rng.randint(0, max_comments)
+        write(post_ref, {
+            "user_id": author["id"],
+            AUTHOR_FIELD: author_snapshot(author),
+            "content": _sentence(rng, 20),
+            "image_url": None,
+            "tags": rng.sample(TAGS, 3),
+            "categories": rng.sample(CATEGORIES, 1),
+            "moderation_result": {"passed": True},
+            "image_moderation_passed": True,
+            "is_approved": rng.random() > 0.05,
+            "likes_count": len(likers),
+            "comments_count": num_comments,
+            "created_at": created_at,
+            "updated_at": created_at
+        })
+        for liker in likers:
+            write(db.collection('likes').document(like_id(post_ref.id, liker["id"])), {
+                "post_id": post_ref.id, "user_id": liker["id"], "created_at": created_at
+            })
+        for _ in range(num_comments):
+            commenter = rng.choice(users)
+            write(db.collection('comments').document(), {
+                "post_id": post_ref.id,
+                "user_id": commenter["id"],
+                AUTHOR_FIELD: author_snapshot(commenter),
+                "content": _sentence(rng, 8),
+                "created_at": created_at,
+                "updated_at": created_at
+            })
+        post_ids.append(post_ref.id)
+        likes += len(likers)
+        comments += num_comments
+
+    if pending:
+        batch.commit()
+    print(f"   Seeded {len(users)} users, {len(post_ids)} posts, {likes} likes, {comments} comments")
+    return users, post_ids
+
+
+def build_request(endpoint: str, post_ids, rng: random.Random):
+    """(method, path, json body) for one request to the endpoint"""
+    method, template = endpoint.split(" ", 1)
+    path = template.format(post_id=rng.choice(post_ids))
+    body = None
+    if endpoint == "GET /api/posts/":
+        path += f"?page_size=20&page={rng.choice([1, 1, 1, 2, 3])}"
+    elif endpoint == "POST /api/posts/{post_id}/comments":
+        body = {"content": _sentence(rng, 8)}
+    elif endpoint == "POST /api/posts/":
+        body = {"content": _sentence(rng, 20), "tags": rng.sample(TAGS, 2), "categories": rng.sample(CATEGORIES, 1)}
+    return method, path, body
+
+
+async def run_level(client, tokens, post_ids, mix, concurrency, duration, seed_value):
+    """Keep `concurrency` requests in flight for `duration` seconds"""
+    from app.storage.sqlite import operation_counter
+
+    endpoints, weights = list(mix), list(mix.values())
+    stats = defaultdict(lambda: {"latencies": [], "errors": 0, "reads": 0, "writes": 0, "bytes": 0})
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_id):
+        rng = random.Random(seed_value * 1000 + worker_id)
+        headers = {"Authorization": f"Bearer {tokens[worker_id % len(tokens)]}"}
+        while time.perf_counter() < deadline:
+            endpoint = rng.choices(endpoints, weights)[0]
+            method, path, body = build_request(endpoint, post_ids, rng)
+            counter = {"reads": 0, "writes": 0, "bytes": 0}
+            operation_counter.set(counter)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body, headers=headers)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            elapsed = time.perf_counter() - start
+            entry = stats[endpoint]
+            if failed:
+                entry["errors"] += 1
+                continue
+            entry["latencies"].append(elapsed)
+            entry["reads"] += counter["reads"]
+            entry["writes"] += counter["writes"]
+            entry["bytes"] += counter["bytes"]
+
+    lag = []
+
+    async def monitor_loop_lag(interval=0.01):
+        # Oversleeping the interval means something blocked the event loop
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lag.append(time.perf_counter() - start - interval)
+
+    start = time.perf_counter()
+    await asyncio.gather(monitor_loop_lag(), *(worker(i) for i in range(concurrency)))
+    wall = time.perf_counter() - start
+
+    def summarize(latencies, count_reads, count_writes, count_bytes):
+        ms = np.asarray(latencies) * 1000 if latencies else np.zeros(1)
+        n = max(1, len(latencies))
+        return {
+            "requests": len(latencies),
+            "requests_per_sec": len(latencies) / wall if wall else None,
+            "p50_ms": float(np.percentile(ms, 50)),
+            "p95_ms": float(np.percentile(ms, 95)),
+            "p99_ms": float(np.percentile(ms, 99)),
+            "reads_per_request": count_reads / n,
+            "writes_per_request": count_writes / n,
+            "bytes_per_request": count_bytes / n,
+        }
+
+    all_latencies = [value for entry in stats.values() for value in entry["latencies"]]
+    result = summarize(
+        all_latencies,
+        sum(entry["reads"] for entry in stats.values()),
+        sum(entry["writes"] for entry in stats.values()),
+        sum(entry["bytes"] for entry in stats.values())
+    )
+    lag_ms = np.asarray(lag) * 1000 if lag else np.zeros(1)
+    result.update({
+        "concurrency": concurrency,
+        "errors": sum(entry["errors"] for entry in stats.values()),
+        "loop_lag_p99_ms": float(np.percentile(lag_ms, 99)),
+        "loop_lag_max_ms": float(lag_ms.max()),
+        "endpoints": {
+            endpoint: {
+                **summarize(entry["latencies"], entry["reads"], entry["writes"], entry["bytes"]),
+                "errors": entry["errors"]
+            }
+            for endpoint, entry in sorted(stats.items())
+        }
+    })
+    return result
+
+
+def print_result(result):
+    print(f"\n   concurrency {result['concurrency']}"
+          f"{'' if result['projections'] else ' (no projections)'}: {result['requests_per_sec']:.1f} req/s  "
+          f"p50 {result['p50_ms']:.1f} ms  p95 {result['p95_ms']:.1f} ms  p99 {result['p99_ms']:.1f} ms  "
+          f"errors {result['errors']}  loop lag p99 {result['loop_lag_p99_ms']:.1f} ms "
+          f"(max {result['loop_lag_max_ms']:.1f})")
+    print(f"   {'endpoint':<38} {'req':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'reads':>7} {'writes':>7} "
+          f"{'KB read':>8} {'err':>5}")
+    for endpoint, entry in result["endpoints"].items():
+        print(f"   {endpoint:<38} {entry['requests']:>6} {entry['p50_ms']:>8.1f} {entry['p95_ms']:>8.1f} "
+              f"{entry['p99_ms']:>8.1f} {entry['reads_per_request']:>7.1f} {entry['writes_per_request']:>7.2f} "
+              f"{entry['bytes_per_request'] / 1024:>8.1f} {entry['errors']:>5}")
+
+
+def print_projection_savings(with_projections, without_projections):
+    """Bytes of document data read per request, with vs without field projections"""
+    print(f"\n   bytes read per request at concurrency {with_projections['concurrency']}")
+    print(f"   {'endpoint':<38} {'full docs':>10} {'projected':>10} {'saved':>7}")
+    rows = [("all", without_projections, with_projections)] + [
+        (endpoint, without_projections["endpoints"].get(endpoint), entry)
+        for endpoint, entry in with_projections["endpoints"].items()
+    ]
+    for endpoint, full, projected in rows:
+        if not full or not full["bytes_per_request"]:
+            continue
+        saved = 1 - projected["bytes_per_request"] / full["bytes_per_request"]
+        print(f"   {endpoint:<38} {full['bytes_per_request']:>10.0f} {projected['bytes_per_request']:>10.0f} "
+              f"{saved:>7.0%}")
+
+
+async def main_async(args, mix):
+    # In-memory store, no rate limits (every request comes from one process)
+    settings.storage_backend = "sqlite"
+    settings.sqlite_path = ":memory:"
+    settings.rate_limit_enabled = False
+    settings.model_warmup_on_startup = False
+
+    from app.main import app
+    from app.database import get_sync_database
+    from app.services.model_registry import model_registry
+    from app.utils.security import create_access_token, user_claims
+
+    rng = random.Random(args.seed)
+    async with app.router.lifespan_context(app):
+        print("Seeding...")
+        start = time.perf_counter()
+        users, post_ids = seed(get_sync_database(), args.users, args.posts, args.max_likes, args.max_comments, rng)
+        print(f"   {time.perf_counter() - start:.1f}s")
+
+        print("Loading models...")
+        for name in model_registry.names:
+            await model_registry.aget(name)
+
+        tokens = [create_access_token(user_claims(user)) for user in rng.sample(users, min(len(users), 100))]
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            # Warm up caches and code paths
+            await run_level(client, tokens, post_ids, mix, 1, args.warmup, args.seed)
+
+            results = []
+            for concurrency in args.concurrency:
+                for projections in ([True, False] if args.compare_projections else [True]):
+                    settings.firestore_projections = projections
+                    result = await run_level(client, tokens, post_ids, mix, concurrency, args.duration, args.seed)
+                    result["projections"] = projections
+                    results.append(result)
+                    print_result(result)
+                if args.compare_projections:
+                    print_projection_savings(results[-2], results[-1])
+            settings.firestore_projections = True
+        return results
+
+
+def parse_mix(items):
+    mix = {}
+    for item in items:
+        endpoint, _, weight = item.rpartition("=")
+        if endpoint not in DEFAULT_MIX:
+            raise SystemExit(f"Unknown endpoint '{endpoint}', choose from: {', '.join(DEFAULT_MIX)}")
+        mix[endpoint] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API in-process against an in-memory store")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--max-likes", type=int, default=20, help="Likes per post are uniform in [0, N]")
+    parser.add_argument("--max-comments", type=int, default=5, help="Comments per post are uniform in [0, N]")
+    parser.add_argument("--mix", nargs="+", help='Traffic mix as "METHOD /path=weight" (default: built-in mix)')
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per concurrency level")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--models", choices=["tiny", "real"], default="tiny",
+                        help="tiny: random-weight stand-ins (no downloads), real: the configured checkpoints")
+    parser.add_argument("--compare-projections", action="store_true",
+                        help="Repeat each level without field projections and compare bytes read")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="benchmark_api.json")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+
+    print("=" * 60)
+    print(f"API BENCHMARK (in-process, in-memory store, {args.models} models)")
+    print("=" * 60)
+
+    if args.models == "tiny":
+        from tiny_models import use_tiny_models
+        models = use_tiny_models()
+    else:
+        models = contextlib.nullcontext()
+    with models:
+        results = asyncio.run(main_async(args, mix))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"args": vars(args), "mix": mix, "results": results}, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
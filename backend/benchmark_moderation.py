@@ -0,0 +1,258 @@
+"""
+Moderation latency / throughput benchmark
+Runs text and image corpora through each moderation path at several batch
+sizes and concurrency levels and records p50/p95/p99 latency, items/sec and
+peak RSS.
+
+Paths:
+- rule_fallback:   ContentModerationService without a model (keyword rules)
+- ai_text:         toxic-bert only (cascade disabled)
+- ai_text_cascade: spam/lexicon/distilled tiers in front of toxic-bert
+- nsfw:            NSFW ViT only
+- nsfw_clip:       NSFW ViT + CLIP zero-shot
+
+Usage:
+    python benchmark_moderation.py --batch-sizes 1 8 32 --concurrency 1 4 --output moderation_bench.json
+    python benchmark_moderation.py --tiny-models      # random-weight models, no downloads
+    python benchmark_moderation.py --texts recorded.jsonl --images ./recorded_images
+
+A batch of 1 goes through the service's public API (end to end); larger
+batches call the underlying pipelines with the whole batch, as the model server does.
+Latency is per call, so with batches it is the latency seen by every item in the batch.
+"""
+import sys
+import os
+import io
+
+# Fix encoding for Windows console
+if sys.platform == "win32":
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+sys.path.append(os.path.dirname(__file__))
+
+import argparse
+import contextlib
+import json
+import platform
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from validate_inference_backends import DEFAULT_TEXTS, load_texts, load_images, current_rss_mb
+
+TEXT_PATHS = ["rule_fallback", "ai_text", "ai_text_cascade"]
+IMAGE_PATHS = ["nsfw", "nsfw_clip"]
+
+_WORDS = (
+    "the a great post photo today learned new recipe love this thanks sharing kubernetes python "
+    "weekend trip beach sunset coffee idea project team really amazing think wrong argument idiot "
+    "stupid hate awful buy now click here"
+).split()
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB (None where unsupported)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, KB elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def synthetic_texts(count, seed=0):
+    """Recorded-looking posts of mixed length, including the default corpus"""
+    rng = random.Random(seed)
+    texts = list(DEFAULT_TEXTS)
+    while len(texts) < count:
+        length = rng.choice([3, 8, 20, 60, 150])
+        texts.append(" ".join(rng.choice(_WORDS) for _ in range(length)).capitalize())
+    return texts[:count]
+
+
+def synthetic_images(count, seed=0):
+    """Random noise images at typical upload sizes"""
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    images = []
+    for i in range(count):
+        size = (224, 224) if i % 2 == 0 else (640, 480)
+        pixels = rng.integers(0, 256, size=(size[1], size[0], 3), dtype=np.uint8)
+        images.append((f"synthetic-{i}", Image.fromarray(pixels, "RGB")))
+    return images
+
+
+@contextlib.contextmanager
+def quiet():
+    """The services print per request, keep the benchmark output readable"""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def _failing_loader(*args, **kwargs):
+    raise RuntimeError("model disabled for the rule fallback benchmark")
+
+
+def build_path(path):
+    """Return (service, run_batch) for a moderation path"""
+    from app.services import moderation_service
+
+    if path in TEXT_PATHS:
+        if path == "rule_fallback":
+            original = moderation_service.load_text_classification_pipeline
+            moderation_service.load_text_classification_pipeline = _failing_loader
+            try:
+                service = moderation_service.ContentModerationService()
+            finally:
+                moderation_service.load_text_classification_pipeline = original
+        else:
+            service = moderation_service.ContentModerationService()
+            if service.classifier is None:
+                raise RuntimeError("text model failed to load")
+            service.cascade_enabled = path == "ai_text_cascade"
+
+        def run_text_batch(texts):
+            if len(texts) == 1 or service.classifier is None:
+                for text in texts:
+                    service.moderate_text_sync(text)
+                return
+            if service.cascade_enabled:
+                texts = [t for t in texts if service.cascade.try_early_exit(t) is None]
+            if texts:
+                service.classifier([t[:512] for t in texts])
+            for text in texts:
+                service._check_spam(text[:512])
+
+        return service, run_text_batch
+
+    service = moderation_service.ImageModerationService()
+    if service.classifier is None:
+        raise RuntimeError("image models failed to load")
+    if path == "nsfw":
+        service.clip_classifier = None
+
+    def run_image_batch(images):
+        if len(images) == 1:
+            service._moderate_pil_image(images[0])
+            return
+        service.classifier(images)
+        if service.clip_classifier is not None:
+            service.clip_classifier(images, candidate_labels=moderation_service.CLIP_CANDIDATE_LABELS)
+
+    return service, run_image_batch
+
+
+def run_benchmark(run_batch, items, batch_size, concurrency, warmup):
+    """Feed items in batches from `concurrency` threads, return per-call latencies and wall time"""
+    batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    for batch in batches[:warmup]:
+        run_batch(batch)
+
+    def timed(batch):
+        start = time.perf_counter()
+        run_batch(batch)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(timed, batches))
+    return latencies, time.perf_counter() - start
+
+
+def summarize(path, batch_size, concurrency, items, latencies, wall_seconds, rss_before):
+    latencies_ms = np.asarray(latencies) * 1000
+    return {
+        "path": path,
+        "batch_size": batch_size,
+        "concurrency": concurrency,
+        "items": items,
+        "calls": len(latencies),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "mean_ms": float(latencies_ms.mean()),
+        "items_per_sec": items / wall_seconds if wall_seconds else None,
+        "rss_before_mb": rss_before,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the moderation paths under load")
+    parser.add_argument("--paths", nargs="+", default=TEXT_PATHS + IMAGE_PATHS,
+                        choices=TEXT_PATHS + IMAGE_PATHS)
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4])
+    parser.add_argument("--texts", help="Recorded text corpus (JSONL with \"text\" or plain lines)")
+    parser.add_argument("--images", help="Directory with recorded images")
+    parser.add_argument("--num-texts", type=int, default=256, help="Synthetic texts when no --texts")
+    parser.add_argument("--num-images", type=int, default=64, help="Synthetic images when no --images")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed batches per run")
+    parser.add_argument("--tiny-models", action="store_true",
+                        help="Use tiny random-weight models instead of downloading checkpoints")
+    parser.add_argument("--output", default="moderation_benchmark.json")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("MODERATION BENCHMARK")
+    print("=" * 60)
+
+    texts = load_texts(args.texts) if args.texts else synthetic_texts(args.num_texts)
+    images = [image for _, image in (load_images(args.images) if args.images else synthetic_images(args.num_images))]
+    print(f"Corpus: {len(texts)} texts, {len(images)} images"
+          f"{' (tiny random-weight models)' if args.tiny_models else ''}")
+
+    if args.tiny_models:
+        from tiny_models import use_tiny_models
+        models = use_tiny_models()
+    else:
+        models = contextlib.nullcontext()
+
+    results = []
+    with models:
+        for path in args.paths:
+            corpus = texts if path in TEXT_PATHS else images
+            if not corpus:
+                print(f"\n{path}: skipped (empty corpus)")
+                continue
+            print(f"\n{path}: loading...")
+            load_start = time.perf_counter()
+            with quiet():
+                service, run_batch = build_path(path)
+            print(f"{path}: loaded in {time.perf_counter() - load_start:.1f}s")
+
+            for batch_size in args.batch_sizes:
+                for concurrency in args.concurrency:
+                    rss_before = current_rss_mb()
+                    with quiet():
+                        latencies, wall = run_benchmark(run_batch, corpus, batch_size, concurrency, args.warmup)
+                    result = summarize(path, batch_size, concurrency, len(corpus), latencies, wall, rss_before)
+                    results.append(result)
+                    print(f"   batch {batch_size:<4} concurrency {concurrency:<3} "
+                          f"p50 {result['p50_ms']:8.1f} ms  p95 {result['p95_ms']:8.1f} ms  "
+                          f"p99 {result['p99_ms']:8.1f} ms  {result['items_per_sec']:8.1f} items/s")
+            del service
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "tiny_models": args.tiny_models,
+            },
+            "corpus": {
+                "texts": len(texts), "text_source": args.texts or "synthetic",
+                "images": len(images), "image_source": args.images or "synthetic",
+            },
+            "results": results,
+        }, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Startup benchmark: time from launching uvicorn to the first successful GET /
+
+Usage:
+    python benchmark_startup.py --runs 5 --port 9181
+    python benchmark_startup.py --no-warmup   # models only load on first use
+
+Also reports how long `import app.main` takes on its own, which used to
+include loading every transformer model.
+"""
+import sys
+import os
+import io
+
+# Fix encoding for Windows console
+if sys.platform == "win32":
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+import argparse
+import json
+import statistics
+import subprocess
+import time
+import urllib.request
+import urllib.error
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure_import_time() -> float:
+    """Import app.main in a fresh interpreter and return the elapsed seconds"""
+    code = (
+        "import time; start = time.perf_counter(); import app.main; "
+        "print(time.perf_counter() - start)"
+    )
+    output = subprocess.check_output([sys.executable, "-c", code], cwd=BACKEND_DIR, text=True)
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_time_to_first_response(port: int, timeout: float, env: dict) -> float:
+    """Start uvicorn and poll GET / until it answers 200"""
+    url = f"http://127.0.0.1:{port}/"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError, TimeoutError):
+                pass
+            time.sleep(0.05)
+        raise TimeoutError(f"No successful GET / within {timeout}s")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API cold start time")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=9181)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--no-warmup", action="store_true",
+                        help="Disable background model loading (MODEL_WARMUP_ON_STARTUP=false)")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.no_warmup:
+        env["MODEL_WARMUP_ON_STARTUP"] = "false"
+
+    print("=" * 60)
+    print("API STARTUP BENCHMARK")
+    print("=" * 60)
+
+    import_times = []
+    startup_times = []
+    for run in range(1, args.runs + 1):
+        import_time = measure_import_time()
+        startup_time = measure_time_to_first_response(args.port, args.timeout, env)
+        import_times.append(import_time)
+        startup_times.append(startup_time)
+        print(f"Run {run}: import app.main {import_time:.2f}s, first GET / after {startup_time:.2f}s")
+
+    results = {
+        "runs": args.runs,
+        "warmup_on_startup": not args.no_warmup,
+        "import_seconds": {"median": statistics.median(import_times), "max": max(import_times)},
+        "time_to_first_response_seconds": {
+            "median": statistics.median(startup_times),
+            "max": max(startup_times),
+        },
+    }
+    print("-" * 60)
+    print(f"Median import time:           {results['import_seconds']['median']:.2f}s")
+    print(f"Median time to first GET /:   {results['time_to_first_response_seconds']['median']:.2f}s")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Counter concurrency check
+Toggles likes and adds/removes comments on one throwaway post from many
+concurrent tasks, then compares likes_count / comments_count (including counter shards)
+with the number of like and comment documents. Lost updates show up as a mismatch.
+
+Usage (point FIRESTORE_EMULATOR_HOST at an emulator to keep production clean):
+    python check_counter_concurrency.py --users 50 --toggles 6 --concurrency 16
+    python check_counter_concurrency.py --shards 4     # exercise sharded counters
+
+Exit code 0 when all counts are exact.
+"""
+import sys
+import os
+import io
+
+# Fix encoding for Windows console
+if sys.platform == "win32":
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+sys.path.append(os.path.dirname(__file__))
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime
+
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+from app.database import connect_to_firestore, get_database
+from app.routes.likes import toggle_post_like
+from app.services.counters import (
+    COMMENTS_COUNT,
+    LIKES_COUNT,
+    SHARDS_COLLECTION,
+    increment_counter,
+    apply_sharded_counts,
+    shard_sum_cache
+)
+from app.utils.firestore_helpers import doc_to_dict
+from app.utils.pagination import count
+
+
+async def add_comment(db, post_id, user_id):
+    post_ref = db.collection('posts').document(post_id)
+    comment_ref = db.collection('comments').document()
+    batch = db.batch()
+    batch.set(comment_ref, {
+        "post_id": post_id,
+        "user_id": user_id,
+        "content": "concurrency check",
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow()
+    })
+    increment_counter(batch, post_ref, doc_to_dict(await post_ref.get()), COMMENTS_COUNT, 1)
+    await batch.commit()
+    return comment_ref
+
+
+async def remove_comment(db, post_id, comment_ref):
+    post_ref = db.collection('posts').document(post_id)
+    batch = db.batch()
+    batch.delete(comment_ref)
+    increment_counter(batch, post_ref, doc_to_dict(await post_ref.get()), COMMENTS_COUNT, -1)
+    await batch.commit()
+
+
+async def user_actions(db, post_id, user_id, toggles, seed):
+    """Toggle the like `toggles` times and add one comment, remove it half of the time"""
+    rng = random.Random(seed)
+    liked = None
+    for _ in range(toggles):
+        liked, _ = await toggle_post_like(db, post_id, user_id)
+    comment_ref = await add_comment(db, post_id, user_id)
+    if rng.random() < 0.5:
+        await remove_comment(db, post_id, comment_ref)
+    return liked
+
+
+async def cleanup(db, post_id):
+    post_ref = db.collection('posts').document(post_id)
+    for collection in ('likes', 'comments'):
+        async for doc in db.collection(collection).where(filter=FieldFilter('post_id', '==', post_id)).stream():
+            await doc.reference.delete()
+    async for shard in post_ref.collection(SHARDS_COLLECTION).stream():
+        await shard.reference.delete()
+    await post_ref.delete()
+
+
+async def run_check(args):
+    await connect_to_firestore()
+    db = get_database()
+
+    print("=" * 60)
+    print("COUNTER CONCURRENCY CHECK")
+    print("=" * 60)
+    if not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        print("[WARNING] FIRESTORE_EMULATOR_HOST is not set, writing to the configured project")
+
+    post = {
+        "user_id": "concurrency-check",
+        "content": "concurrency check",
+        "tags": [],
+        "categories": [],
+        "is_approved": False,
+        LIKES_COUNT: 0,
+        COMMENTS_COUNT: 0,
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow()
+    }
+    if args.shards:
+        post["counter_shards"] = args.shards
+    _, post_ref = await db.collection('posts').add(post)
+    post_id = post_ref.id
+    print(f"Post {post_id}: {args.users} users x {args.toggles} toggles, concurrency {args.concurrency}"
+          f"{f', {args.shards} shards' if args.shards else ''}")
+
+    try:
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def limited(i):
+            async with semaphore:
+                return await user_actions(db, post_id, f"concurrency-user-{i}", args.toggles, i)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(limited(i) for i in range(args.users)))
+        print(f"Done in {time.perf_counter() - start:.1f}s")
+
+        shard_sum_cache.invalidate(post_id)  # read the shards fresh, not the sums cached during the run
+        stored = (await apply_sharded_counts(db, [doc_to_dict(await post_ref.get())]))[0]
+        expected_likes = sum(1 for liked in results if liked)
+        like_docs, comment_docs = await asyncio.gather(*(
+            count(db.collection(collection).where(filter=FieldFilter('post_id', '==', post_id)))
+            for collection in ('likes', 'comments')
+        ))
+
+        checks = [
+            ("likes_count == like documents", stored[LIKES_COUNT], like_docs),
+            ("like documents == expected likes", like_docs, expected_likes),
+            ("comments_count == comment documents", stored[COMMENTS_COUNT], comment_docs),
+        ]
+        ok = True
+        for name, actual, expected in checks:
+            passed = actual == expected
+            ok = ok and passed
+            print(f"[{'OK' if passed else 'FAIL'}] {name}: {actual} vs {expected}")
+    finally:
+        if not args.keep:
+            await cleanup(db, post_id)
+
+    print("=" * 60)
+    print("Counters are exact" if ok else "Counters drifted under concurrency")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that engagement counters are exact under concurrency")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--toggles", type=int, default=5, help="Like toggles per user")
+    parser.add_argument("--concurrency", type=int, default=16, help="Users acting at the same time")
+    parser.add_argument("--shards", type=int, default=0, help="Start the post with N counter shards")
+    parser.add_argument("--keep", action="store_true", help="Keep the test post and its likes/comments")
+    args = parser.parse_args()
+
+    sys.exit(0 if asyncio.run(run_check(args)) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Offline evaluation of the moderation cascade
+Moderates a labelled corpus twice - through the cascade and with toxic-bert only -
+and reports, per exit tier, how often the cascade's block verdict agrees with the
+full model (and with the labels, when present).
+
+Usage:
+    python evaluate_moderation_cascade.py --corpus labelled.jsonl --output cascade_report.json
+    python evaluate_moderation_cascade.py --corpus moderation_eval_corpus.jsonl --lexicon-only
+
+The corpus is a JSONL file with a "text" field and an optional boolean "toxic"
+(or "label": 0/1) per line. Use it to calibrate CASCADE_DISTILLED_SAFE_THRESHOLD /
+CASCADE_DISTILLED_TOXIC_THRESHOLD and the lexicons.
+--lexicon-only loads no models: it reports which texts the lexicon prefilter
+decides on its own and how often those verdicts match the labels (everything
+else would escalate).
+Exits with code 1 if the overall agreement is below --min-agreement.
+"""
+import sys
+import os
+import io
+
+# Fix encoding for Windows console
+if sys.platform == "win32":
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+sys.path.append(os.path.dirname(__file__))
+
+import argparse
+import asyncio
+import contextlib
+import json
+import time
+from collections import defaultdict
+
+from validate_inference_backends import DEFAULT_TEXTS
+
+
+def load_corpus(path):
+    """[(text, label or None)]"""
+    if not path:
+        return [(text, None) for text in DEFAULT_TEXTS]
+    corpus = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            label = record.get("toxic", record.get("label"))
+            corpus.append((record["text"], bool(label) if label is not None else None))
+    return corpus
+
+
+async def moderate(service, text):
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = await service.moderate_text(text)
+        blocked = await service.should_block_content(result)
+    return result, blocked
+
+
+async def evaluate(corpus):
+    from app.services.moderation_service import ContentModerationService
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        service = ContentModerationService()
+    if service.classifier is None:
+        raise RuntimeError("toxic-bert failed to load, nothing to compare against")
+
+    tiers = defaultdict(lambda: {"items": 0, "agree": 0, "label_correct": 0, "labelled": 0, "disagreements": []})
+    cascade_seconds = full_seconds = 0.0
+    for text, label in corpus:
+        service.cascade_enabled = True
+        start = time.perf_counter()
+        cascade_result, cascade_blocked = await moderate(service, text)
+        cascade_seconds += time.perf_counter() - start
+
+        service.cascade_enabled = False
+        start = time.perf_counter()
+        _, full_blocked = await moderate(service, text)
+        full_seconds += time.perf_counter() - start
+
+        tier = tiers[cascade_result["moderation_tier"]]
+        tier["items"] += 1
+        if cascade_blocked == full_blocked:
+            tier["agree"] += 1
+        elif len(tier["disagreements"]) < 20:
+            tier["disagreements"].append({
+                "text": text[:120], "cascade_blocked": cascade_blocked, "full_model_blocked": full_blocked
+            })
+        if label is not None:
+            tier["labelled"] += 1
+            tier["label_correct"] += int(cascade_blocked == label)
+
+    return dict(tiers), cascade_seconds, full_seconds
+
+
+def evaluate_lexicon(corpus):
+    """Lexicon prefilter verdicts against the labels, no models needed"""
+    from app.services.moderation_cascade import ModerationCascade
+
+    cascade = ModerationCascade(spam_check=lambda text: False)
+    tiers = defaultdict(lambda: {"items": 0, "label_correct": 0, "labelled": 0, "disagreements": []})
+    for text, label in corpus:
+        result = cascade._lexicon_tier(text)
+        tier = tiers[result["moderation_tier"] if result else "escalated"]
+        tier["items"] += 1
+        if result is None or label is None:
+            continue
+        tier["labelled"] += 1
+        if result["is_toxic"] == label:
+            tier["label_correct"] += 1
+        elif len(tier["disagreements"]) < 20:
+            tier["disagreements"].append({"text": text[:120], "lexicon_toxic": result["is_toxic"], "label": label})
+    return dict(tiers)
+
+
+def main_lexicon(args, corpus):
+    tiers = evaluate_lexicon(corpus)
+    total = sum(t["items"] for t in tiers.values())
+    decided = sum(t["labelled"] for t in tiers.values())
+    correct = sum(t["label_correct"] for t in tiers.values())
+    agreement = correct / decided if decided else 1.0
+
+    print("\n" + "=" * 60)
+    print("LEXICON PREFILTER AGAINST LABELS")
+    print("=" * 60)
+    for name, tier in sorted(tiers.items(), key=lambda item: -item[1]["items"]):
+        tier["share"] = tier["items"] / total if total else 0.0
+        tier["label_accuracy"] = tier["label_correct"] / tier["labelled"] if tier["labelled"] else None
+        accuracy_text = f"{tier['label_accuracy']:.3f}" if tier["label_accuracy"] is not None else "n/a"
+        print(f"{name:<16} items: {tier['items']:<6} share: {tier['share']:.2%}  label accuracy: {accuracy_text}")
+        for item in tier["disagreements"]:
+            print(f"    disagrees: {item['text']!r} (label toxic={item['label']})")
+
+    print(f"\nLexicon exits agreeing with labels: {correct}/{decided} = {agreement:.4f} (min {args.min_agreement})")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "items": total,
+            "lexicon_exits": decided,
+            "label_agreement": agreement,
+            "min_agreement": args.min_agreement,
+            "tiers": tiers,
+        }, f, indent=2)
+    print(f"\nReport written to {args.output}")
+
+    sys.exit(0 if agreement >= args.min_agreement else 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare cascade verdicts with full-model-only moderation")
+    parser.add_argument("--corpus", help="Labelled JSONL corpus (text, toxic)")
+    parser.add_argument("--min-agreement", type=float, default=0.99,
+                        help="Minimum fraction of items where cascade and full model agree")
+    parser.add_argument("--output", default="cascade_evaluation.json")
+    parser.add_argument("--lexicon-only", action="store_true",
+                        help="Check only the lexicon prefilter against the labels (no models)")
+    args = parser.parse_args()
+
+    if args.lexicon_only:
+        corpus = load_corpus(args.corpus)
+        print(f"Corpus: {len(corpus)} texts")
+        main_lexicon(args, corpus)
+
+    print("=" * 60)
+    print("EVALUATING MODERATION CASCADE AGAINST FULL MODEL")
+    print("=" * 60)
+
+    corpus = load_corpus(args.corpus)
+    print(f"Corpus: {len(corpus)} texts")
+    tiers, cascade_seconds, full_seconds = asyncio.run(evaluate(corpus))
+
+    total = sum(t["items"] for t in tiers.values())
+    agree = sum(t["agree"] for t in tiers.values())
+    agreement = agree / total if total else 1.0
+    escalated = tiers.get("full_model", {}).get("items", 0)
+
+    print("\n" + "=" * 60)
+    print("RESULTS PER EXIT TIER")
+    print("=" * 60)
+    for name, tier in sorted(tiers.items(), key=lambda item: -item[1]["items"]):
+        tier["share"] = tier["items"] / total if total else 0.0
+        tier["agreement_rate"] = tier["agree"] / tier["items"] if tier["items"] else 1.0
+        tier["label_accuracy"] = tier["label_correct"] / tier["labelled"] if tier["labelled"] else None
+        accuracy_text = f"{tier['label_accuracy']:.3f}" if tier["label_accuracy"] is not None else "n/a"
+        print(f"{name:<16} items: {tier['items']:<6} share: {tier['share']:.2%}  "
+              f"agreement: {tier['agreement_rate']:.3f}  label accuracy: {accuracy_text}")
+
+    print(f"\nOverall agreement with full model: {agreement:.4f} (min {args.min_agreement})")
+    print(f"Escalated to full model: {escalated}/{total}")
+    print(f"Time - cascade: {cascade_seconds:.2f}s, full model only: {full_seconds:.2f}s")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "items": total,
+            "agreement_rate": agreement,
+            "min_agreement": args.min_agreement,
+            "escalation_rate": escalated / total if total else 0.0,
+            "cascade_seconds": cascade_seconds,
+            "full_model_seconds": full_seconds,
+            "tiers": tiers,
+        }, f, indent=2)
+    print(f"\nReport written to {args.output}")
+
+    sys.exit(0 if agreement >= args.min_agreement else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+API load test
+Sends read requests to a running backend at increasing concurrency levels and
+reports requests/sec and p50/p95/p99 latency per level. With non-blocking
+Firestore calls throughput should grow with concurrency until Firestore or the
+CPU saturates; with blocking calls it stays flat at one request at a time.
+
+Usage:
+    python load_test.py --base-url http://localhost:8000 --concurrency 1 4 16 64
+    python load_test.py --token <JWT> --paths /api/posts/?page_size=20 /api/posts/feed
+
+Without --token a throwaway user is registered (or logged in) for the run.
+"""
+import sys
+import io
+
+# Fix encoding for Windows console
+if sys.platform == "win32":
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+import numpy as np
+
+DEFAULT_PATHS = ["/api/posts/?page_size=20", "/api/auth/me"]
+
+
+async def get_token(client, username, password):
+    """Register the load test user if needed, then log in"""
+    await client.post("/api/auth/register", json={
+        "username": username,
+        "email": f"{username}@example.com",
+        "password": password,
+        "full_name": "Load Test"
+    })
+    response = await client.post("/api/auth/login", json={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run_level(client, paths, concurrency, duration):
+    """Keep `concurrency` requests in flight for `duration` seconds"""
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(offset):
+        nonlocal errors
+        i = offset
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                response = await client.get(path)
+                if response.status_code >= 400:
+                    errors += 1
+                    continue
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    wall = time.perf_counter() - start
+
+    latencies_ms = np.asarray(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_sec": len(latencies) / wall if wall else None,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+    }
+
+
+async def main_async(args):
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        token = args.token or await get_token(client, args.username, args.password)
+        client.headers["Authorization"] = f"Bearer {token}"
+
+        # Warm up connections and caches
+        await run_level(client, args.paths, 1, args.warmup)
+
+        results = []
+        for concurrency in args.concurrency:
+            result = await run_level(client, args.paths, concurrency, args.duration)
+            results.append(result)
+            print(f"   concurrency {concurrency:<4} {result['requests_per_sec']:8.1f} req/s  "
+                  f"p50 {result['p50_ms']:8.1f} ms  p95 {result['p95_ms']:8.1f} ms  "
+                  f"p99 {result['p99_ms']:8.1f} ms  errors {result['errors']}")
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API throughput at increasing concurrency")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--paths", nargs="+", default=DEFAULT_PATHS, help="GET paths, requested round-robin")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16, 64])
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per concurrency level")
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--token", help="Bearer token (default: register/login --username)")
+    parser.add_argument("--username", default="loadtest_user")
+    parser.add_argument("--password", default="loadtest-password")
+    parser.add_argument("--output", default="load_test.json")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"LOAD TEST {args.base_url} ({', '.join(args.paths)})")
+    print("=" * 60)
+
+    results = asyncio.run(main_async(args))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"base_url": args.base_url, "paths": args.paths, "results": results}, f, indent=2)
+
+    if len(results) > 1 and results[0]["requests_per_sec"]:
+        scaling = results[-1]["requests_per_sec"] / results[0]["requests_per_sec"]
+        print(f"\nThroughput x{scaling:.1f} from concurrency {results[0]['concurrency']} "
+              f"to {results[-1]['concurrency']}")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
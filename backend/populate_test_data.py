@@ -16,6 +16,8 @@ import random
 import firebase_admin
 from firebase_admin import credentials, firestore
 from app.utils.security import get_password_hash
+from app.utils.firestore_helpers import like_id
+from app.services.author_snapshots import AUTHOR_FIELD, author_snapshot
 
 # Sample test data
 USERS = [
@@ -237,6 +239,7 @@ def create_users(db):
             print(f"   → User already exists: {user_data['username']}")
             user_doc = existing[0]
             user_id = user_doc.id
+            avatar_url = user_doc.to_dict().get("avatar_url")
         else:
             # Create new user
             user_dict = {
@@ -251,11 +254,13 @@ def create_users(db):
 
             timestamp, doc_ref = users_ref.add(user_dict)
             user_id = doc_ref.id
+            avatar_url = None
             print(f"   ✓ Created user: {user_data['username']} (ID: {user_id})")
 
         created_users.append({
             "id": user_id,
-            "username": user_data["username"]
+            "username": user_data["username"],
+            "avatar_url": avatar_url
         })
 
     return created_users
@@ -275,6 +280,7 @@ def create_posts(db, users):
 
         post_dict = {
             "user_id": user["id"],
+            AUTHOR_FIELD: author_snapshot(user),
             "content": post_data["content"],
             "image_url": None,
             "tags": post_data["tags"],
@@ -320,6 +326,7 @@ def add_likes(db, posts, users):
         # Randomly select users to like this post
         liking_users = random.sample(users, min(num_likes, len(users)))
 
+        post_likes = 0
         for user in liking_users:
             # Don't let user like their own post
             if user["id"] == post["user_id"]:
@@ -331,12 +338,15 @@ def add_likes(db, posts, users):
                 "created_at": datetime.utcnow()
             }
 
-            likes_ref.add(like_dict)
-            like_count += 1
+            # Same deterministic id as the API (one like per post and user)
+            likes_ref.document(like_id(post["id"], user["id"])).set(like_dict)
+            post_likes += 1
+
+        like_count += post_likes
 
         # Update post likes_count
-        if num_likes > 0:
-            posts_ref.document(post["id"]).update({"likes_count": num_likes})
+        if post_likes > 0:
+            posts_ref.document(post["id"]).update({"likes_count": post_likes})
 
     print(f"   ✓ Added {like_count} likes")
 
@@ -371,6 +381,7 @@ def add_comments(db, posts, users):
             comment_dict = {
                 "post_id": post["id"],
                 "user_id": user["id"],
+                AUTHOR_FIELD: author_snapshot(user),
                 "content": random.choice(sample_comments),
                 "created_at": datetime.utcnow(),
                 "updated_at": datetime.utcnow()
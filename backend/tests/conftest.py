@@ -0,0 +1,22 @@
+import pytest
+
+
+class FakeClock:
+    """Stands in for the time module of the code under test (monotonic and wall clock)"""
+
+    def __init__(self, start: float = 1000.0):
+        self.now = start
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from app.services.background_jobs import STATUS_DEAD, STATUS_DONE, BackgroundJobWorker, new_job
+from app.storage.sqlite import AsyncSqliteClient, SqliteClient
+
+JOBS = "test_jobs"
+
+
+class RecordingWorker(BackgroundJobWorker):
+    jobs_collection = JOBS
+    name = "test"
+
+    def __init__(self, owner: str, fail: bool = False, duration: float = 0.0):
+        super().__init__(workers=2, max_attempts=3, retry_base_seconds=0.0)
+        self.owner = owner
+        self.fail = fail
+        self.duration = duration
+        self.executed = []
+
+    async def _execute(self, job_id: str, job_ref):
+        self.executed.append(job_id)
+        await asyncio.sleep(self.duration)
+        if self.fail:
+            raise RuntimeError("boom")
+
+
+@pytest.fixture
+def db():
+    return AsyncSqliteClient(SqliteClient(":memory:"))
+
+
+async def _record(db, *job_ids):
+    for job_id in job_ids:
+        await db.collection(JOBS).document(job_id).set(new_job(item=job_id))
+
+
+async def _drain(*workers):
+    for worker in workers:
+        await worker._queue.join()
+
+
+def _job(db, job_id):
+    return asyncio.run(db.collection(JOBS).document(job_id).get()).to_dict()
+
+
+def test_each_job_runs_in_one_process(db):
+    first, second = RecordingWorker("a", duration=0.01), RecordingWorker("b", duration=0.01)
+
+    async def scenario():
+        await _record(db, "j1", "j2", "j3")
+        await first.start(db)
+        await second.start(db)
+        await _drain(first, second)
+        await first.stop()
+        await second.stop()
+
+    asyncio.run(scenario())
+    assert sorted(first.executed + second.executed) == ["j1", "j2", "j3"]
+    assert _job(db, "j1")["status"] == STATUS_DONE
+    assert _job(db, "j1")["attempts"] == 1
+
+
+def test_failing_job_is_dead_after_max_attempts_and_not_resumed(db):
+    worker = RecordingWorker("a", fail=True)
+
+    async def scenario():
+        await _record(db, "j1")
+        await worker.start(db)
+        await _drain(worker)
+        await worker.stop()
+        await worker.start(db)
+        await _drain(worker)
+        await worker.stop()
+
+    asyncio.run(scenario())
+    assert worker.executed == ["j1"] * 3
+    job = _job(db, "j1")
+    assert job["status"] == STATUS_DEAD
+    assert job["attempts"] == 3
+    assert worker.counts["dead"] == 1
+
+
+def test_expired_lease_is_taken_over(db):
+    crashed, survivor = RecordingWorker("a"), RecordingWorker("b")
+
+    async def scenario():
+        await _record(db, "j1")
+        job_ref = db.collection(JOBS).document("j1")
+        await job_ref.update({"status": "running", "owner": crashed.owner, "lease_expires": 1.0, "attempts": 1})
+        await survivor.start(db)
+        await _drain(survivor)
+        await survivor.stop()
+
+    asyncio.run(scenario())
+    assert survivor.executed == ["j1"]
+    assert _job(db, "j1")["attempts"] == 2
+
+
+def test_live_lease_is_skipped(db):
+    worker = RecordingWorker("b")
+
+    async def scenario():
+        await _record(db, "j1")
+        job_ref = db.collection(JOBS).document("j1")
+        await job_ref.update({"status": "running", "owner": "a", "lease_expires": 1e12, "attempts": 1})
+        await worker.start(db)
+        await _drain(worker)
+        await worker.stop()
+
+    asyncio.run(scenario())
+    assert worker.executed == []
+    assert worker.counts["skipped"] == 1
@@ -0,0 +1,91 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app.config import settings
+from app.routes.likes import toggle_post_like
+from app.services.counters import LIKES_COUNT, apply_sharded_counts, shard_sum_cache
+from app.storage.sqlite import AsyncSqliteClient, SqliteClient
+from app.utils.firestore_helpers import doc_to_dict
+
+USERS = 12
+TOGGLES = 3  # odd: every user ends up liking the post
+
+
+@pytest.fixture
+def db():
+    return AsyncSqliteClient(SqliteClient(":memory:"))
+
+
+async def _create_post(db, shards: int) -> str:
+    post = {
+        "user_id": "author", "content": "hello", "is_approved": True, "likes_count": 0, "comments_count": 0,
+        "created_at": datetime.utcnow(), "updated_at": datetime.utcnow()
+    }
+    if shards:
+        post["counter_shards"] = shards
+    await db.collection("posts").document("p1").set(post)
+    return "p1"
+
+
+async def _toggle_concurrently(db, post_id: str, users: int, toggles: int, same_user_at_once: bool = False):
+    async def user_toggles(user_id: str):
+        if same_user_at_once:
+            # Repeated clicks: the toggles of one user race on the same like document
+            await asyncio.gather(*(toggle_post_like(db, post_id, user_id) for _ in range(toggles)))
+        else:
+            for _ in range(toggles):
+                await toggle_post_like(db, post_id, user_id)
+
+    await asyncio.gather(*(user_toggles(f"u{n}") for n in range(users)))
+
+
+async def _stored_counts(db, post_id: str):
+    shard_sum_cache.invalidate(post_id)
+    post = doc_to_dict(await db.collection("posts").document(post_id).get())
+    (post,) = await apply_sharded_counts(db, [post])
+    likes = await db.collection("likes").where("post_id", "==", post_id).get()
+    return post[LIKES_COUNT], len(likes)
+
+
+@pytest.mark.parametrize("shards", [0, 4])
+def test_concurrent_toggles_keep_the_count_exact(db, shards):
+    async def scenario():
+        post_id = await _create_post(db, shards)
+        await _toggle_concurrently(db, post_id, USERS, TOGGLES)
+        return await _stored_counts(db, post_id)
+
+    assert asyncio.run(scenario()) == (USERS, USERS)
+
+
+def test_count_stays_exact_when_the_post_switches_to_shards(db, monkeypatch):
+    monkeypatch.setattr(settings, "counter_shards", 4)
+    monkeypatch.setattr(settings, "counter_hot_threshold", 3)
+
+    async def scenario():
+        post_id = await _create_post(db, 0)
+        await _toggle_concurrently(db, post_id, USERS, TOGGLES)
+        sharded = (await db.collection("posts").document(post_id).get()).to_dict().get("counter_shards")
+        return sharded, await _stored_counts(db, post_id)
+
+    assert asyncio.run(scenario()) == (4, (USERS, USERS))
+
+
+def test_double_toggle_leaves_no_like(db):
+    async def scenario():
+        post_id = await _create_post(db, 4)
+        await _toggle_concurrently(db, post_id, USERS, 2)
+        return await _stored_counts(db, post_id)
+
+    assert asyncio.run(scenario()) == (0, 0)
+
+
+@pytest.mark.parametrize("shards", [0, 4])
+def test_racing_toggles_of_one_user_are_serialized(db, shards):
+    async def scenario():
+        post_id = await _create_post(db, shards)
+        await _toggle_concurrently(db, post_id, USERS, TOGGLES, same_user_at_once=True)
+        return await _stored_counts(db, post_id)
+
+    assert asyncio.run(scenario()) == (USERS, USERS)
@@ -0,0 +1,24 @@
+import asyncio
+from datetime import datetime
+
+from app.config import settings
+from app.services.hydration import hydrate_posts
+from app.storage.sqlite import AsyncSqliteClient, SqliteClient
+
+
+def test_current_user_is_fetched_not_taken_from_claims(monkeypatch):
+    monkeypatch.setattr(settings, "user_cache_enabled", False)
+    db = AsyncSqliteClient(SqliteClient(":memory:"))
+    # Token claims issued before the user was renamed
+    claims = {"id": "u1", "username": "old_name", "preferences_version": 0, "token_version": 0}
+    post = {
+        "id": "p1", "user_id": "u1", "content": "hello", "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow()
+    }
+
+    async def scenario():
+        await db.collection("users").document("u1").set({"username": "new_name"})
+        return await hydrate_posts(db, [post], claims)
+
+    (response,) = asyncio.run(scenario())
+    assert response.username == "new_name"
@@ -0,0 +1,72 @@
+import pytest
+
+from app.config import settings
+from app.services import model_registry as registry_module
+from app.services.model_registry import STATUS_FAILED, STATUS_READY, ModelRegistry
+
+
+class SyncThread:
+    """Runs the warm-up target inline so the tests see its effect at once"""
+
+    def __init__(self, target, **kwargs):
+        self.target = target
+
+    def start(self):
+        self.target()
+
+
+class FlakyFactory:
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("weights missing")
+        return object()
+
+
+@pytest.fixture
+def registry(clock, monkeypatch):
+    monkeypatch.setattr(registry_module, "time", clock)
+    monkeypatch.setattr(registry_module.threading, "Thread", SyncThread)
+    monkeypatch.setattr(settings, "model_load_retry_base_seconds", 30.0)
+    monkeypatch.setattr(settings, "model_load_retry_max_seconds", 100.0)
+    return ModelRegistry()
+
+
+def test_failed_load_is_not_rescheduled_during_backoff(registry, clock):
+    factory = FlakyFactory(failures=1)
+    registry.register("model", factory)
+
+    assert not registry.ensure_loading("model")
+    assert factory.calls == 1
+    assert registry.status()["model"]["status"] == STATUS_FAILED
+
+    for _ in range(100):
+        assert not registry.ensure_loading("model")
+    assert factory.calls == 1
+    with pytest.raises(RuntimeError):
+        registry.get("model")
+    assert factory.calls == 1
+
+    clock.advance(30)
+    registry.ensure_loading("model")
+    assert factory.calls == 2
+    assert registry.ensure_loading("model")
+    assert registry.status()["model"] == {"status": STATUS_READY, "error": None, "retry_in_seconds": None}
+
+
+def test_backoff_doubles_up_to_the_max(registry, clock):
+    factory = FlakyFactory(failures=10)
+    registry.register("model", factory)
+
+    delays = []
+    for _ in range(4):
+        registry.ensure_loading("model")
+        delay = registry.status()["model"]["retry_in_seconds"]
+        delays.append(delay)
+        clock.advance(delay)
+    assert delays == [30, 60, 100, 100]
+    assert factory.calls == 4
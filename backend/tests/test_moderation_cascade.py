@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+from evaluate_moderation_cascade import evaluate_lexicon, load_corpus
+from app.services.moderation_cascade import TIER_LEXICON_SAFE, TIER_LEXICON_TOXIC, ModerationCascade
+
+CORPUS = os.path.join(os.path.dirname(os.path.dirname(__file__)), "moderation_eval_corpus.jsonl")
+
+
+@pytest.fixture
+def cascade():
+    return ModerationCascade(spam_check=lambda text: False)
+
+
+@pytest.mark.parametrize("text", [
+    "holy shit this is great",
+    "this bitch of a bug",
+    "what a bastard of a week",
+    "you are a fucking genius",
+])
+def test_profanity_escalates(cascade, text):
+    assert cascade._lexicon_tier(text) is None
+
+
+@pytest.mark.parametrize("text", [
+    "kill yourself",
+    "kys loser",
+    "you stupid bitch",
+    "you're an asshole",
+])
+def test_targeted_abuse_is_toxic(cascade, text):
+    result = cascade._lexicon_tier(text)
+    assert result["moderation_tier"] == TIER_LEXICON_TOXIC
+    assert result["is_toxic"]
+
+
+def test_short_benign_text_is_safe(cascade):
+    result = cascade._lexicon_tier("thank you so much")
+    assert result["moderation_tier"] == TIER_LEXICON_SAFE
+    assert not result["is_toxic"]
+
+
+def test_lexicon_exits_agree_with_labelled_corpus():
+    tiers = evaluate_lexicon(load_corpus(CORPUS))
+    decided = sum(tier["labelled"] for tier in tiers.values())
+    assert decided > 0
+    assert all(tier["label_correct"] == tier["labelled"] for tier in tiers.values())
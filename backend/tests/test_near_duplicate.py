@@ -0,0 +1,84 @@
+import pytest
+
+from app.services import near_duplicate
+from app.services.near_duplicate import NearDuplicateIndex, duplicate_moderation_result, shingles
+
+SPAM = "buy cheap followers now at our amazing store best prices guaranteed today only"
+SPAM_VARIANT = "buy cheap followers now at our amazing store best prices guaranteed today only!!! wow"
+UNRELATED = "went hiking in the mountains this weekend and the sunset over the lake was beautiful"
+
+
+@pytest.fixture
+def index(clock, monkeypatch):
+    monkeypatch.setattr(near_duplicate, "time", clock)
+    return NearDuplicateIndex(
+        num_perm=128,
+        bands=32,
+        threshold=0.7,
+        window_seconds=600,
+        max_entries=100,
+        min_words=5,
+        burst_min_users=3
+    )
+
+
+def test_shingles():
+    assert shingles(["a", "b", "c", "d"]) == {"a b c", "b c d"}
+    assert shingles(["too", "short"]) == {"too short"}
+
+
+def test_num_perm_must_be_a_multiple_of_bands():
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(num_perm=100, bands=32, threshold=0.7, window_seconds=60,
+                           max_entries=10, min_words=5, burst_min_users=3)
+
+
+def test_short_text_is_not_indexed(index):
+    assert index.signature("great post!") is None
+    assert index.check("great post!").matches == []
+
+
+def test_finds_near_duplicates_only(index):
+    index.add("p1", "post", "u1", SPAM)
+    index.add("p2", "post", "u2", UNRELATED)
+
+    check = index.check(SPAM_VARIANT, "u3")
+    assert [entry.entry_id for entry, _ in check.matches] == ["p1"]
+    assert check.matches[0][1] >= 0.7
+    assert check.blocked_match is None
+
+
+def test_blocked_original_blocks_near_duplicates(index):
+    index.add("p1", "post", "u1", SPAM, blocked=True, flags={"is_spam": True})
+    check = index.check(SPAM_VARIANT, "u2")
+    assert check.blocked_match is not None
+    assert check.blocked_match[0].entry_id == "p1"
+
+    result = duplicate_moderation_result(check.blocked_match)
+    assert result["is_spam"] is True
+    assert result["is_toxic"] is False
+
+
+def test_burst_counts_distinct_accounts(index):
+    index.add("p1", "post", "u1", SPAM)
+    index.add("p2", "post", "u1", SPAM_VARIANT)
+    assert not index.check(SPAM, "u1").burst
+
+    index.add("p3", "post", "u2", SPAM)
+    check = index.check(SPAM, "u3")
+    assert check.burst
+    assert check.distinct_users == 3
+
+
+def test_entries_expire_after_the_window(index, clock):
+    index.add("p1", "post", "u1", SPAM)
+    clock.advance(601)
+    assert index.check(SPAM_VARIANT).matches == []
+    assert index.snapshot()["entries"] == 0
+
+
+def test_re_adding_an_entry_replaces_it(index):
+    index.add("p1", "post", "u1", SPAM)
+    index.add("p1", "post", "u1", UNRELATED)
+    assert index.check(SPAM_VARIANT).matches == []
+    assert [entry.entry_id for entry, _ in index.check(UNRELATED).matches] == ["p1"]
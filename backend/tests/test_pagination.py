@@ -0,0 +1,41 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.utils.pagination import InvalidCursorError, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trips_datetimes():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    token = encode_cursor({"id": "post123", "created_at": created_at})
+    assert decode_cursor(token) == (created_at, "post123")
+
+
+def test_cursor_keeps_timezones():
+    created_at = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+    value, _ = decode_cursor(encode_cursor({"id": "p", "created_at": created_at}))
+    assert value == created_at
+    assert value.tzinfo is not None
+
+
+def test_cursor_round_trips_other_fields():
+    token = encode_cursor({"id": "post123", "likes_count": 42}, field="likes_count")
+    assert decode_cursor(token) == (42, "post123")
+
+
+def test_cursor_is_url_safe():
+    token = encode_cursor({"id": "a/b+c?d", "created_at": datetime(2024, 1, 1)})
+    assert "=" not in token
+    assert all(char.isalnum() or char in "-_" for char in token)
+
+
+@pytest.mark.parametrize("token", [
+    "",
+    "not a cursor",
+    "e30",  # {}
+    "WzEsMl0",  # [1, 2]
+    "eyJ2IjoiMjAyNC0xMy0wMSIsImlkIjoieCIsInQiOiJkdCJ9",  # invalid date
+])
+def test_invalid_cursors_raise(token):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(token)
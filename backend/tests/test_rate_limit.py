@@ -0,0 +1,107 @@
+import pytest
+
+from app.utils import rate_limit
+from app.utils.rate_limit import RateLimiter, parse_limit
+
+
+@pytest.fixture
+def limiter(clock, monkeypatch):
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return RateLimiter(max_keys=100)
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("10/minute", (10.0, 10 / 60)),
+    ("5/second", (5.0, 5.0)),
+    ("100/hour", (100.0, 100 / 3600)),
+    ("2/day", (2.0, 2 / 86400)),
+    ("30/Minutes", (30.0, 0.5)),
+    ("1 / minute", (1.0, 1 / 60)),
+])
+def test_parse_limit(spec, expected):
+    assert parse_limit(spec) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("spec", ["10", "10/fortnight", "ten/minute", ""])
+def test_parse_limit_rejects_invalid_specs(spec):
+    with pytest.raises(ValueError):
+        parse_limit(spec)
+
+
+def test_hit_allows_burst_up_to_capacity(limiter):
+    assert [limiter.hit("user:a", 3, 1.0) for _ in range(3)] == [0, 0, 0]
+    assert limiter.hit("user:a", 3, 1.0) > 0
+
+
+def test_hit_returns_seconds_until_next_token(limiter, clock):
+    capacity, rate = parse_limit("2/minute")
+    limiter.hit("user:a", capacity, rate)
+    limiter.hit("user:a", capacity, rate)
+    assert limiter.hit("user:a", capacity, rate) == pytest.approx(30.0)
+
+    clock.advance(10)
+    assert limiter.hit("user:a", capacity, rate) == pytest.approx(20.0)
+
+
+def test_hit_refills_continuously(limiter, clock):
+    for _ in range(2):
+        limiter.hit("user:a", 2, 1.0)
+    assert limiter.hit("user:a", 2, 1.0) > 0
+
+    clock.advance(1.0)
+    assert limiter.hit("user:a", 2, 1.0) == 0
+    assert limiter.hit("user:a", 2, 1.0) > 0
+
+    # Refill never exceeds the capacity
+    clock.advance(60)
+    assert [limiter.hit("user:a", 2, 1.0) for _ in range(2)] == [0, 0]
+    assert limiter.hit("user:a", 2, 1.0) > 0
+
+
+def test_keys_are_independent(limiter):
+    limiter.hit("user:a", 1, 1.0)
+    assert limiter.hit("user:a", 1, 1.0) > 0
+    assert limiter.hit("user:b", 1, 1.0) == 0
+
+
+def test_full_buckets_are_evicted(limiter, clock):
+    limiter.hit("user:a", 5, 1.0)
+    assert limiter.snapshot()["active_keys"] == 1
+
+    # One token used, full again after 1 / rate seconds
+    clock.advance(1.0)
+    assert limiter.snapshot()["active_keys"] == 0
+
+
+def test_long_lived_buckets_do_not_block_expiry(limiter, clock):
+    # A slow bucket (5/hour) created first must not keep fast buckets behind it alive
+    limiter.hit("ip:register:a", 5, 5 / 3600)
+    for key in ("b", "c", "d"):
+        limiter.hit(key, 5, 1.0)
+    clock.advance(1.0)
+    assert limiter.snapshot()["active_keys"] == 1
+
+
+def test_used_bucket_is_rescheduled(limiter, clock):
+    limiter.hit("user:a", 5, 1.0)
+    clock.advance(0.9)
+    limiter.hit("user:a", 5, 1.0)
+    # The first expiry has passed, but the bucket was used again since
+    clock.advance(0.2)
+    assert limiter.snapshot()["active_keys"] == 1
+    clock.advance(2.0)
+    assert limiter.snapshot()["active_keys"] == 0
+
+
+def test_throttled_buckets_are_kept_beyond_max_keys(clock, monkeypatch):
+    monkeypatch.setattr(rate_limit, "time", clock)
+    limiter = RateLimiter(max_keys=2)
+    assert limiter.hit("user:victim", 1, 1 / 3600) == 0
+    for key in ("a", "b", "c"):
+        limiter.hit(key, 1, 1 / 3600)
+
+    snapshot = limiter.snapshot()
+    assert snapshot["active_keys"] == 4
+    assert snapshot["over_capacity"] > 0
+    # Cycling keys did not reset the first bucket's limit
+    assert limiter.hit("user:victim", 1, 1 / 3600) > 0
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+
+import pytest
+from google.api_core.exceptions import Aborted
+
+from app.storage.sqlite import MAX_TRANSACTION_ATTEMPTS, AsyncSqliteClient, SqliteClient
+
+
+@pytest.fixture
+def db():
+    return AsyncSqliteClient(SqliteClient(":memory:"))
+
+
+async def _add_one(transaction, ref):
+    snapshot = await ref.get(transaction=transaction)
+    value = (snapshot.to_dict() or {}).get("value", 0)
+    # Let the other transactions read the same value before this one commits
+    await asyncio.sleep(0)
+    transaction.set(ref, {"value": value + 1})
+
+
+def test_concurrent_read_modify_write_transactions_are_not_lost(db):
+    ref = db.collection("counters").document("c")
+
+    async def scenario():
+        await asyncio.gather(*(db.run_transaction(_add_one, ref) for _ in range(MAX_TRANSACTION_ATTEMPTS)))
+        return (await ref.get()).to_dict()["value"]
+
+    assert asyncio.run(scenario()) == MAX_TRANSACTION_ATTEMPTS
+
+
+def test_transaction_gives_up_on_persistent_contention(db):
+    ref = db.collection("counters").document("c")
+    other = db.collection("counters").document("written")
+
+    async def always_contended(transaction):
+        snapshot = await ref.get(transaction=transaction)
+        # Another request changes the document between the read and the commit
+        await ref.set({"value": (snapshot.to_dict() or {}).get("value", 0) + 1})
+        transaction.set(other, {"value": 1})
+
+    async def scenario():
+        with pytest.raises(Aborted):
+            await db.run_transaction(always_contended)
+        return (await other.get()).exists
+
+    assert asyncio.run(scenario()) is False
+
+
+def test_calls_waiting_on_the_database_do_not_block_the_event_loop(db):
+    ref = db.collection("counters").document("c")
+    held, release = threading.Event(), threading.Event()
+
+    def hold_lock():
+        # Stands in for a write of another process holding the database lock
+        with db._sync._lock:
+            held.set()
+            release.wait(5)
+
+    async def scenario():
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        held.wait(5)
+        read = asyncio.create_task(ref.get())
+        await asyncio.sleep(0.05)
+        blocked = not read.done()
+        release.set()
+        await read
+        holder.join()
+        return blocked
+
+    assert asyncio.run(scenario())
@@ -0,0 +1,148 @@
+"""
+Tiny random-weight stand-ins for the moderation models
+Built from transformers configs in memory - nothing is downloaded - so the
+benchmark and load-test harnesses can run on machines without the real
+checkpoints. Outputs are meaningless, only the shapes and code paths match:
+- text:     2-layer BERT with the six toxic-bert labels (multi-label)
+- nsfw:     2-layer ViT with "normal" / "nsfw" labels
+- clip:     2-layer CLIP text and vision towers
+
+Usage:
+    from tiny_models import use_tiny_models
+    with use_tiny_models():
+        service = ContentModerationService()
+"""
+import contextlib
+import os
+import tempfile
+
+TOXIC_LABELS = ['toxic', 'severe_toxic', 'obscene', 'threat', 'insult', 'identity_hate']
+
+# Small shared vocabulary: special tokens, single characters and a few words
+_VOCAB = (
+    ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] +
+    list("abcdefghijklmnopqrstuvwxyz0123456789.,!?'#$-") +
+    ["##" + c for c in "abcdefghijklmnopqrstuvwxyz0123456789"] +
+    ["the", "a", "and", "you", "is", "this", "post", "great", "photo", "content", "safe", "normal",
+     "violence", "weapons", "war", "military", "combat", "gore", "blood", "graphic", "injury",
+     "death", "scary", "horror", "disturbing", "frightening", "ghost"]
+)
+
+_HIDDEN = dict(hidden_size=32, num_hidden_layers=2, num_attention_heads=2, intermediate_size=37)
+
+
+def tiny_tokenizer(model_input_names=None):
+    """WordPiece tokenizer over the small built-in vocabulary"""
+    from transformers import BertTokenizer
+
+    vocab_dir = tempfile.mkdtemp(prefix="tiny-vocab-")
+    vocab_file = os.path.join(vocab_dir, "vocab.txt")
+    with open(vocab_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(_VOCAB))
+    kwargs = {"model_input_names": model_input_names} if model_input_names else {}
+    return BertTokenizer(vocab_file, do_lower_case=True, model_max_length=128, **kwargs)
+
+
+def tiny_text_classification_pipeline(model_name=None, backend=None):
+    """Random-weight toxic-bert stand-in (same call signature as the real loaders)"""
+    from transformers import pipeline, BertConfig, BertForSequenceClassification
+
+    config = BertConfig(
+        vocab_size=len(_VOCAB),
+        max_position_embeddings=128,
+        num_labels=len(TOXIC_LABELS),
+        id2label=dict(enumerate(TOXIC_LABELS)),
+        label2id={label: i for i, label in enumerate(TOXIC_LABELS)},
+        problem_type="multi_label_classification",
+        **_HIDDEN
+    )
+    model = BertForSequenceClassification(config).eval()
+    return pipeline("text-classification", model=model, tokenizer=tiny_tokenizer(), top_k=None, device=-1)
+
+
+def _tiny_image_processor():
+    from transformers import ViTImageProcessor
+    return ViTImageProcessor(size={"height": 32, "width": 32})
+
+
+def tiny_image_classification_pipeline(model_name=None, backend=None):
+    """Random-weight NSFW ViT stand-in"""
+    from transformers import pipeline, ViTConfig, ViTForImageClassification
+
+    labels = ["normal", "nsfw"]
+    config = ViTConfig(
+        image_size=32,
+        patch_size=8,
+        num_labels=len(labels),
+        id2label=dict(enumerate(labels)),
+        label2id={label: i for i, label in enumerate(labels)},
+        **_HIDDEN
+    )
+    model = ViTForImageClassification(config).eval()
+    return pipeline("image-classification", model=model, image_processor=_tiny_image_processor(), device=-1)
+
+
+def tiny_zero_shot_image_pipeline(model_name=None, backend=None):
+    """Random-weight CLIP stand-in"""
+    from transformers import pipeline, CLIPConfig, CLIPModel
+
+    config = CLIPConfig(
+        text_config=dict(vocab_size=len(_VOCAB), max_position_embeddings=77, **_HIDDEN),
+        vision_config=dict(image_size=32, patch_size=8, **_HIDDEN),
+        projection_dim=16
+    )
+    model = CLIPModel(config).eval()
+    # CLIP takes no token_type_ids
+    tokenizer = tiny_tokenizer(model_input_names=["input_ids", "attention_mask"])
+    return pipeline(
+        "zero-shot-image-classification",
+        model=model,
+        tokenizer=tokenizer,
+        image_processor=_tiny_image_processor(),
+        device=-1
+    )
+
+
+class TinySentenceEncoder:
+    """SentenceTransformer stand-in: deterministic pseudo-random unit vectors"""
+
+    dimension = 384
+
+    def encode(self, sentences, **kwargs):
+        import hashlib
+        import numpy as np
+
+        single = isinstance(sentences, str)
+        rows = []
+        for sentence in ([sentences] if single else sentences):
+            seed = int.from_bytes(hashlib.sha256(sentence.encode("utf-8")).digest()[:4], "little")
+            vector = np.random.default_rng(seed).standard_normal(self.dimension).astype(np.float32)
+            rows.append(vector / np.linalg.norm(vector))
+        embeddings = np.stack(rows)
+        return embeddings[0] if single else embeddings
+
+
+def tiny_sentence_transformer(model_name=None, backend=None):
+    return TinySentenceEncoder()
+
+
+@contextlib.contextmanager
+def use_tiny_models():
+    """Make the AI services build tiny models instead of loading checkpoints"""
+    from app.services import moderation_service, recommendation_service
+
+    patches = [
+        (moderation_service, "load_text_classification_pipeline", tiny_text_classification_pipeline),
+        (moderation_service, "load_distilled_text_classification_pipeline", tiny_text_classification_pipeline),
+        (moderation_service, "load_image_classification_pipeline", tiny_image_classification_pipeline),
+        (moderation_service, "load_zero_shot_image_pipeline", tiny_zero_shot_image_pipeline),
+        (recommendation_service, "load_sentence_transformer", tiny_sentence_transformer),
+    ]
+    originals = [(module, name, getattr(module, name)) for module, name, _ in patches]
+    for module, name, replacement in patches:
+        setattr(module, name, replacement)
+    try:
+        yield
+    finally:
+        for module, name, original in originals:
+            setattr(module, name, original)
@@ -0,0 +1,330 @@
+"""
+Offline validator for the CPU inference backends (torch / int8 / onnx)
+Runs a held-out corpus through every backend of each model and compares labels,
+scores and moderation verdicts against the eager fp32 reference.
+
+Usage:
+    python validate_inference_backends.py --texts corpus.jsonl --images ./images \
+        --backends int8 onnx --output backend_report.json
+
+The text corpus is a JSONL file with a "text" field per line (plain text lines also work).
+Exits with code 1 if any backend exceeds the agreed tolerance.
+"""
+import sys
+import os
+import io
+
+# Fix encoding for Windows console
+if sys.platform == "win32":
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+sys.path.append(os.path.dirname(__file__))
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import json
+import time
+
+import numpy as np
+
+from app.services.inference_backends import BACKEND_TORCH, SUPPORTED_BACKENDS
+
+# Small built-in corpus used when no --texts file is given
+DEFAULT_TEXTS = [
+    "Great post, thanks for sharing!",
+    "Just learned about GraphQL and it's amazing! #graphql #api",
+    "Made the perfect carbonara today, the secret is timing the egg mixture",
+    "You are an idiot and nobody wants you here",
+    "I will find you and hurt you",
+    "This is the stupidest thing I have ever read, shut up",
+    "People like you should not be allowed to exist",
+    "Buy now!!! Click here for a limited offer www.spam.com",
+    "What a lovely sunset at the beach this evening",
+    "Kubernetes orchestration at scale - learning the hard way but it's worth it!",
+]
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp')
+
+
+def load_texts(path):
+    if not path:
+        return DEFAULT_TEXTS
+    texts = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                texts.append(record["text"] if isinstance(record, dict) else str(record))
+            except json.JSONDecodeError:
+                texts.append(line)
+    return texts
+
+
+def load_images(directory):
+    if not directory:
+        return []
+    from PIL import Image
+    images = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            with Image.open(os.path.join(directory, name)) as image:
+                images.append((name, image.convert('RGB')))
+    return images
+
+
+def current_rss_mb():
+    """Resident memory of this process in MB (Linux), None elsewhere"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def label_scores(results):
+    """Flatten pipeline output into {label: score}"""
+    if results and isinstance(results[0], list):
+        results = results[0]
+    return {r['label'].lower(): float(r['score']) for r in results}
+
+
+def compare_scores(reference, candidate):
+    """Max absolute score delta and whether the top label agrees"""
+    labels = set(reference) | set(candidate)
+    delta = max(abs(reference.get(l, 0.0) - candidate.get(l, 0.0)) for l in labels) if labels else 0.0
+    top_ref = max(reference, key=reference.get) if reference else None
+    top_cand = max(candidate, key=candidate.get) if candidate else None
+    return delta, top_ref == top_cand
+
+
+def summarize(name, backend, rows, latencies, rss_delta):
+    n = len(rows)
+    verdict_disagreements = sum(1 for r in rows if not r["verdict_match"])
+    return {
+        "model": name,
+        "backend": backend,
+        "items": n,
+        "verdict_disagreement_rate": verdict_disagreements / n if n else 0.0,
+        "top_label_agreement_rate": sum(1 for r in rows if r["top_label_match"]) / n if n else 1.0,
+        "max_score_delta": max((r["score_delta"] for r in rows), default=0.0),
+        "mean_score_delta": float(np.mean([r["score_delta"] for r in rows])) if rows else 0.0,
+        "mean_latency_ms": float(np.mean(latencies)) * 1000 if latencies else None,
+        "rss_delta_mb": rss_delta,
+        "disagreements": [r for r in rows if not r["verdict_match"]][:20],
+    }
+
+
+def run_text_model(backend, texts):
+    from app.services.moderation_service import ContentModerationService
+
+    rss_before = current_rss_mb()
+    with contextlib.redirect_stdout(io.StringIO()):
+        service = ContentModerationService(backend=backend)
+    rss_after = current_rss_mb()
+    if service.classifier is None:
+        raise RuntimeError(f"text model failed to load with backend '{backend}'")
+    # Compare the model itself, not the early-exit tiers in front of it
+    service.cascade_enabled = False
+
+    scores, verdicts, latencies = [], [], []
+    for text in texts:
+        start = time.perf_counter()
+        results = service.classifier(text[:512])
+        latencies.append(time.perf_counter() - start)
+        scores.append(label_scores(results))
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = asyncio.run(service.moderate_text(text))
+        verdicts.append((result["is_toxic"], result["is_hate_speech"]))
+
+    del service
+    gc.collect()
+    rss_delta = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+    return scores, verdicts, latencies, rss_delta
+
+
+def run_image_models(backend, images):
+    from app.services.moderation_service import ImageModerationService, CLIP_CANDIDATE_LABELS
+
+    rss_before = current_rss_mb()
+    with contextlib.redirect_stdout(io.StringIO()):
+        service = ImageModerationService(backend=backend)
+    rss_after = current_rss_mb()
+    if service.classifier is None:
+        raise RuntimeError(f"image models failed to load with backend '{backend}'")
+
+    scores, verdicts, latencies = [], [], []
+    for _, image in images:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = service._moderate_pil_image(image)
+        latencies.append(time.perf_counter() - start)
+        combined = label_scores(service.classifier(image))
+        if service.clip_classifier:
+            combined.update({
+                f"clip:{label}": score
+                for label, score in label_scores(
+                    service.clip_classifier(image, candidate_labels=CLIP_CANDIDATE_LABELS)
+                ).items()
+            })
+        scores.append(combined)
+        verdicts.append(result["passed"])
+
+    del service
+    gc.collect()
+    rss_delta = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+    return scores, verdicts, latencies, rss_delta
+
+
+def run_embedding_model(backend, texts):
+    from app.services.recommendation_service import RecommendationService
+
+    rss_before = current_rss_mb()
+    with contextlib.redirect_stdout(io.StringIO()):
+        service = RecommendationService(backend=backend)
+    rss_after = current_rss_mb()
+    if service.model is None:
+        raise RuntimeError(f"embedding model failed to load with backend '{backend}'")
+
+    start = time.perf_counter()
+    embeddings = service.model.encode(texts)
+    latency = (time.perf_counter() - start) / max(len(texts), 1)
+
+    del service
+    gc.collect()
+    rss_delta = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+    return np.asarray(embeddings), [latency] * len(texts), rss_delta
+
+
+def validate_classifier(name, runner, corpus, item_key, backends, reference):
+    ref_scores, ref_verdicts, ref_latencies, ref_rss = reference
+    reports = [summarize(name, BACKEND_TORCH, [
+        {"score_delta": 0.0, "top_label_match": True, "verdict_match": True}
+        for _ in corpus
+    ], ref_latencies, ref_rss)]
+
+    for backend in backends:
+        print(f"   - {name}: running backend '{backend}'...")
+        scores, verdicts, latencies, rss_delta = runner(backend, corpus)
+        rows = []
+        for i, item in enumerate(corpus):
+            delta, top_match = compare_scores(ref_scores[i], scores[i])
+            rows.append({
+                "item": item_key(item),
+                "score_delta": delta,
+                "top_label_match": top_match,
+                "verdict_match": verdicts[i] == ref_verdicts[i],
+                "reference_verdict": ref_verdicts[i],
+                "backend_verdict": verdicts[i],
+            })
+        reports.append(summarize(name, backend, rows, latencies, rss_delta))
+    return reports
+
+
+def validate_embeddings(texts, backends):
+    ref_embeddings, ref_latencies, ref_rss = run_embedding_model(BACKEND_TORCH, texts)
+    reports = [{
+        "model": "embedding", "backend": BACKEND_TORCH, "items": len(texts),
+        "min_cosine_to_fp32": 1.0, "mean_cosine_to_fp32": 1.0,
+        "mean_latency_ms": float(np.mean(ref_latencies)) * 1000, "rss_delta_mb": ref_rss,
+        # Embeddings have no verdict, scored through cosine similarity instead
+        "verdict_disagreement_rate": 0.0, "max_score_delta": 0.0,
+    }]
+    for backend in backends:
+        print(f"   - embedding: running backend '{backend}'...")
+        embeddings, latencies, rss_delta = run_embedding_model(backend, texts)
+        ref_norm = ref_embeddings / np.linalg.norm(ref_embeddings, axis=1, keepdims=True)
+        cand_norm = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        cosines = np.sum(ref_norm * cand_norm, axis=1)
+        reports.append({
+            "model": "embedding", "backend": backend, "items": len(texts),
+            "min_cosine_to_fp32": float(cosines.min()),
+            "mean_cosine_to_fp32": float(cosines.mean()),
+            "mean_latency_ms": float(np.mean(latencies)) * 1000, "rss_delta_mb": rss_delta,
+            "verdict_disagreement_rate": 0.0,
+            "max_score_delta": float(1.0 - cosines.min()),
+        })
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate quantized/ONNX backends against fp32")
+    parser.add_argument("--texts", help="JSONL/text file with the held-out text corpus")
+    parser.add_argument("--images", help="Directory with held-out images")
+    parser.add_argument("--backends", nargs="+", default=["int8", "onnx"],
+                        choices=[b for b in SUPPORTED_BACKENDS if b != BACKEND_TORCH])
+    parser.add_argument("--models", nargs="+", default=["text", "image", "embedding"],
+                        choices=["text", "image", "embedding"])
+    parser.add_argument("--max-verdict-disagreement", type=float, default=0.01,
+                        help="Maximum fraction of items whose moderation verdict may change")
+    parser.add_argument("--max-score-delta", type=float, default=0.05,
+                        help="Maximum absolute per-label score difference")
+    parser.add_argument("--output", default="backend_validation.json")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("VALIDATING INFERENCE BACKENDS AGAINST FP32")
+    print("=" * 60)
+
+    texts = load_texts(args.texts)
+    images = load_images(args.images)
+    reports = []
+
+    if "text" in args.models:
+        print(f"\n1. Text moderation ({len(texts)} texts)...")
+        reference = run_text_model(BACKEND_TORCH, texts)
+        reports += validate_classifier("text_moderation", run_text_model, texts,
+                                       lambda t: t[:80], args.backends, reference)
+
+    if "image" in args.models:
+        if images:
+            print(f"\n2. Image moderation ({len(images)} images)...")
+            reference = run_image_models(BACKEND_TORCH, images)
+            reports += validate_classifier("image_moderation", run_image_models, images,
+                                           lambda item: item[0], args.backends, reference)
+        else:
+            print("\n2. Image moderation skipped (no --images directory)")
+
+    if "embedding" in args.models:
+        print(f"\n3. Sentence embeddings ({len(texts)} texts)...")
+        reports += validate_embeddings(texts, args.backends)
+
+    failed = False
+    print("\n" + "=" * 60)
+    print("RESULTS")
+    print("=" * 60)
+    for report in reports:
+        ok = (report["verdict_disagreement_rate"] <= args.max_verdict_disagreement and
+              report["max_score_delta"] <= args.max_score_delta)
+        report["within_tolerance"] = ok
+        failed = failed or not ok
+        latency = report["mean_latency_ms"]
+        rss = report["rss_delta_mb"]
+        latency_text = f"{latency:.1f} ms" if latency is not None else "n/a"
+        rss_text = f"{rss:.0f} MB" if rss is not None else "n/a"
+        print(f"{report['model']:<18} {report['backend']:<6} "
+              f"verdict diff: {report['verdict_disagreement_rate']:.3f}  "
+              f"max score delta: {report['max_score_delta']:.4f}  "
+              f"latency: {latency_text}  rss: {rss_text}  "
+              f"{'OK' if ok else 'OUT OF TOLERANCE'}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "tolerance": {
+                "max_verdict_disagreement": args.max_verdict_disagreement,
+                "max_score_delta": args.max_score_delta,
+            },
+            "reports": reports,
+        }, f, indent=2)
+    print(f"\nReport written to {args.output}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,8 @@ const CommentSection = ({ postId, onCommentAdded, onCommentDeleted }) => {
   const [comments, setComments] = useState([]);
   const [newComment, setNewComment] = useState('');
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [submitting, setSubmitting] = useState(false);
   const { user } = useAuth();
 
@@ -18,6 +20,7 @@ const CommentSection = ({ postId, onCommentAdded, onCommentDeleted }) => {
     try {
       const response = await commentsAPI.getComments(postId);
       setComments(response.data.comments);
+      setNextCursor(response.data.next_cursor);
     } catch (err) {
       console.error('Failed to fetch comments:', err);
     } finally {
@@ -25,6 +28,20 @@ const CommentSection = ({ postId, onCommentAdded, onCommentDeleted }) => {
     }
   };
 
+  const loadMoreComments = async () => {
+    try {
+      setLoadingMore(true);
+      const response = await commentsAPI.getComments(postId, { cursor: nextCursor });
+      const loadedIds = new Set(comments.map(c => c.id));
+      setComments([...comments, ...response.data.comments.filter(c => !loadedIds.has(c.id))]);
+      setNextCursor(response.data.next_cursor);
+    } catch (err) {
+      console.error('Failed to fetch comments:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleSubmit = async (e) => {
     e.preventDefault();
     if (!newComment.trim()) return;
@@ -109,6 +126,16 @@ const CommentSection = ({ postId, onCommentAdded, onCommentDeleted }) => {
         ))}
       </div>
 
+      {nextCursor && (
+        <button
+          className="load-more-comments-btn"
+          onClick={loadMoreComments}
+          disabled={loadingMore}
+        >
+          {loadingMore ? 'Loading...' : 'Load more comments'}
+        </button>
+      )}
+
       {comments.length === 0 && (
         <p className="no-comments">No comments yet. Be the first to comment!</p>
       )}
@@ -1,6 +1,6 @@
 import React, { useState } from 'react';
 import { useAuth } from '../context/AuthContext';
-import { postsAPI, likesAPI } from '../services/api';
+import { postsAPI, likesAPI, resolveImageUrl } from '../services/api';
 import CommentSection from './CommentSection';
 import '../styles/PostCard.css';
 
@@ -80,7 +80,7 @@ const PostCard = ({ post, onDelete, onUpdate, onLike }) => {
       <div className="post-content">
         <p>{post.content}</p>
         {post.image_url && (
-          <img src={post.image_url} alt="Post" className="post-image" />
+          <img src={resolveImageUrl(post.image_url, 640)} alt="Post" className="post-image" />
         )}
       </div>
 
@@ -56,26 +56,26 @@ const CreatePost = () => {
     try {
       setLoading(true);
 
-      let finalImageUrl = imageUrl;
+      const tagList = tags ? tags.split(',').map(t => t.trim()).filter(t => t) : [];
+      const categoryList = categories ? categories.split(',').map(c => c.trim()).filter(c => c) : [];
 
-      // If user uploaded a file, convert to base64
+      let response;
       if (imageFile && !imageUrl) {
-        const reader = new FileReader();
-        finalImageUrl = await new Promise((resolve, reject) => {
-          reader.onloadend = () => resolve(reader.result);
-          reader.onerror = reject;
-          reader.readAsDataURL(imageFile);
+        // Upload the file as binary multipart instead of inlining it as base64
+        const formData = new FormData();
+        formData.append('content', content);
+        tagList.forEach(t => formData.append('tags', t));
+        categoryList.forEach(c => formData.append('categories', c));
+        formData.append('image', imageFile);
+        response = await postsAPI.createPostWithImage(formData);
+      } else {
+        response = await postsAPI.createPost({
+          content,
+          image_url: imageUrl || null,
+          tags: tagList,
+          categories: categoryList,
         });
       }
-
-      const postData = {
-        content,
-        image_url: finalImageUrl || null,
-        tags: tags ? tags.split(',').map(t => t.trim()).filter(t => t) : [],
-        categories: categories ? categories.split(',').map(c => c.trim()).filter(c => c) : [],
-      };
-
-      const response = await postsAPI.createPost(postData);
       const post = response.data;
 
       // Show moderation results
@@ -1,6 +1,7 @@
 import axios from 'axios';
 
 const API_BASE_URL = 'http://localhost:9080/api';
+const API_ORIGIN = API_BASE_URL.replace(/\/api$/, '');
 
 // Create axios instance with default config
 const api = axios.create({
@@ -37,6 +38,9 @@ export const authAPI = {
 // Posts API
 export const postsAPI = {
   createPost: (data) => api.post('/posts/', data),
+  createPostWithImage: (formData) => api.post('/posts/upload', formData, {
+    headers: { 'Content-Type': 'multipart/form-data' },
+  }),
   getPosts: (params) => api.get('/posts/', { params }),
   getPost: (postId) => api.get(`/posts/${postId}`),
   updatePost: (postId, data) => api.put(`/posts/${postId}`, data),
@@ -47,7 +51,7 @@ export const postsAPI = {
 // Comments API
 export const commentsAPI = {
   createComment: (postId, data) => api.post(`/posts/${postId}/comments`, data),
-  getComments: (postId) => api.get(`/posts/${postId}/comments`),
+  getComments: (postId, params) => api.get(`/posts/${postId}/comments`, { params }),
   updateComment: (commentId, data) => api.put(`/posts/comments/${commentId}`, data),
   deleteComment: (commentId) => api.delete(`/posts/comments/${commentId}`),
 };
@@ -58,4 +62,12 @@ export const likesAPI = {
   getLikeStatus: (postId) => api.get(`/posts/${postId}/like`),
 };
 
+// Images stored in the backend blob store are referenced by path ("/api/images/<hash>")
+export const resolveImageUrl = (imageUrl, size) => {
+  if (!imageUrl || !imageUrl.startsWith('/api/images/')) {
+    return imageUrl;
+  }
+  return `${API_ORIGIN}${imageUrl}${size ? `?size=${size}` : ''}`;
+};
+
 export default api;